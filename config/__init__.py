@@ -12,6 +12,7 @@ __all__ = [
     'RESULTS_DIR',
     'REPORTS_DIR',
     'CACHE_DIR',
+    'ensure_dirs',
     'DEEPSEEK_API_KEY',
     'BATCH_SIZE',
     'MAX_WORKERS',
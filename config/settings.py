@@ -23,9 +23,12 @@ REPORTS_DIR = OUTPUT_DIR / "reports"
 CACHE_DIR = OUTPUT_DIR / "cache"
 ARCHIVE_DIR = OUTPUT_DIR / "archive"
 
-# 确保目录存在
-for dir_path in [RESULTS_DIR, REPORTS_DIR, CACHE_DIR, ARCHIVE_DIR]:
-    dir_path.mkdir(parents=True, exist_ok=True)
+
+def ensure_dirs():
+    """创建输出目录（由需要写入的命令调用，导入时不再创建）"""
+    for dir_path in [RESULTS_DIR, REPORTS_DIR, CACHE_DIR, ARCHIVE_DIR]:
+        dir_path.mkdir(parents=True, exist_ok=True)
+
 
 # API配置
 DEEPSEEK_API_KEY = os.environ.get('DEEPSEEK_API_KEY')
@@ -4,36 +4,51 @@ Financial Analysis System Core Package
 
 作者: Lin Cifeng
 """
+import importlib
+from typing import TYPE_CHECKING
 
 __version__ = "3.0.0"
 __author__ = "Lin Cifeng"
 
-# 新模块结构
-from .download import Downloader, batch_download
-from .extractor import SmartExtractor, smart_extract
-from .analysis import Analyzer, analyze_extraction_results
-from .visualization import Visualizer, create_charts
-# 从 download/pdf_utils.py 文件导入工具函数
-from .download.pdf_utils import clean_pdfs, generate_summary
-
-# 为了向后兼容，保留旧接口
-from .download.downloader import download_reports
-from .analysis.analyzer import analyze_data
-
-__all__ = [
+# 按需导入（PEP 562）：首次访问时才加载对应子模块，
+# 导入本包不会加载 pdfplumber / pandas / matplotlib 等重依赖
+_LAZY_ATTRS = {
     # 新模块
-    'Downloader',
-    'batch_download',
-    'SmartExtractor',
-    'smart_extract', 
-    'Analyzer',
-    'analyze_extraction_results',
-    'Visualizer',
-    'create_charts',
+    'Downloader': '.download.downloader',
+    'batch_download': '.download.downloader',
+    'SmartExtractor': '.extractor.smart_extractor',
+    'smart_extract': '.extractor.smart_extractor',
+    'Analyzer': '.analysis.analyzer',
+    'analyze_extraction_results': '.analysis.analyzer',
+    'Visualizer': '.visualization.visualizer',
+    'create_charts': '.visualization.visualizer',
     # 旧接口（兼容）
-    'download_reports',
-    'analyze_data', 
+    'download_reports': '.download.downloader',
+    'analyze_data': '.analysis.analyzer',
     # 工具
-    'clean_pdfs',
-    'generate_summary'
-]
\ No newline at end of file
+    'clean_pdfs': '.download.pdf_utils',
+    'generate_summary': '.download.pdf_utils',
+}
+
+__all__ = list(_LAZY_ATTRS)
+
+
+def __getattr__(name):
+    module = _LAZY_ATTRS.get(name)
+    if module is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(importlib.import_module(module, __name__), name)
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted(set(globals()) | set(__all__))
+
+
+if TYPE_CHECKING:
+    from .download.downloader import Downloader, batch_download, download_reports
+    from .extractor.smart_extractor import SmartExtractor, smart_extract
+    from .analysis.analyzer import Analyzer, analyze_extraction_results, analyze_data
+    from .visualization.visualizer import Visualizer, create_charts
+    from .download.pdf_utils import clean_pdfs, generate_summary
@@ -1,6 +1,30 @@
 """
 分析模块 - 数据分析和报告生成
 """
-from .analyzer import Analyzer, analyze_extraction_results
+import importlib
+from typing import TYPE_CHECKING
 
-__all__ = ['Analyzer', 'analyze_extraction_results']
\ No newline at end of file
+# 按需导入（PEP 562）：首次访问时才加载子模块
+_LAZY_ATTRS = {
+    'Analyzer': '.analyzer',
+    'analyze_extraction_results': '.analyzer',
+}
+
+__all__ = list(_LAZY_ATTRS)
+
+
+def __getattr__(name):
+    module = _LAZY_ATTRS.get(name)
+    if module is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(importlib.import_module(module, __name__), name)
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted(set(globals()) | set(__all__))
+
+
+if TYPE_CHECKING:
+    from .analyzer import Analyzer, analyze_extraction_results
@@ -10,6 +10,8 @@ from collections import defaultdict
 import pandas as pd
 import numpy as np
 
+from ..download.registry import get_registry
+
 
 class Analyzer:
     """数据分析器"""
@@ -34,13 +36,9 @@ class Analyzer:
 def analyze_companies(csv_path: str = "data/Company_Financial_report.csv",
                      report_dir: str = "data/raw_reports") -> Dict:
     """分析公司财报覆盖情况"""
-    # 读取CSV中的公司列表
-    companies_in_csv = set()
-    with open(csv_path, 'r', encoding='utf-8') as f:
-        reader = csv.DictReader(f)
-        for row in reader:
-            if row.get('Financial Report(Y/N)') == 'Y':
-                companies_in_csv.add(row['name'])
+    # 读取登记表中的公司列表
+    registry = get_registry(csv_path)
+    companies_in_csv = set(registry.companies(with_report=True))
     
     # 获取已下载的文件
     report_path = Path(report_dir)
@@ -48,7 +46,8 @@ def analyze_companies(csv_path: str = "data/Company_Financial_report.csv",
     file_count = defaultdict(int)
     
     for file in report_path.glob("*.pdf"):
-        company = file.stem.split('_')[0]
+        row = registry.find_by_filename(file.name)
+        company = row['company'] if row else file.stem.split('_')[0]
         downloaded_companies.add(company)
         file_count[company] += 1
     
@@ -152,7 +151,7 @@ Data Analysis Tool
 import pandas as pd
 import numpy as np
 from pathlib import Path
-from typing import Dict, List, Tuple, Optional, Any
+from typing import Callable, Dict, List, Tuple, Optional, Any
 import json
 from datetime import datetime
 import matplotlib.pyplot as plt
@@ -179,27 +178,55 @@ class DataAnalyzer:
         
         # 所有字段
         self.all_fields = list(set(sum(self.field_categories.values(), [])))
+        
+        # 本次分析的中间结果（分组聚合只算一次，分析结束后清空）
+        self._run_cache: Optional[Dict[str, Any]] = None
     
     def analyze_extraction_results(self, results_df: pd.DataFrame) -> Dict[str, Any]:
         """
         分析提取结果
         
+        各项统计共享同一次的状态计数、字段统计和按公司/方法的分组聚合，耗时与行数成线性
+        
         Returns:
             包含各种统计信息的字典
         """
-        analysis = {
-            'timestamp': datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
-            'total_files': len(results_df),
-            'overall_statistics': self._calculate_overall_stats(results_df),
-            'field_statistics': self._calculate_field_stats(results_df),
-            'company_statistics': self._calculate_company_stats(results_df),
-            'method_statistics': self._calculate_method_stats(results_df),
-            'quality_metrics': self._calculate_quality_metrics(results_df),
-            'recommendations': self._generate_recommendations(results_df)
-        }
+        self._run_cache = {}
+        try:
+            analysis = {
+                'timestamp': datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+                'total_files': len(results_df),
+                'overall_statistics': self._calculate_overall_stats(results_df),
+                'field_statistics': self._calculate_field_stats(results_df),
+                'company_statistics': self._calculate_company_stats(results_df),
+                'method_statistics': self._calculate_method_stats(results_df),
+                'quality_metrics': self._calculate_quality_metrics(results_df),
+                'recommendations': self._generate_recommendations(results_df)
+            }
+        finally:
+            self._run_cache = None
         
         return analysis
     
+    def _memo(self, key: str, compute: Callable[[], Any]) -> Any:
+        """本次分析内只计算一次（在 analyze_extraction_results 之外调用时直接计算）"""
+        if self._run_cache is None:
+            return compute()
+        if key not in self._run_cache:
+            self._run_cache[key] = compute()
+        return self._run_cache[key]
+    
+    def _status_counts(self, df: pd.DataFrame) -> pd.Series:
+        """各提取状态的文件数"""
+        return self._memo('status_counts', lambda: df['extraction_status'].value_counts())
+    
+    def _core_present(self, df: pd.DataFrame) -> Optional[pd.DataFrame]:
+        """核心字段是否有值（缺少任一核心字段列时为None）"""
+        core_fields = self.field_categories['core']
+        if not all(f in df for f in core_fields):
+            return None
+        return self._memo('core_present', lambda: df[core_fields].notna())
+    
     def _calculate_overall_stats(self, df: pd.DataFrame) -> Dict:
         """计算整体统计"""
         stats = {
@@ -212,7 +239,7 @@ class DataAnalyzer:
         }
         
         if 'extraction_status' in df:
-            status_counts = df['extraction_status'].value_counts()
+            status_counts = self._status_counts(df)
             stats['extraction_success'] = status_counts.get('success', 0)
             stats['extraction_failed'] = status_counts.get('failed', 0)
             stats['empty_pdf'] = status_counts.get('empty_pdf', 0)
@@ -233,6 +260,9 @@ class DataAnalyzer:
     
     def _calculate_field_stats(self, df: pd.DataFrame) -> Dict:
         """计算各字段统计"""
+        return self._memo('field_stats', lambda: self._compute_field_stats(df))
+    
+    def _compute_field_stats(self, df: pd.DataFrame) -> Dict:
         field_stats = {}
         
         for field in self.all_fields:
@@ -262,32 +292,32 @@ class DataAnalyzer:
         """计算公司层面统计"""
         if 'company' not in df:
             return {}
+        return self._memo('company_stats', lambda: self._compute_company_stats(df))
+    
+    def _compute_company_stats(self, df: pd.DataFrame) -> Dict:
+        # 每行的计数指标，按公司分组一次求和（公司按首次出现的顺序，空公司不计）
+        core_fields = [f for f in self.field_categories['core'] if f in df]
+        indicators = pd.DataFrame({'total_files': 1}, index=df.index)
+        indicators['success_count'] = (df['extraction_status'] == 'success') if 'extraction_status' in df else 0
+        for field in core_fields:
+            indicators[field] = df[field].notna()
+        core_present = self._core_present(df)
+        if core_present is not None:
+            indicators['complete'] = core_present.all(axis=1)
+        grouped = indicators.groupby(df['company'], sort=False).sum()
         
         company_stats = {}
-        
-        for company in df['company'].unique():
-            if pd.isna(company):
-                continue
-                
-            company_df = df[df['company'] == company]
-            
+        for company, counts in grouped.to_dict('index').items():
+            total = counts['total_files']
             stats = {
-                'total_files': len(company_df),
-                'success_count': len(company_df[company_df['extraction_status'] == 'success']) 
-                                if 'extraction_status' in company_df else 0,
-                'field_extraction_rates': {}
+                'total_files': total,
+                'success_count': counts['success_count'],
+                'field_extraction_rates': {field: counts[field] / total * 100 for field in core_fields}
             }
             
-            # 计算各字段提取率
-            for field in self.field_categories['core']:
-                if field in company_df:
-                    rate = company_df[field].notna().sum() / len(company_df) * 100
-                    stats['field_extraction_rates'][field] = rate
-            
             # 计算完整提取率
-            if all(f in company_df for f in self.field_categories['core']):
-                complete = company_df[self.field_categories['core']].notna().all(axis=1).sum()
-                stats['complete_extraction_rate'] = complete / len(company_df) * 100
+            if 'complete' in counts:
+                stats['complete_extraction_rate'] = counts['complete'] / total * 100
             
             company_stats[company] = stats
         
@@ -297,22 +327,26 @@ class DataAnalyzer:
         """计算提取方法统计"""
         if 'extraction_method' not in df:
             return {}
-        
+        return self._memo('method_stats', lambda: self._compute_method_stats(df))
+    
+    def _compute_method_stats(self, df: pd.DataFrame) -> Dict:
         method_counts = df['extraction_method'].value_counts()
         
+        # 各方法的平均置信度/完整度按方法分组一次求得
+        columns = [c for c in ('confidence', 'data_completeness') if c in df]
+        means = df.groupby('extraction_method')[columns].mean() if columns else pd.DataFrame()
+        
         method_stats = {}
         for method, count in method_counts.items():
             if pd.isna(method):
                 continue
-                
-            method_df = df[df['extraction_method'] == method]
             
             stats = {
                 'count': count,
                 'percentage': count / len(df) * 100,
-                'average_confidence': method_df['confidence'].mean() if 'confidence' in method_df else 0,
-                'average_completeness': method_df['data_completeness'].mean() 
-                                      if 'data_completeness' in method_df else 0
+                'average_confidence': means.at[method, 'confidence'] if 'confidence' in means else 0,
+                'average_completeness': means.at[method, 'data_completeness'] 
+                                      if 'data_completeness' in means else 0
             }
             
             method_stats[method] = stats
@@ -328,19 +362,19 @@ class DataAnalyzer:
         }
         
         if 'confidence' in df:
-            high_confidence = df[df['confidence'] > 80]
-            metrics['high_confidence_rate'] = len(high_confidence) / len(df) * 100
+            high_confidence = (df['confidence'] > 80).sum()
+            metrics['high_confidence_rate'] = high_confidence / len(df) * 100
         
         # 计算完整提取率
-        core_fields = self.field_categories['core']
-        if all(f in df for f in core_fields):
-            complete = df[core_fields].notna().all(axis=1).sum()
+        core_present = self._core_present(df)
+        if core_present is not None:
+            complete = core_present.all(axis=1).sum()
             metrics['complete_extraction_rate'] = complete / len(df) * 100
         
         # 计算数据一致性（这里简化处理）
         if 'validation_status' in df:
-            consistent = df[df['validation_status'] == 'consistent']
-            metrics['data_consistency'] = len(consistent) / len(df) * 100
+            consistent = (df['validation_status'] == 'consistent').sum()
+            metrics['data_consistency'] = consistent / len(df) * 100
         
         return metrics
     
@@ -352,12 +386,12 @@ class DataAnalyzer:
         return 'other'
     
     def _generate_recommendations(self, df: pd.DataFrame) -> List[str]:
-        """生成改进建议"""
+        """生成改进建议（沿用本次分析已算出的字段统计和公司统计）"""
         recommendations = []
         
         # 基于整体成功率
         if 'extraction_status' in df:
-            success_rate = len(df[df['extraction_status'] == 'success']) / len(df) * 100
+            success_rate = self._status_counts(df).get('success', 0) / len(df) * 100
             if success_rate < 50:
                 recommendations.append("整体提取成功率低于50%，建议优化提取算法")
         
@@ -369,7 +403,7 @@ class DataAnalyzer:
         
         # 基于空PDF率
         if 'extraction_status' in df:
-            empty_rate = len(df[df['extraction_status'] == 'empty_pdf']) / len(df) * 100
+            empty_rate = self._status_counts(df).get('empty_pdf', 0) / len(df) * 100
             if empty_rate > 20:
                 recommendations.append(f"空PDF文件占{empty_rate:.1f}%，建议检查下载流程并重新下载")
         
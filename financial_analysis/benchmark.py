@@ -0,0 +1,529 @@
+"""
+提取吞吐量基准测试
+Reproducible Extraction Throughput Benchmark
+
+由固定随机种子生成合成语料（文本型、表格型、多语言、扫描版各若干份，页数可配置），
+对每种提取模式和线程数组合运行提取（每次重复都在独立子进程和临时工作目录中进行，
+规划器、页码提示、模式包、隔离区等学习状态从空开始，也不写入正式输出目录），测量：
+    文件/秒、页/秒、各阶段耗时（见 extractor/metrics.py）、峰值内存
+结果写入 output/benchmark/results/ 下带版本号的JSON，并与同一语料的上一次结果对比。
+"""
+import io
+import os
+import sys
+import json
+import time
+import random
+import atexit
+import contextlib
+import hashlib
+import platform
+import tempfile
+import subprocess
+import multiprocessing
+import concurrent.futures
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Sequence
+
+# 尝试导入resource（Unix，用于读取峰值内存）
+try:
+    import resource
+    HAS_RESOURCE = True
+except ImportError:
+    HAS_RESOURCE = False
+
+BENCHMARK_DIR = "output/benchmark"
+SCHEMA_VERSION = 1
+
+CORPUS_KINDS = ('text', 'table', 'multilang', 'scanned')
+DEFAULT_MODES = ('regex_only', 'regex_table', 'regex_first', 'adaptive')
+DEFAULT_WORKERS = (1, 4)
+
+# 吞吐量下降超过该比例时提示回归
+REGRESSION_THRESHOLD = 0.10
+
+_COMPANIES = ['Alpha Bank', 'Beacon Financial', 'Cedar Digital', 'Delta Pay',
+              'Evergreen Trust', 'Fusion Credit', 'Granite Holdings', 'Harbor Fintech']
+_FILLER = ("The Group continued to invest in digital channels and risk management "
+           "during the reporting period while maintaining a prudent capital position. ")
+_ZH_FILLER = "本集团在报告期内持续投入数字化渠道建设与风险管理，保持稳健的资本水平。"
+_PT_FILLER = "O Grupo continuou investindo em canais digitais e gestão de riscos durante o período. "
+
+
+# ----------------------------------------------------------------------
+# 合成语料
+# ----------------------------------------------------------------------
+def _figures(rng: random.Random) -> Dict[str, int]:
+    """一组自洽的财务数字（千元）"""
+    total_assets = rng.randrange(2_000_000, 90_000_000)
+    total_liabilities = int(total_assets * rng.uniform(0.55, 0.92))
+    revenue = int(total_assets * rng.uniform(0.03, 0.12))
+    net_profit = int(revenue * rng.uniform(-0.2, 0.3))
+    return {'total_assets': total_assets, 'total_liabilities': total_liabilities,
+            'revenue': revenue, 'net_profit': net_profit}
+
+
+def _statement_lines(figures: Dict[str, int], language: str = 'en') -> List[str]:
+    labels = {
+        'en': ('Total Assets', 'Total Liabilities', 'Revenue', 'Net Profit'),
+        'zh': ('总资产', '总负债', '营业收入', '净利润'),
+        'pt': ('Ativo Total', 'Passivo Total', 'Receita', 'Lucro Líquido'),
+    }[language]
+    values = (figures['total_assets'], figures['total_liabilities'],
+              figures['revenue'], figures['net_profit'])
+    return [f"{label}  {value:,}" for label, value in zip(labels, values)]
+
+
+def _write_text_pdf(path: Path, rng: random.Random, pages: int, language: str = 'en') -> None:
+    from reportlab.lib.pagesizes import A4
+    from reportlab.pdfgen import canvas
+
+    font = 'Helvetica'
+    if language == 'zh':
+        from reportlab.pdfbase import pdfmetrics
+        from reportlab.pdfbase.cidfonts import UnicodeCIDFont
+        pdfmetrics.registerFont(UnicodeCIDFont('STSong-Light'))
+        font = 'STSong-Light'
+    filler = {'en': _FILLER, 'zh': _ZH_FILLER, 'pt': _PT_FILLER}[language]
+    chunk = 40 if language == 'zh' else 95
+
+    figures = _figures(rng)
+    statement_page = rng.randrange(pages)
+    c = canvas.Canvas(str(path), pagesize=A4, invariant=1)
+    width, height = A4
+    for page in range(pages):
+        c.setFont(font, 10)
+        y = height - 60
+        if page == 0:
+            c.drawString(50, y, "Annual Report (in thousands)" if language != 'zh' else "年度报告（单位：千元）")
+            y -= 24
+        lines = []
+        if page == statement_page:
+            lines += ["Consolidated Statement of Financial Position" if language != 'zh' else "资产负债表"]
+            lines += _statement_lines(figures, language)
+        text = filler * rng.randint(8, 14)
+        lines += [text[i:i + chunk] for i in range(0, len(text), chunk)]
+        for line in lines:
+            if y < 60:
+                break
+            c.drawString(50, y, line)
+            y -= 14
+        c.showPage()
+    c.save()
+
+
+def _write_table_pdf(path: Path, rng: random.Random, pages: int) -> None:
+    from reportlab.lib import colors
+    from reportlab.lib.pagesizes import A4
+    from reportlab.platypus import PageBreak, SimpleDocTemplate, Table, TableStyle
+
+    figures = _figures(rng)
+    style = TableStyle([('GRID', (0, 0), (-1, -1), 0.5, colors.black),
+                        ('FONTSIZE', (0, 0), (-1, -1), 8)])
+    story = []
+    for page in range(pages):
+        rows = [['Item', '2023', '2022']]
+        if page == 0:
+            for line in _statement_lines(figures):
+                label, value = line.split('  ')
+                rows.append([label, value, f"{int(int(value.replace(',', '')) * 0.9):,}"])
+        for i in range(rng.randint(20, 30)):
+            rows.append([f"Line item {page}-{i}", f"{rng.randrange(1000, 999999):,}",
+                         f"{rng.randrange(1000, 999999):,}"])
+        table = Table(rows)
+        table.setStyle(style)
+        story += [table, PageBreak()]
+    doc = SimpleDocTemplate(str(path), pagesize=A4, invariant=1)
+    doc.build(story)
+
+
+def _write_scanned_pdf(path: Path, rng: random.Random, pages: int) -> None:
+    """只有图像、没有文本层的扫描版PDF"""
+    from PIL import Image, ImageDraw, ImageFont
+    from reportlab.lib.pagesizes import A4
+    from reportlab.lib.utils import ImageReader
+    from reportlab.pdfgen import canvas
+
+    figures = _figures(rng)
+    font = ImageFont.load_default()
+    c = canvas.Canvas(str(path), pagesize=A4, invariant=1)
+    width, height = A4
+    for page in range(pages):
+        image = Image.new('L', (620, 877), color=255)
+        draw = ImageDraw.Draw(image)
+        lines = _statement_lines(figures) if page == 0 else []
+        lines += [_FILLER[:90]] * rng.randint(20, 40)
+        for i, line in enumerate(lines):
+            draw.text((30, 30 + i * 18), line, fill=0, font=font)
+        buffer = io.BytesIO()
+        image.save(buffer, format='PNG')
+        buffer.seek(0)
+        c.drawImage(ImageReader(buffer), 0, 0, width=width, height=height)
+        c.showPage()
+    c.save()
+
+
+def corpus_spec(files_per_kind: int = 3, pages: int = 5, seed: int = 42,
+                kinds: Sequence[str] = CORPUS_KINDS) -> Dict[str, Any]:
+    return {'files_per_kind': files_per_kind, 'pages': pages, 'seed': seed, 'kinds': list(kinds)}
+
+
+def spec_hash(spec: Dict[str, Any]) -> str:
+    return hashlib.sha256(json.dumps(spec, sort_keys=True).encode()).hexdigest()[:12]
+
+
+def generate_corpus(spec: Dict[str, Any], base_dir: str = BENCHMARK_DIR) -> Path:
+    """
+    生成（或复用）合成语料
+
+    同一参数总是生成同样的文件；目录按参数哈希命名，已生成时直接复用
+    """
+    corpus_dir = Path(base_dir) / f"corpus_{spec_hash(spec)}"
+    manifest_file = corpus_dir / "manifest.json"
+    if manifest_file.exists():
+        return corpus_dir
+
+    corpus_dir.mkdir(parents=True, exist_ok=True)
+    rng = random.Random(spec['seed'])
+    files = []
+    for kind in spec['kinds']:
+        for i in range(spec['files_per_kind']):
+            company = _COMPANIES[len(files) % len(_COMPANIES)].replace(' ', '')
+            year = 2018 + rng.randrange(6)
+            path = corpus_dir / f"{company}_{year}_{kind}{i}.pdf"
+            file_rng = random.Random(rng.random())
+            if kind == 'text':
+                _write_text_pdf(path, file_rng, spec['pages'])
+            elif kind == 'table':
+                _write_table_pdf(path, file_rng, spec['pages'])
+            elif kind == 'multilang':
+                _write_text_pdf(path, file_rng, spec['pages'], language=('zh', 'pt')[i % 2])
+            elif kind == 'scanned':
+                _write_scanned_pdf(path, file_rng, spec['pages'])
+            else:
+                raise ValueError(f"未知语料类型: {kind}")
+            files.append({'name': path.name, 'kind': kind, 'pages': spec['pages']})
+
+    with open(manifest_file, 'w', encoding='utf-8') as f:
+        json.dump({'spec': spec, 'files': files}, f, indent=2, ensure_ascii=False)
+    print(f"📄 已生成基准语料: {corpus_dir} ({len(files)} 个文件)")
+    return corpus_dir
+
+
+# ----------------------------------------------------------------------
+# 运行
+# ----------------------------------------------------------------------
+def _peak_rss_mb() -> Optional[float]:
+    if HAS_RESOURCE:
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        # Linux单位为KB，macOS为字节
+        return round(peak / 1024 / (1024 if sys.platform == 'darwin' else 1), 1)
+    from .extractor.metrics import rss_bytes
+    rss = rss_bytes()
+    return round(rss / 1024 / 1024, 1) if rss else None
+
+
+def _run_once(corpus_dir: str, mode: str, workers: int) -> Dict[str, Any]:
+    """
+    在全新的子进程中运行一次提取
+
+    工作目录切换到临时目录：规划器、页码提示、模式包、隔离区等学习状态和主控表历史都从空开始，
+    运行中写入的决策日志、缓存等也留在临时目录，不进入正式输出目录
+    """
+    # 导入路径中的相对路径先转成绝对路径，切换工作目录后仍可导入
+    sys.path[:] = [os.path.abspath(p) for p in sys.path]
+    original_dir = os.getcwd()
+    with tempfile.TemporaryDirectory(prefix="bench_") as work_dir:
+        os.chdir(work_dir)
+        try:
+            from .extractor import page_parallel
+            from .extractor.metrics import get_metrics
+            from .extractor.smart_extractor import extract_single_file
+
+            with open(Path(corpus_dir) / "manifest.json", 'r', encoding='utf-8') as f:
+                manifest = json.load(f)
+            pdf_files = [Path(corpus_dir) / item['name'] for item in manifest['files']]
+
+            start = time.perf_counter()
+            # 提取过程中的逐文件输出不计入测量
+            with contextlib.redirect_stdout(io.StringIO()):
+                with concurrent.futures.ThreadPoolExecutor(max_workers=workers) as executor:
+                    results = list(executor.map(lambda p: extract_single_file(p, mode, False), pdf_files))
+            seconds = time.perf_counter() - start
+            page_parallel.shutdown()
+        finally:
+            # 隔离区在进程退出时（atexit）按相对路径保存：切回原目录前先保存并注销，不覆盖正式的隔离区登记表
+            from .extractor.quarantine import get_quarantine
+            quarantine = get_quarantine()
+            quarantine.close()
+            atexit.unregister(quarantine.close)
+            os.chdir(original_dir)
+
+    complete = sum(1 for r in results if r.success_level == "Complete")
+    partial = sum(1 for r in results if "Partial" in str(r.success_level))
+    return {
+        'seconds': seconds,
+        'stages': {stage: round(info['sum'], 4) for stage, info in get_metrics().to_dict()['stages'].items()},
+        'peak_rss_mb': _peak_rss_mb(),
+        'outcomes': {'complete': complete, 'partial': partial,
+                     'failed': len(results) - complete - partial}
+    }
+
+
+def _run_config(corpus_dir: str, mode: str, workers: int, repeat: int = 1) -> Dict[str, Any]:
+    """
+    运行一种配置：每次重复都在独立的子进程中从空的学习状态开始（峰值内存互不影响，
+    前一次学到的提示不会加快后一次），取最快一次
+    """
+    with open(Path(corpus_dir) / "manifest.json", 'r', encoding='utf-8') as f:
+        manifest = json.load(f)
+    files = len(manifest['files'])
+    total_pages = sum(item['pages'] for item in manifest['files'])
+
+    best = None
+    context = multiprocessing.get_context('spawn')
+    for _ in range(max(repeat, 1)):
+        with concurrent.futures.ProcessPoolExecutor(max_workers=1, mp_context=context) as executor:
+            run = executor.submit(_run_once, str(Path(corpus_dir).resolve()), mode, workers).result()
+        if best is None or run['seconds'] < best['seconds']:
+            best = run
+
+    elapsed = best['seconds']
+    return {
+        'mode': mode,
+        'workers': workers,
+        'repeat': repeat,
+        'files': files,
+        'pages': total_pages,
+        'seconds': round(elapsed, 4),
+        'files_per_sec': round(files / elapsed, 3),
+        'pages_per_sec': round(total_pages / elapsed, 3),
+        'seconds_per_file': round(elapsed / files, 4),
+        'stages': best['stages'],
+        'peak_rss_mb': best['peak_rss_mb'],
+        'outcomes': best['outcomes']
+    }
+
+
+def _git_commit() -> Optional[str]:
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True,
+                              text=True, timeout=5, cwd=Path(__file__).parent).stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        return None
+
+
+def _previous_result(results_dir: Path, corpus_hash: str, exclude: Path) -> Optional[Dict]:
+    """同一语料的上一次结果"""
+    for result_file in sorted(results_dir.glob("bench_*.json"), reverse=True):
+        if result_file == exclude:
+            continue
+        try:
+            with open(result_file, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            continue
+        if data.get('corpus', {}).get('hash') == corpus_hash:
+            return data
+    return None
+
+
+def run_benchmark(modes: Sequence[str] = DEFAULT_MODES,
+                  workers: Sequence[int] = DEFAULT_WORKERS,
+                  files_per_kind: int = 3,
+                  pages: int = 5,
+                  seed: int = 42,
+                  kinds: Sequence[str] = CORPUS_KINDS,
+                  repeat: int = 1,
+                  output_dir: str = BENCHMARK_DIR) -> Path:
+    """
+    运行基准测试
+
+    Returns:
+        结果JSON路径
+    """
+    spec = corpus_spec(files_per_kind, pages, seed, kinds)
+    corpus_dir = generate_corpus(spec, output_dir)
+
+    print(f"\n{'='*70}")
+    print("提取吞吐量基准测试")
+    print(f"{'='*70}")
+    print(f"语料: {corpus_dir} | 模式: {', '.join(modes)} | 线程: {', '.join(map(str, workers))}")
+
+    runs = []
+    for mode in modes:
+        for worker_count in workers:
+            run = _run_config(str(corpus_dir), mode, worker_count, repeat)
+            runs.append(run)
+            print(f"  {mode:<12} x{worker_count:<2} {run['files_per_sec']:>7.2f} 文件/秒 "
+                  f"{run['pages_per_sec']:>8.2f} 页/秒  峰值内存 {run['peak_rss_mb']}MB")
+
+    result = {
+        'schema_version': SCHEMA_VERSION,
+        'created': datetime.now().isoformat(),
+        'git_commit': _git_commit(),
+        'environment': {
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'cpu_count': os.cpu_count()
+        },
+        'corpus': {'hash': spec_hash(spec), 'spec': spec},
+        'runs': runs
+    }
+
+    results_dir = Path(output_dir) / "results"
+    results_dir.mkdir(parents=True, exist_ok=True)
+    result_file = results_dir / f"bench_{datetime.now().strftime('%Y%m%d%H%M%S')}_{result['git_commit'] or 'nogit'}.json"
+    with open(result_file, 'w', encoding='utf-8') as f:
+        json.dump(result, f, indent=2, ensure_ascii=False)
+    with open(results_dir / "latest.json", 'w', encoding='utf-8') as f:
+        json.dump(result, f, indent=2, ensure_ascii=False)
+
+    _print_comparison(result, _previous_result(results_dir, result['corpus']['hash'], result_file))
+    print(f"\n结果已保存至: {result_file}")
+    return result_file
+
+
+def _print_comparison(current: Dict, previous: Optional[Dict]) -> None:
+    """与上一次结果对比吞吐量"""
+    if previous is None:
+        return
+    before = {(r['mode'], r['workers']): r for r in previous['runs']}
+    print(f"\n与上一次结果对比 ({previous.get('git_commit') or '-'} @ {previous['created'][:19]}):")
+    for run in current['runs']:
+        old = before.get((run['mode'], run['workers']))
+        if not old:
+            continue
+        change = run['files_per_sec'] / old['files_per_sec'] - 1 if old['files_per_sec'] else 0.0
+        flag = "  ⚠️ 回归" if change < -REGRESSION_THRESHOLD else ""
+        print(f"  {run['mode']:<12} x{run['workers']:<2} {old['files_per_sec']:>7.2f} -> "
+              f"{run['files_per_sec']:>7.2f} 文件/秒 ({change:+.1%}){flag}")
+
+
+def load_latest_benchmark(output_dir: str = BENCHMARK_DIR) -> Optional[Dict]:
+    """最近一次基准测试结果（没有时返回None）"""
+    try:
+        with open(Path(output_dir) / "results" / "latest.json", 'r', encoding='utf-8') as f:
+            data = json.load(f)
+    except (OSError, ValueError):
+        return None
+    return data if data.get('schema_version') == SCHEMA_VERSION else None
+
+
+# ----------------------------------------------------------------------
+# 启动/导入耗时
+# ----------------------------------------------------------------------
+# 子命令 -> 执行前需要导入的模块（与 main.py 中对应处理函数的导入一致）
+COMMAND_IMPORTS = {
+    'status': ('financial_analysis.extractor.batch_manager',),
+    'monitor': ('financial_analysis.extractor.batch_manager',),
+    'merge': ('financial_analysis.extractor.batch_manager', 'financial_analysis.extractor.results_store'),
+    'extract': ('financial_analysis.extractor.smart_extractor',),
+    'run': ('financial_analysis.pipeline',),
+    'download': ('financial_analysis.download.downloader',),
+    'analyze': ('financial_analysis.analysis.analyzer',),
+}
+HEAVY_MODULES = ('pdfplumber', 'pandas', 'numpy', 'matplotlib', 'requests', 'tqdm', 'openpyxl', 'PIL')
+# 这些命令的启动耗时应远低于1秒
+FAST_COMMANDS = ('status', 'monitor')
+STARTUP_BUDGET = 1.0
+
+_IMPORT_PROBE = """
+import sys, json, time, importlib
+start = time.perf_counter()
+import main
+main.build_parser().parse_args([{command!r}])
+for name in {modules!r}:
+    importlib.import_module(name)
+elapsed = time.perf_counter() - start
+print(json.dumps({{'import_seconds': elapsed,
+                  'modules_loaded': len(sys.modules),
+                  'heavy_loaded': [m for m in {heavy!r} if m in sys.modules]}}))
+"""
+
+
+def _parse_importtime(stderr: str, top: int = 10) -> List[Dict[str, Any]]:
+    """解析 -X importtime 输出，返回累计耗时最多的顶层导入"""
+    entries = []
+    for line in stderr.splitlines():
+        if not line.startswith('import time:'):
+            continue
+        fields = line[len('import time:'):].split('|')
+        if len(fields) != 3 or not fields[1].strip().isdigit():
+            continue  # 表头
+        name = fields[2]
+        # 名称前一个空格，每层嵌套再缩进两个空格
+        if len(name) - len(name.lstrip()) > 1:
+            continue
+        entries.append({'module': name.strip(), 'cumulative_ms': round(int(fields[1]) / 1000, 2)})
+    return sorted(entries, key=lambda e: -e['cumulative_ms'])[:top]
+
+
+def _probe_command(command: str) -> Dict[str, Any]:
+    """在全新解释器中导入 main 及子命令所需模块"""
+    probe = _IMPORT_PROBE.format(command=command, modules=COMMAND_IMPORTS.get(command, ()),
+                                 heavy=HEAVY_MODULES)
+    start = time.perf_counter()
+    completed = subprocess.run([sys.executable, '-X', 'importtime', '-c', probe],
+                               capture_output=True, text=True, cwd=Path(__file__).parent.parent)
+    wall = time.perf_counter() - start
+    if completed.returncode != 0:
+        raise RuntimeError(f"{command}: {completed.stderr.strip().splitlines()[-1]}")
+    data = json.loads(completed.stdout.strip().splitlines()[-1])
+    data['wall_seconds'] = wall
+    data['top_imports'] = _parse_importtime(completed.stderr)
+    return data
+
+
+def run_import_benchmark(commands: Optional[Sequence[str]] = None,
+                         repeat: int = 3,
+                         output_dir: str = BENCHMARK_DIR) -> Path:
+    """
+    测量各子命令的启动耗时（解释器启动 + 导入），每个命令取最快一次
+
+    Returns:
+        结果JSON路径
+    """
+    commands = list(commands or COMMAND_IMPORTS)
+    print(f"\n{'='*70}")
+    print("子命令启动耗时")
+    print(f"{'='*70}")
+
+    runs = []
+    for command in commands:
+        probes = [_probe_command(command) for _ in range(max(1, repeat))]
+        best = min(probes, key=lambda p: p['wall_seconds'])
+        run = {
+            'command': command,
+            'wall_seconds': round(best['wall_seconds'], 4),
+            'import_seconds': round(best['import_seconds'], 4),
+            'modules_loaded': best['modules_loaded'],
+            'heavy_loaded': best['heavy_loaded'],
+            'top_imports': best['top_imports']
+        }
+        runs.append(run)
+        flag = "  ⚠️ 超出预算" if command in FAST_COMMANDS and run['wall_seconds'] > STARTUP_BUDGET else ""
+        heavy = ', '.join(run['heavy_loaded']) or '-'
+        print(f"  {command:<10} {run['wall_seconds']:>6.3f}秒 (导入 {run['import_seconds']:.3f}秒) "
+              f"模块 {run['modules_loaded']:>5}  重依赖: {heavy}{flag}")
+
+    result = {
+        'schema_version': SCHEMA_VERSION,
+        'created': datetime.now().isoformat(),
+        'git_commit': _git_commit(),
+        'environment': {
+            'python': platform.python_version(),
+            'platform': platform.platform()
+        },
+        'budget_seconds': {command: STARTUP_BUDGET for command in FAST_COMMANDS},
+        'runs': runs
+    }
+
+    results_dir = Path(output_dir) / "imports"
+    results_dir.mkdir(parents=True, exist_ok=True)
+    result_file = results_dir / f"imports_{datetime.now().strftime('%Y%m%d%H%M%S')}_{result['git_commit'] or 'nogit'}.json"
+    with open(result_file, 'w', encoding='utf-8') as f:
+        json.dump(result, f, indent=2, ensure_ascii=False)
+    print(f"\n结果已保存至: {result_file}")
+    return result_file
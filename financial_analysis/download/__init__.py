@@ -1,6 +1,30 @@
 """
 下载模块 - 财报下载功能
 """
-from .downloader import Downloader, batch_download
+import importlib
+from typing import TYPE_CHECKING
 
-__all__ = ['Downloader', 'batch_download']
\ No newline at end of file
+# 按需导入（PEP 562）：首次访问时才加载子模块
+_LAZY_ATTRS = {
+    'Downloader': '.downloader',
+    'batch_download': '.downloader',
+}
+
+__all__ = list(_LAZY_ATTRS)
+
+
+def __getattr__(name):
+    module = _LAZY_ATTRS.get(name)
+    if module is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(importlib.import_module(module, __name__), name)
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted(set(globals()) | set(__all__))
+
+
+if TYPE_CHECKING:
+    from .downloader import Downloader, batch_download
@@ -281,36 +281,34 @@ class BatchProcessor:
         
         Args:
             extraction_df: 包含正则和LLM提取结果的DataFrame
+                           （regex_data / llm_data 列为 {'data': {...}, 'unit_multiplier': ...}）
         
         Returns:
             验证后的结果DataFrame
         """
         print(f"\n开始交叉验证...")
         
-        validated_results = []
-        
-        for _, row in tqdm(extraction_df.iterrows(), total=len(extraction_df), desc="验证进度"):
-            # 如果有正则和LLM两种结果，进行验证
-            if 'regex_data' in row and 'llm_data' in row:
-                validation = self.validator.validate(
-                    row['regex_data'],
-                    row['llm_data']
-                )
-                
-                # 合并验证结果
-                validated_row = {
-                    'filename': row['filename'],
-                    'validation_status': validation['status'],
-                    'overall_confidence': validation['overall_confidence']
-                }
-                
-                # 添加最终确定的值
-                for field, value in validation['final_data'].items():
-                    validated_row[f'final_{field}'] = value
-                
-                validated_results.append(validated_row)
-        
-        return pd.DataFrame(validated_results)
+        # 如果有正则和LLM两种结果，展开为按字段的列后整列验证
+        if extraction_df.empty or not {'regex_data', 'llm_data'} <= set(extraction_df.columns):
+            return pd.DataFrame()
+        
+        def expand(column: str):
+            results = [r if isinstance(r, dict) else {} for r in extraction_df[column]]
+            # 指定行索引：整列都没有数据时仍保持与 extraction_df 行数一致
+            data = pd.DataFrame.from_records([r.get('data') or {} for r in results],
+                                             index=range(len(extraction_df)))
+            units = [r.get('unit_multiplier', 1) for r in results]
+            return data, units
+        
+        regex_df, regex_units = expand('regex_data')
+        llm_df, llm_units = expand('llm_data')
+        validation = self.validator.validate_frame(regex_df, llm_df, regex_units, llm_units)
+        
+        # 合并验证结果
+        final_columns = [c for c in validation.columns if c.startswith('final_')]
+        validated = validation[['validation_status', 'overall_confidence'] + final_columns]
+        validated.insert(0, 'filename', extraction_df['filename'].to_numpy())
+        return validated
     
     def generate_final_report(self, results_df: pd.DataFrame, output_dir: str = "output"):
         """生成最终报告"""
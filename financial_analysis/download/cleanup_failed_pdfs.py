@@ -11,88 +11,26 @@ import os
 import shutil
 from pathlib import Path
 from typing import Dict, List, Tuple
-import pdfplumber
 import json
 from datetime import datetime
 
+try:
+    from .document_catalog import get_catalog
+except ImportError:  # 作为脚本直接运行
+    from financial_analysis.download.document_catalog import get_catalog
+
 
 def check_pdf_validity(pdf_path: Path) -> Tuple[bool, str]:
     """
     检查PDF文件是否有效
     
+    特征来自文档目录：文件未变化时不再重新打开PDF
+    
     Returns:
         (is_valid, reason)
     """
-    import warnings
-    warnings.filterwarnings('ignore')
-    
-    # 检查文件大小
-    file_size = pdf_path.stat().st_size
-    if file_size < 50 * 1024:  # 小于50KB - 很可能是错误页面
-        return False, "file_too_small"
-    
-    if file_size > 100 * 1024 * 1024:  # 大于100MB
-        return False, "file_too_large"
-    
-    # 尝试打开PDF
-    try:
-        with pdfplumber.open(pdf_path) as pdf:
-            # 检查页数
-            if len(pdf.pages) == 0:
-                return False, "no_pages"
-            
-            # 检查多页以确保是真实报告
-            pages_to_check = min(3, len(pdf.pages))
-            all_text = ""
-            
-            for i in range(pages_to_check):
-                try:
-                    page = pdf.pages[i]
-                    text = page.extract_text()
-                    if text:
-                        all_text += text + " "
-                except:
-                    pass
-            
-            # 如果完全没有文本，可能是扫描版
-            if not all_text or len(all_text.strip()) < 100:
-                return False, "no_text_scanned"
-            
-            # 检查是否是HTML错误页面内容
-            if "<!DOCTYPE" in all_text or "window.dataLayer" in all_text or "googletagmanager" in all_text:
-                return False, "html_error_page"
-            
-            # 检查财务相关关键词
-            import re
-            financial_keywords = [
-                r'资产|asset|負債|liability|收入|revenue|利润|profit|income|equity|cash',
-                r'财务|financial|報告|report|年度|annual|季度|quarter',
-                r'银行|bank|公司|company|limited|有限'
-            ]
-            
-            has_financial_terms = any(re.search(kw, all_text, re.IGNORECASE) for kw in financial_keywords)
-            
-            # 简单检查是否包含数字
-            numbers = re.findall(r'\d+', all_text)
-            has_numbers = len(numbers) >= 10  # 降低要求
-            
-            if has_financial_terms or has_numbers:
-                return True, "valid"
-            else:
-                return False, "not_financial_report"
-            
-    except Exception as e:
-        error_msg = str(e).lower()
-        if 'no /root object' in error_msg:
-            return False, "corrupted_no_root"
-        elif 'eof marker not found' in error_msg:
-            return False, "corrupted_eof"
-        elif 'timeout' in error_msg:
-            return False, "timeout_corrupted"
-        elif 'data-loss' in error_msg:
-            return False, "corrupted_data_loss"
-        else:
-            return False, "corrupted"
+    entry = get_catalog().get(pdf_path)
+    return entry['valid'], entry['reason']
 
 
 def cleanup_failed_pdfs(
@@ -154,12 +92,12 @@ def cleanup_failed_pdfs(
     invalid_files = []
     valid_files = []
     
+    # 并行分析未登记的文件，已登记且未变化的直接复用
+    entries = get_catalog().scan(pdf_files)
+    
     # 检查每个文件
-    for i, pdf_path in enumerate(pdf_files, 1):
-        if i % 100 == 0:
-            print(f"进度: {i}/{total_files} ({i/total_files*100:.1f}%)")
-        
-        is_valid, reason = check_pdf_validity(pdf_path)
+    for pdf_path, entry in entries.items():
+        is_valid, reason = entry['valid'], entry['reason']
         
         if is_valid:
             stats["valid"] += 1
@@ -240,41 +240,114 @@ class CrossValidator:
         return summary
     
     def batch_validate(self, results_df: pd.DataFrame) -> pd.DataFrame:
-        """批量验证数据框中的结果"""
-        validated_results = []
-        
-        for _, row in results_df.iterrows():
-            # 构建正则和LLM结果
-            regex_result = {
-                'data': {field: row.get(f'regex_{field}') for field in self.all_fields},
-                'unit_multiplier': row.get('regex_unit_multiplier', 1)
-            }
-            
-            llm_result = {
-                'data': {field: row.get(f'llm_{field}') for field in self.all_fields},
-                'unit_multiplier': row.get('llm_unit_multiplier', 1)
-            }
-            
-            # 验证
-            validation = self.validate(regex_result, llm_result)
-            
-            # 构建输出行
-            output_row = {
-                'filename': row.get('filename', ''),
-                'validation_status': validation['status'],
-                'overall_confidence': validation['overall_confidence'],
-                'discrepancy_count': len(validation['discrepancies'])
-            }
-            
-            # 添加最终值和置信度
+        """
+        批量验证数据框中的结果（按列向量化，与逐行 validate 的结果一致）
+
+        列: regex_{字段} / llm_{字段}，regex_unit_multiplier / llm_unit_multiplier（缺省为1），filename
+        """
+        if results_df.empty:
+            return pd.DataFrame()
+
+        def side(prefix: str) -> pd.DataFrame:
+            columns = {f'{prefix}_{field}': field for field in self.all_fields
+                       if f'{prefix}_{field}' in results_df.columns}
+            return results_df[list(columns)].rename(columns=columns)
+
+        validated = self.validate_frame(
+            side('regex'), side('llm'),
+            results_df.get('regex_unit_multiplier', 1),
+            results_df.get('llm_unit_multiplier', 1)
+        )
+        filenames = results_df['filename'].to_numpy() if 'filename' in results_df.columns else ''
+        validated.insert(0, 'filename', filenames)
+        return validated
+
+    def validate_frame(self, regex_df: pd.DataFrame, llm_df: pd.DataFrame,
+                       regex_unit: Any = 1, llm_unit: Any = 1) -> pd.DataFrame:
+        """
+        按列验证：每个字段的两种结果对齐为数组，单位转换、容差判断和差异解决整列完成
+
+        Args:
+            regex_df / llm_df: 列为字段名的提取结果（行对齐，缺失的字段可不含该列，空值为 None/NaN）
+            regex_unit / llm_unit: 单位乘数（标量或逐行序列，空值按1）
+
+        Returns:
+            validation_status, overall_confidence, discrepancy_count，
+            以及有值字段的 final_{字段} / {字段}_confidence（列顺序与逐行验证一致）
+        """
+        n = max(len(regex_df), len(llm_df))  # 一侧没有任何字段时可能是空表
+
+        def values(df: pd.DataFrame, field: str) -> np.ndarray:
+            if field not in df.columns:
+                return np.full(n, np.nan)
+            return pd.to_numeric(df[field], errors='coerce').to_numpy(dtype=float)
+
+        def units(unit: Any) -> np.ndarray:
+            unit = pd.to_numeric(pd.Series(unit, index=range(n)) if np.isscalar(unit)
+                                 else pd.Series(np.asarray(unit)), errors='coerce')
+            return unit.fillna(1).to_numpy(dtype=float)
+
+        regex_unit, llm_unit = units(regex_unit), units(llm_unit)
+        unit_issue = regex_unit != llm_unit
+
+        finals: Dict[str, np.ndarray] = {}
+        confidences: Dict[str, np.ndarray] = {}
+        discrepancy_count = np.zeros(n, dtype=int)
+        field_count = np.zeros(n, dtype=int)
+        weighted_sum = np.zeros(n)
+        total_weight = np.zeros(n)
+
+        with np.errstate(divide='ignore', invalid='ignore'):
             for field in self.all_fields:
-                if field in validation['final_data']:
-                    output_row[f'final_{field}'] = validation['final_data'][field]
-                    output_row[f'{field}_confidence'] = validation['confidence'][field]
-            
-            validated_results.append(output_row)
-        
-        return pd.DataFrame(validated_results)
+                regex_value, llm_value = values(regex_df, field), values(llm_df, field)
+                has_regex, has_llm = ~np.isnan(regex_value), ~np.isnan(llm_value)
+                both = has_regex & has_llm
+                has_value = has_regex | has_llm
+                if not has_value.any():
+                    continue
+
+                # 单位转换与相对差异
+                regex_normalized = regex_value * regex_unit
+                llm_normalized = llm_value * llm_unit
+                avg = (regex_normalized + llm_normalized) / 2
+                relative_diff = np.where(avg != 0, np.abs(regex_normalized - llm_normalized) / avg, 0)
+                consistent = both & (relative_diff <= self.tolerance)
+                discrepancy = both & ~consistent
+
+                # 差异解决（同 _resolve_discrepancy）：单位不同且相差1000倍时取较大值，否则取LLM结果
+                thousand = (regex_normalized / llm_normalized == 1000) | (llm_normalized / regex_normalized == 1000)
+                pick_regex = unit_issue & thousand & (regex_normalized > llm_normalized)
+                resolved = np.where(pick_regex, regex_normalized, llm_normalized)
+
+                # 单一来源取原值（不做单位转换），置信度 60 / 一致 95 / 差异 70
+                final = np.where(consistent, avg, np.where(discrepancy, resolved,
+                                                           np.where(has_regex, regex_value, llm_value)))
+                confidence = np.select([consistent, discrepancy, has_value], [95, 70, 60], np.nan)
+
+                finals[field] = np.where(has_value, final, np.nan)
+                confidences[field] = confidence
+                discrepancy_count += discrepancy
+                field_count += has_value
+                weight = 2 if field in self.core_fields else 1
+                weighted_sum += np.where(has_value, confidence * weight, 0)
+                total_weight += has_value * weight
+
+        status = np.where(discrepancy_count > 0, 'discrepancy',
+                          np.where(field_count < len(self.core_fields), 'partial', 'consistent'))
+        overall = np.divide(weighted_sum, total_weight, out=np.zeros(n), where=total_weight > 0)
+        columns: Dict[str, Any] = {
+            'validation_status': status,
+            'overall_confidence': overall,
+            'discrepancy_count': discrepancy_count
+        }
+
+        # 字段列按首次出现的行排列（同一行内按字段顺序），与逐行拼接的 DataFrame 一致
+        position = {field: i for i, field in enumerate(self.all_fields)}
+        for field in sorted(finals, key=lambda f: (np.argmax(~np.isnan(finals[f])), position[f])):
+            confidence = confidences[field]
+            columns[f'final_{field}'] = finals[field]
+            columns[f'{field}_confidence'] = confidence if np.isnan(confidence).any() else confidence.astype(int)
+        return pd.DataFrame(columns)
     
     def generate_report(self, validation_results: List[Dict]) -> Dict:
         """生成交叉验证报告"""
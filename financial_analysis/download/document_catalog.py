@@ -0,0 +1,439 @@
+"""
+PDF文档目录
+Persistent Document Catalog
+
+每个PDF先做字节级结构预检，通过后只打开一次，记录有效性原因、页数、文本密度、是否扫描版/混合版、
+语言、单位提示和文件大小。条目按内容哈希(sha256)存储，
+另有 路径 -> (大小, 修改时间, sha256) 索引，文件未变化时无需重新读取。
+清理、调度、策略选择和 utils --summary 共用同一份目录。
+"""
+import os
+import re
+import json
+import threading
+import warnings
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Union
+
+import pdfplumber
+from tqdm import tqdm
+
+from .hashing import file_digest
+from .pdf_triage import triage_pdf
+from .registry import DEFAULT_CACHE_DIR
+
+# 与 cleanup_failed_pdfs 一致的大小阈值
+MIN_VALID_SIZE = 50 * 1024           # 小于50KB很可能是错误页面
+MAX_VALID_SIZE = 100 * 1024 * 1024   # 大于100MB不处理
+
+# 有效性检查页数（前3页），特征采样最多页数
+VALIDITY_PAGES = 3
+SAMPLE_PAGES = 8
+
+# 平均每页少于该字符数视为扫描版（与OCR策略一致）
+SCANNED_CHARS_PER_PAGE = 50
+
+UNIT_HINT_PATTERNS = [
+    (r"in\s+thousands", 1000),
+    (r"in\s+millions", 1000000),
+    (r"千元|千港元", 1000),
+    (r"百万|百萬", 1000000),
+    (r"'000", 1000),
+]
+
+FINANCIAL_KEYWORDS = [
+    r'资产|asset|負債|liability|收入|revenue|利润|profit|income|equity|cash',
+    r'财务|financial|報告|report|年度|annual|季度|quarter',
+    r'银行|bank|公司|company|limited|有限'
+]
+
+
+def size_reason(file_size: int) -> Optional[str]:
+    """文件大小超出范围时的原因代码"""
+    if file_size < MIN_VALID_SIZE:
+        return "file_too_small"
+    if file_size > MAX_VALID_SIZE:
+        return "file_too_large"
+    return None
+
+
+def validity_reason(file_size: int, page_count: int, text: str) -> str:
+    """
+    根据文件大小、页数和前几页文本判断有效性
+
+    Returns:
+        'valid' 或 cleanup_failed_pdfs 使用的失败原因代码
+    """
+    reason = size_reason(file_size)
+    if reason:
+        return reason
+    if page_count == 0:
+        return "no_pages"
+
+    # 如果完全没有文本，可能是扫描版
+    if not text or len(text.strip()) < 100:
+        return "no_text_scanned"
+
+    # 检查是否是HTML错误页面内容
+    if "<!DOCTYPE" in text or "window.dataLayer" in text or "googletagmanager" in text:
+        return "html_error_page"
+
+    has_financial_terms = any(re.search(kw, text, re.IGNORECASE) for kw in FINANCIAL_KEYWORDS)
+    has_numbers = len(re.findall(r'\d+', text)) >= 10
+
+    if has_financial_terms or has_numbers:
+        return "valid"
+    return "not_financial_report"
+
+
+def error_reason(error: str) -> str:
+    """PDF打开失败时的原因代码"""
+    error_msg = error.lower()
+    if 'no /root object' in error_msg:
+        return "corrupted_no_root"
+    elif 'eof marker not found' in error_msg:
+        return "corrupted_eof"
+    elif 'timeout' in error_msg:
+        return "timeout_corrupted"
+    elif 'data-loss' in error_msg:
+        return "corrupted_data_loss"
+    return "corrupted"
+
+
+def detect_language(text: str) -> str:
+    """粗略判断文本语言: zh / ja / ko / pt / es / en / unknown"""
+    sample = text[:5000]
+    letters = sum(1 for ch in sample if ch.isalpha())
+    if not letters:
+        return "unknown"
+
+    kana = len(re.findall(r'[぀-ヿ]', sample))
+    hangul = len(re.findall(r'[가-힯]', sample))
+    cjk = len(re.findall(r'[一-鿿]', sample))
+
+    if kana > letters * 0.05:
+        return "ja"
+    if hangul > letters * 0.1:
+        return "ko"
+    if cjk > letters * 0.1:
+        return "zh"
+
+    lower = sample.lower()
+    if re.search(r'ção|ções|patrimônio|balanço|demonstraç', lower):
+        return "pt"
+    if re.search(r'ñ|activos|pasivos|estado de situación|ejercicio', lower):
+        return "es"
+    return "en"
+
+
+def detect_unit_hint(text: str) -> int:
+    """从文本开头检测金额单位乘数"""
+    text_sample = text[:3000].lower()
+    for pattern, multiplier in UNIT_HINT_PATTERNS:
+        if re.search(pattern, text_sample, re.IGNORECASE):
+            return multiplier
+    return 1
+
+
+def _sample_page_indexes(page_count: int) -> List[int]:
+    """前3页加均匀分布的若干页"""
+    indexes = list(range(min(VALIDITY_PAGES, page_count)))
+    extra = SAMPLE_PAGES - len(indexes)
+    remaining = page_count - VALIDITY_PAGES
+    if remaining > 0 and extra > 0:
+        step = max(1, -(-remaining // extra))
+        indexes.extend(range(VALIDITY_PAGES, page_count, step)[:extra])
+    return indexes
+
+
+def _digest_or_none(pdf_path: Path) -> Optional[str]:
+    """文件哈希（文件已消失或无法读取时为 None）"""
+    try:
+        return file_digest(pdf_path)
+    except OSError:
+        return None
+
+
+def _analyze_or_none(pdf_path: Path) -> Optional[Dict[str, Any]]:
+    """analyze_pdf（文件已消失或无法读取时为 None）"""
+    try:
+        return analyze_pdf(pdf_path)
+    except OSError:
+        return None
+
+
+def analyze_pdf(pdf_path: Union[str, Path]) -> Dict[str, Any]:
+    """
+    打开PDF一次，计算目录中记录的全部特征（模块级函数，可在子进程中执行）
+
+    Returns:
+        特征字典（不含sha256，由调用方补充）
+    """
+    warnings.filterwarnings('ignore')
+    pdf_path = Path(pdf_path)
+    file_size = pdf_path.stat().st_size
+
+    entry = {
+        'size': file_size,
+        'page_count': 0,
+        'first_page_chars': 0,
+        'text_density': 0.0,
+        'scanned': False,
+        'hybrid': False,
+        'language': 'unknown',
+        'unit_hint': 1,
+        'error': None,
+        'valid': False,
+        'reason': None,
+    }
+
+    # 字节级预检：明显损坏的文件不交给解析器
+    triage = triage_pdf(pdf_path)
+    if triage:
+        entry['error'] = f"triage: {triage}"
+        entry['reason'] = size_reason(file_size) or triage
+        return entry
+
+    try:
+        with pdfplumber.open(pdf_path) as pdf:
+            page_count = len(pdf.pages)
+            page_texts = {}
+            for i in _sample_page_indexes(page_count):
+                try:
+                    page_texts[i] = pdf.pages[i].extract_text() or ""
+                except Exception as e:
+                    page_texts[i] = ""
+                    if i == 0:
+                        # 首页无法解析：记录错误，但仍按其余页面判断有效性
+                        entry['error'] = str(e)[:200]
+    except Exception as e:
+        entry['error'] = str(e)[:200]
+        entry['reason'] = size_reason(file_size) or error_reason(str(e))
+        return entry
+
+    head_text = " ".join(page_texts[i] for i in sorted(page_texts) if i < VALIDITY_PAGES)
+    char_counts = [len(text.strip()) for text in page_texts.values()]
+    head_counts = char_counts[:min(VALIDITY_PAGES, page_count)]
+
+    entry['page_count'] = page_count
+    entry['first_page_chars'] = len(page_texts.get(0, "").strip())
+    if char_counts:
+        entry['text_density'] = round(sum(char_counts) / len(char_counts), 1)
+    if head_counts:
+        entry['scanned'] = sum(head_counts) / len(head_counts) < SCANNED_CHARS_PER_PAGE
+        # 部分页面有文本、部分页面是图片
+        entry['hybrid'] = (not entry['scanned'] and
+                           any(c < SCANNED_CHARS_PER_PAGE for c in char_counts))
+    all_text = " ".join(page_texts.values())
+    entry['language'] = detect_language(all_text)
+    entry['unit_hint'] = detect_unit_hint(head_text)
+    entry['reason'] = validity_reason(file_size, page_count, head_text)
+    entry['valid'] = entry['reason'] == "valid"
+    return entry
+
+
+class DocumentCatalog:
+    """
+    持久化的PDF特征目录
+
+    文件格式 (JSON):
+        documents: sha256 -> 特征
+        paths: 绝对路径 -> [大小, 修改时间(ns), sha256]
+    """
+
+    VERSION = 2
+
+    def __init__(self, cache_dir: str = DEFAULT_CACHE_DIR):
+        self.catalog_file = Path(cache_dir) / "document_catalog.json"
+        self.documents: Dict[str, Dict[str, Any]] = {}
+        self.paths: Dict[str, List] = {}
+        self._lock = threading.Lock()
+        self._load()
+
+    def _load(self) -> None:
+        """加载目录文件"""
+        if not self.catalog_file.exists():
+            return
+        try:
+            with open(self.catalog_file, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+            if data.get('version') == self.VERSION:
+                self.documents = data.get('documents', {})
+                self.paths = data.get('paths', {})
+        except (OSError, ValueError):
+            pass  # 目录损坏则重建
+
+    def save(self) -> None:
+        """原子写入目录文件"""
+        with self._lock:
+            data = {
+                'version': self.VERSION,
+                'updated': datetime.now().isoformat(),
+                'documents': self.documents,
+                'paths': self.paths
+            }
+            try:
+                self.catalog_file.parent.mkdir(parents=True, exist_ok=True)
+                tmp_file = self.catalog_file.with_suffix('.tmp')
+                with open(tmp_file, 'w', encoding='utf-8') as f:
+                    json.dump(data, f, ensure_ascii=False)
+                os.replace(tmp_file, self.catalog_file)
+            except OSError as e:
+                print(f"  ⚠️ 无法保存文档目录: {e}")
+
+    def lookup(self, pdf_path: Union[str, Path]) -> Optional[Dict[str, Any]]:
+        """
+        只通过 (大小, 修改时间) 查找，文件变化或未登记时返回None，不读取文件内容
+        """
+        try:
+            stat = os.stat(pdf_path)
+        except OSError:
+            return None
+        with self._lock:
+            record = self.paths.get(str(Path(pdf_path).resolve()))
+            if record and record[0] == stat.st_size and record[1] == stat.st_mtime_ns:
+                return self.documents.get(record[2])
+        return None
+
+    def hash_files(self, pdf_paths: Iterable[Path]) -> Dict[Path, str]:
+        """
+        获取文件内容哈希：(大小, 修改时间) 未变化时直接使用路径索引，
+        否则多线程重新计算并更新路径索引（不分析PDF内容）；无法读取的文件不在结果中
+        """
+        pdf_paths = [Path(p) for p in pdf_paths]
+        digests: Dict[Path, str] = {}
+        stale = []
+        with self._lock:
+            for path in pdf_paths:
+                try:
+                    stat = os.stat(path)
+                except OSError:
+                    continue
+                record = self.paths.get(str(path.resolve()))
+                if record and record[0] == stat.st_size and record[1] == stat.st_mtime_ns:
+                    digests[path] = record[2]
+                else:
+                    stale.append(path)
+
+        if stale:
+            with ThreadPoolExecutor(max_workers=8) as executor:
+                fresh = {path: sha for path, sha in zip(stale, executor.map(_digest_or_none, stale))
+                         if sha is not None}
+            with self._lock:
+                for path, sha in list(fresh.items()):
+                    try:
+                        stat = path.stat()
+                    except OSError:
+                        del fresh[path]
+                        continue
+                    self.paths[str(path.resolve())] = [stat.st_size, stat.st_mtime_ns, sha]
+            digests.update(fresh)
+
+        return {path: digests[path] for path in pdf_paths if path in digests}
+
+    def get(self, pdf_path: Union[str, Path], save: bool = True) -> Dict[str, Any]:
+        """查找单个文件，缺失时计算并登记；文件不存在或无法读取时抛出 FileNotFoundError"""
+        entry = self.scan([Path(pdf_path)], max_workers=1, show_progress=False, save=save).get(Path(pdf_path))
+        if entry is None:
+            raise FileNotFoundError(f"无法读取文件: {pdf_path}")
+        return entry
+
+    def scan(self, pdf_paths: Iterable[Path], max_workers: Optional[int] = None,
+             show_progress: bool = True, save: bool = True) -> Dict[Path, Dict[str, Any]]:
+        """
+        批量获取特征
+
+        1. (大小, 修改时间) 命中的文件直接返回
+        2. 其余文件多线程计算sha256并更新路径索引，内容已登记的直接复用
+        3. 新内容用多进程打开PDF计算特征
+
+        Returns:
+            路径 -> 特征（保持输入顺序；已消失或无法读取的文件跳过）
+        """
+        pdf_paths = [Path(p) for p in pdf_paths]
+        entries: Dict[Path, Dict[str, Any]] = {}
+        stale = []
+        for path in pdf_paths:
+            entry = self.lookup(path)
+            if entry is not None:
+                entries[path] = entry
+            else:
+                stale.append(path)
+
+        if stale:
+            digests = self.hash_files(stale)
+            stale = [path for path in stale if path in digests]
+
+            unknown: Dict[str, Path] = {}
+            for path in stale:
+                sha = digests[path]
+                if sha not in self.documents:
+                    unknown.setdefault(sha, path)
+
+            if unknown:
+                workers = max_workers or os.cpu_count() or 1
+                shas = list(unknown)
+                paths = [unknown[sha] for sha in shas]
+                if workers > 1 and len(paths) > 1:
+                    with ProcessPoolExecutor(max_workers=workers) as executor:
+                        results = executor.map(_analyze_or_none, paths, chunksize=4)
+                        if show_progress:
+                            results = tqdm(results, total=len(paths), desc="分析PDF")
+                        features = list(results)
+                else:
+                    features = [_analyze_or_none(path) for path in paths]
+                with self._lock:
+                    for sha, entry in zip(shas, features):
+                        if entry is not None:
+                            entry['sha256'] = sha
+                            self.documents[sha] = entry
+
+            for path in stale:
+                if digests[path] in self.documents:
+                    entries[path] = self.documents[digests[path]]
+
+            if save:
+                self.save()
+
+        return {path: entries[path] for path in pdf_paths if path in entries}
+
+    def summary(self, pdf_paths: Optional[Iterable[Path]] = None) -> Dict[str, Any]:
+        """汇总统计（默认为目录中全部文档）"""
+        if pdf_paths is None:
+            entries = list(self.documents.values())
+        else:
+            entries = [e for e in (self.lookup(p) for p in pdf_paths) if e is not None]
+
+        reasons: Dict[str, int] = {}
+        languages: Dict[str, int] = {}
+        for entry in entries:
+            reasons[entry['reason']] = reasons.get(entry['reason'], 0) + 1
+            languages[entry['language']] = languages.get(entry['language'], 0) + 1
+
+        return {
+            'documents': len(entries),
+            'valid': sum(1 for e in entries if e['valid']),
+            'scanned': sum(1 for e in entries if e['scanned']),
+            'hybrid': sum(1 for e in entries if e['hybrid']),
+            'total_pages': sum(e['page_count'] for e in entries),
+            'total_size_mb': sum(e['size'] for e in entries) / 1024 / 1024,
+            'reasons': reasons,
+            'languages': languages
+        }
+
+
+_catalog_lock = threading.Lock()
+_catalogs: Dict[str, DocumentCatalog] = {}
+
+
+def get_catalog(cache_dir: str = DEFAULT_CACHE_DIR) -> DocumentCatalog:
+    """获取进程内共享的文档目录"""
+    key = str(Path(cache_dir).resolve())
+    with _catalog_lock:
+        catalog = _catalogs.get(key)
+        if catalog is None:
+            catalog = DocumentCatalog(cache_dir)
+            _catalogs[key] = catalog
+        return catalog
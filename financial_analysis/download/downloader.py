@@ -3,21 +3,16 @@
 Financial Report Download Module
 """
 import os
-import csv
 import time
 import requests
 from pathlib import Path
-from typing import Dict, List, Tuple, Optional
+from typing import Callable, Dict, List, Tuple, Optional
+from collections import OrderedDict
 from concurrent.futures import ThreadPoolExecutor, as_completed
 
-
-def clean_filename(text: str) -> str:
-    """清理文件名中的特殊字符"""
-    import re
-    # 移除特殊字符
-    text = re.sub(r'[^\w\s-]', '_', str(text))
-    text = re.sub(r'[-\s]+', '_', text)
-    return text.strip('_')
+from .report_store import ReportStore, normalize_url
+from .pdf_triage import triage_pdf
+from .registry import get_registry, clean_filename, report_filename
 
 
 def download_file(url: str, output_path: Path) -> Tuple[bool, str]:
@@ -83,16 +78,23 @@ def download_reports(
     csv_path: str = "data/Company_Financial_report.csv",
     output_dir: str = "data/raw_reports", 
     max_workers: int = 5,
-    limit: Optional[int] = None
+    limit: Optional[int] = None,
+    store_dir: str = "data/report_store",
+    on_downloaded: Optional[Callable[[Path], None]] = None
 ) -> Dict:
     """
     下载财报主函数
     
+    规范化URL去重后下载，文件按内容哈希存入 store_dir，
+    output_dir 中只保留每份唯一报告的一个规范文件名链接
+    
     Args:
         csv_path: CSV数据库路径
         output_dir: 输出目录
         max_workers: 并发下载数
         limit: 限制下载数量
+        store_dir: 内容寻址存储目录
+        on_downloaded: 每个新文件下载并验证完成后的回调（流水线模式）
         
     Returns:
         下载统计
@@ -100,68 +102,103 @@ def download_reports(
     output_path = Path(output_dir)
     output_path.mkdir(parents=True, exist_ok=True)
     
-    # 读取CSV
-    reports_to_download = []
-    with open(csv_path, 'r', encoding='utf-8') as f:
-        reader = csv.DictReader(f)
-        for row in reader:
-            if row.get('Financial Report(Y/N)') == 'Y' and row.get('Report_link'):
-                url = row['Report_link'].strip()
-                if url and not url.startswith('#') and url != 'N/A':
-                    reports_to_download.append({
-                        'company': row['name'],
-                        'year': row['Fiscal_year'],
-                        'quarter': row.get('Quarter', ''),
-                        'url': url
-                    })
+    # 读取登记表
+    reports_to_download = [
+        {
+            'company': row['company'],
+            'year': row['fiscal_year'],
+            'quarter': row['quarter'],
+            'url': row['url'],
+            'filename': row['filename']
+        }
+        for row in get_registry(csv_path).reports()
+    ]
     
     if limit:
         reports_to_download = reports_to_download[:limit]
     
     print(f"Found {len(reports_to_download)} reports to download")
     
+    # 按规范化URL分组，等价链接只下载一次
+    store = ReportStore(store_dir)
+    url_groups = OrderedDict()
+    for report in reports_to_download:
+        url_groups.setdefault(normalize_url(report['url']), []).append(report)
+    
+    duplicate_rows = len(reports_to_download) - len(url_groups)
+    if duplicate_rows:
+        print(f"URL de-duplication: {duplicate_rows} rows share a link with another row")
+    
     # 并发下载
     downloaded = 0
     failed = 0
+    deduplicated = duplicate_rows
+    
+    def fetch(report: Dict) -> Tuple[bool, str, Optional[str], bool]:
+        """下载到临时文件、验证并放入存储"""
+        tmp_path = store.new_temp_path(report['filename'])
+        success, message = download_file(report['url'], tmp_path)
+        if not success:
+            tmp_path.unlink(missing_ok=True)
+            return False, message, None, False
+        reason = triage_pdf(tmp_path)
+        if reason:
+            tmp_path.unlink(missing_ok=True)
+            return False, f"Invalid PDF ({reason})", None, False
+        sha256, is_new = store.ingest(tmp_path, report['url'], report['filename'])
+        return True, "Success", sha256, is_new
     
     with ThreadPoolExecutor(max_workers=max_workers) as executor:
-        future_to_report = {}
+        future_to_group = {}
         
-        for report in reports_to_download:
-            # 生成文件名
-            company = clean_filename(report['company'])
-            year = str(report['year']).replace('/', '_')
-            quarter = report['quarter']
+        for normalized, group in url_groups.items():
+            primary = group[0]
             
-            if quarter and quarter.strip() not in ['', 'None', 'nan']:
-                filename = f"{company}_{year}_{clean_filename(quarter)}.pdf"
-            else:
-                filename = f"{company}_{year}_Annual.pdf"
+            # 已存储过的链接：只登记别名
+            sha256 = store.lookup_url(primary['url'])
+            if sha256:
+                for report in group:
+                    store.add_alias(sha256, report['url'], report['filename'])
+                store.materialize(sha256, output_path)
+                continue
             
-            output_file = output_path / filename
+            # 兼容旧目录：规范文件已存在则跳过
+            if (output_path / primary['filename']).exists():
+                continue
             
-            # 检查是否已存在
-            if not output_file.exists():
-                future = executor.submit(download_file, report['url'], output_file)
-                future_to_report[future] = (report, output_file)
+            future = executor.submit(fetch, primary)
+            future_to_group[future] = group
         
         # 处理结果
-        for future in as_completed(future_to_report):
-            report, output_file = future_to_report[future]
-            success, message = future.result()
+        for future in as_completed(future_to_group):
+            group = future_to_group[future]
+            primary = group[0]
+            success, message, sha256, is_new = future.result()
             
             if success:
-                downloaded += 1
-                print(f"✓ Downloaded: {output_file.name}")
+                for report in group[1:]:
+                    store.add_alias(sha256, report['url'], report['filename'])
+                output_file = store.materialize(sha256, output_path)
+                if is_new:
+                    downloaded += 1
+                    print(f"✓ Downloaded: {output_file.name}")
+                    if on_downloaded:
+                        on_downloaded(output_file)
+                else:
+                    deduplicated += 1
+                    print(f"= Duplicate content: {primary['filename']} -> {store.canonical_name(sha256)}")
             else:
                 failed += 1
-                print(f"✗ Failed: {report['company']} - {message}")
+                print(f"✗ Failed: {primary['company']} - {message}")
+    
+    store.save()
     
     # 统计
     stats = {
         'total': len(reports_to_download),
         'downloaded': downloaded,
         'failed': failed,
+        'deduplicated': deduplicated,
         'success_rate': downloaded / len(reports_to_download) * 100 if reports_to_download else 0
     }
     
@@ -170,6 +207,7 @@ def download_reports(
     print(f"Total: {stats['total']}")
     print(f"Downloaded: {stats['downloaded']}")
     print(f"Failed: {stats['failed']}")
+    print(f"Deduplicated: {stats['deduplicated']}")
     print(f"Success rate: {stats['success_rate']:.1f}%")
     
     return stats
\ No newline at end of file
@@ -0,0 +1,120 @@
+"""
+文件哈希工具
+File Hashing Utilities
+
+为内容寻址存储和重复文件检测提供统一的哈希计算
+"""
+import hashlib
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Callable, Dict, List, Union
+
+# 大缓冲区读取，减少系统调用次数
+HASH_BUFFER_SIZE = 1024 * 1024  # 1MB
+
+
+def file_digest(file_path: Union[str, Path],
+                algorithm: str = 'sha256',
+                buffer_size: int = HASH_BUFFER_SIZE) -> str:
+    """
+    计算整个文件的哈希值
+
+    Args:
+        file_path: 文件路径
+        algorithm: 哈希算法（hashlib支持的名称）
+        buffer_size: 读取缓冲区大小
+
+    Returns:
+        十六进制哈希字符串
+    """
+    hasher = hashlib.new(algorithm)
+    buffer = bytearray(buffer_size)
+    view = memoryview(buffer)
+
+    with open(file_path, 'rb', buffering=0) as f:
+        while True:
+            n = f.readinto(buffer)
+            if not n:
+                break
+            hasher.update(view[:n])
+
+    return hasher.hexdigest()
+
+
+# 部分哈希读取的头尾大小
+PARTIAL_HASH_SIZE = 64 * 1024  # 64KB
+
+
+def partial_digest(file_path: Union[str, Path],
+                   chunk_size: int = PARTIAL_HASH_SIZE,
+                   algorithm: str = 'sha256') -> str:
+    """
+    只读取文件头尾各 chunk_size 字节计算哈希
+
+    用于快速排除大小相同但内容不同的文件
+    """
+    hasher = hashlib.new(algorithm)
+    with open(file_path, 'rb') as f:
+        size = f.seek(0, 2)
+        f.seek(0)
+        hasher.update(f.read(chunk_size))
+        if size > chunk_size:
+            f.seek(max(size - chunk_size, chunk_size))
+            hasher.update(f.read(chunk_size))
+        hasher.update(str(size).encode())
+    return hasher.hexdigest()
+
+
+def find_duplicate_groups(file_sizes: Dict[Path, int],
+                          max_workers: int = 8) -> List[List[Path]]:
+    """
+    分阶段查找内容完全相同的文件
+
+    1. 按文件大小分组，大小唯一的文件不可能重复
+    2. 大小相同的文件计算头尾部分哈希
+    3. 部分哈希仍相同的才计算全文哈希
+
+    Args:
+        file_sizes: 文件路径 -> 文件大小（保持调用方的顺序）
+        max_workers: 哈希计算线程数（I/O密集）
+
+    Returns:
+        重复文件组列表，每组按输入顺序排列，第一个为保留文件
+    """
+    order = {path: i for i, path in enumerate(file_sizes)}
+
+    # 阶段1：按大小分组
+    by_size: Dict[int, List[Path]] = defaultdict(list)
+    for path, size in file_sizes.items():
+        by_size[size].append(path)
+    candidates = [group for group in by_size.values() if len(group) > 1]
+    if not candidates:
+        return []
+
+    # 阶段2：部分哈希
+    stage2 = _regroup(candidates, partial_digest, max_workers)
+
+    # 阶段3：全文哈希
+    stage3 = _regroup(stage2, file_digest, max_workers)
+
+    return sorted(
+        (sorted(group, key=order.get) for group in stage3),
+        key=lambda group: order[group[0]]
+    )
+
+
+def _regroup(groups: List[List[Path]], digest_func: Callable[[Path], str],
+             max_workers: int) -> List[List[Path]]:
+    """用给定的哈希函数细分候选组，只保留仍有碰撞的组"""
+    paths = [path for group in groups for path in group]
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        digests = dict(zip(paths, executor.map(digest_func, paths)))
+
+    result = []
+    for group in groups:
+        by_digest: Dict[str, List[Path]] = defaultdict(list)
+        for path in group:
+            by_digest[digests[path]].append(path)
+        result.extend(g for g in by_digest.values() if len(g) > 1)
+    return result
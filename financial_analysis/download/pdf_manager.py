@@ -22,6 +22,33 @@ from datetime import datetime
 from tqdm import tqdm
 import time
 
+from .report_store import unwrap_viewer_url
+from .hashing import file_digest, find_duplicate_groups
+from .document_catalog import get_catalog
+from .registry import get_registry
+
+
+def pdf_status(entry: Dict) -> str:
+    """
+    根据文档目录条目判断PDF文件状态
+    
+    Returns:
+        'valid' / 'empty' / 'corrupted'
+    """
+    # 检查文件大小
+    if entry['size'] < 1024:  # 小于1KB
+        return 'empty'
+    
+    # 无法打开或首页无法解析
+    if entry['error']:
+        return 'corrupted'
+    
+    if entry['page_count'] == 0:
+        return 'empty'
+    
+    # 首页有文本才算有效，否则可能是扫描版或空白页
+    return 'valid' if entry['first_page_chars'] > 10 else 'empty'
+
 
 class PDFManager:
     """PDF文件管理器"""
@@ -49,10 +76,17 @@ class PDFManager:
             'download_failed': 0
         }
     
-    def scan_pdf_files(self) -> Dict[str, List[Path]]:
+    def scan_pdf_files(self, max_workers: Optional[int] = None) -> Dict[str, List[Path]]:
         """
         扫描所有PDF文件并分类
         
+        PDF特征来自文档目录，未登记的文件在多个进程中并行分析；
+        重复检测按 文件大小 -> 头尾部分哈希 -> 全文哈希 分阶段进行，
+        只有大小相同的文件才需要读取内容
+        
+        Args:
+            max_workers: 分析进程数（默认为CPU核数）
+        
         Returns:
             分类后的文件字典
         """
@@ -72,22 +106,15 @@ class PDFManager:
             'duplicates': []
         }
         
-        # 用于检测重复文件
-        file_hashes = {}
+        # 从文档目录获取特征（未登记的文件多进程分析）
+        entries = get_catalog().scan(all_pdfs, max_workers=max_workers)
+        all_pdfs = list(entries)  # 扫描期间消失的文件不再处理
+        statuses = [pdf_status(entries[pdf_path]) for pdf_path in all_pdfs]
         
-        for pdf_path in tqdm(all_pdfs, desc="扫描文件"):
-            category = self._check_pdf_status(pdf_path)
-            
+        valid_sizes = {}
+        for pdf_path, category in zip(all_pdfs, statuses):
             if category == 'valid':
-                # 检查是否重复
-                file_hash = self._calculate_file_hash(pdf_path)
-                if file_hash in file_hashes:
-                    categorized['duplicates'].append((pdf_path, file_hashes[file_hash]))
-                    self.stats['duplicate_files'] += 1
-                else:
-                    categorized['valid'].append(pdf_path)
-                    file_hashes[file_hash] = pdf_path
-                    self.stats['valid_files'] += 1
+                valid_sizes[pdf_path] = pdf_path.stat().st_size
             elif category == 'empty':
                 categorized['empty'].append(pdf_path)
                 self.stats['empty_files'] += 1
@@ -95,6 +122,18 @@ class PDFManager:
                 categorized['corrupted'].append(pdf_path)
                 self.stats['corrupted_files'] += 1
         
+        # 分阶段检测重复文件
+        duplicates = set()
+        for group in find_duplicate_groups(valid_sizes):
+            original = group[0]
+            for dup_file in group[1:]:
+                categorized['duplicates'].append((dup_file, original))
+                duplicates.add(dup_file)
+        self.stats['duplicate_files'] += len(duplicates)
+        
+        categorized['valid'] = [p for p in valid_sizes if p not in duplicates]
+        self.stats['valid_files'] += len(categorized['valid'])
+        
         # 打印统计
         print(f"\n扫描结果:")
         print(f"  有效文件: {self.stats['valid_files']}")
@@ -106,37 +145,11 @@ class PDFManager:
     
     def _check_pdf_status(self, pdf_path: Path) -> str:
         """检查PDF文件状态"""
-        try:
-            # 检查文件大小
-            if pdf_path.stat().st_size < 1024:  # 小于1KB
-                return 'empty'
-            
-            # 尝试打开PDF
-            with pdfplumber.open(pdf_path) as pdf:
-                if len(pdf.pages) == 0:
-                    return 'empty'
-                
-                # 尝试提取第一页文本
-                try:
-                    text = pdf.pages[0].extract_text()
-                    if text and len(text.strip()) > 10:
-                        return 'valid'
-                    else:
-                        # 可能是扫描版或空白页
-                        return 'empty'
-                except:
-                    return 'corrupted'
-                    
-        except Exception as e:
-            return 'corrupted'
+        return pdf_status(get_catalog().get(pdf_path))
     
     def _calculate_file_hash(self, file_path: Path) -> str:
         """计算文件哈希值"""
-        hash_md5 = hashlib.md5()
-        with open(file_path, "rb") as f:
-            for chunk in iter(lambda: f.read(4096), b""):
-                hash_md5.update(chunk)
-        return hash_md5.hexdigest()
+        return file_digest(file_path, algorithm='md5')
     
     def clean_files(self, categorized: Dict[str, List[Path]], 
                    move_corrupted: bool = True,
@@ -236,28 +249,14 @@ class PDFManager:
     def _load_url_mapping(self, csv_path: str) -> Dict[str, str]:
         """加载文件名到URL的映射"""
         try:
-            df = pd.read_csv(csv_path)
-            mapping = {}
-            
-            for _, row in df.iterrows():
-                if pd.notna(row.get('Report_URL')):
-                    # 生成标准化的文件名
-                    company = row.get('Company', '').replace(' ', '_').replace('/', '_')
-                    year = str(row.get('Year', ''))
-                    report_type = row.get('Report_Type', '').replace(' ', '_')
-                    
-                    filename = f"{company}_{year}_{report_type}.pdf"
-                    mapping[filename.lower()] = row['Report_URL']
-            
-            return mapping
-            
+            return get_registry(csv_path).url_mapping()
         except Exception as e:
             print(f"加载URL映射失败: {str(e)}")
             return {}
     
     def _find_url_for_file(self, filename: str, url_mapping: Dict[str, str]) -> Optional[str]:
         """查找文件对应的URL"""
-        # 直接匹配
+        # 直接匹配（O(1)索引）
         if filename.lower() in url_mapping:
             return url_mapping[filename.lower()]
         
@@ -299,13 +298,7 @@ class PDFManager:
     
     def _extract_pdf_url(self, url: str) -> str:
         """从viewer URL提取实际PDF URL"""
-        if 'pdf-viewer' in url and 'file=' in url:
-            parsed = urlparse(url)
-            params = parse_qs(parsed.query)
-            if 'file' in params:
-                pdf_url = unquote(params['file'][0])
-                return pdf_url
-        return url
+        return unwrap_viewer_url(url)
     
     def generate_inventory_report(self, output_dir: str = "output") -> None:
         """生成文件清单报告"""
@@ -0,0 +1,68 @@
+"""
+PDF结构快速预检
+Fast Structural PDF Triage
+
+只读取文件头和有限长度的文件尾，检查 %PDF 头、%%EOF、startxref
+以及 trailer 中的 /Root，在任何解析器打开文件之前排除截断下载、
+另存为 .pdf 的HTML页面等明显损坏的文件。
+返回的原因代码与 cleanup_failed_pdfs 一致。
+"""
+import re
+from pathlib import Path
+from typing import Optional, Union
+
+HEAD_SIZE = 1024            # %PDF 头必须出现在前1KB内
+TAIL_SIZE = 16 * 1024       # 文件尾读取长度
+XREF_WINDOW = 64 * 1024     # startxref 指向位置的读取长度（xref流的字典）
+
+_HTML_MARKERS = (b'<!doctype', b'<html', b'<head', b'<script', b'<body')
+_STARTXREF_RE = re.compile(rb'startxref\s+(\d+)')
+
+
+def triage_pdf(pdf_path: Union[str, Path]) -> Optional[str]:
+    """
+    字节级结构检查
+
+    Returns:
+        None 表示结构正常（仍需解析器进一步判断），
+        否则返回失败原因代码:
+        file_too_small / html_error_page / corrupted_eof / corrupted_no_root / corrupted
+    """
+    try:
+        with open(pdf_path, 'rb') as f:
+            size = f.seek(0, 2)
+            if size == 0:
+                return "file_too_small"
+
+            f.seek(0)
+            head = f.read(HEAD_SIZE)
+            if b'%PDF-' not in head:
+                lower = head.lower()
+                if any(marker in lower for marker in _HTML_MARKERS):
+                    return "html_error_page"
+                return "corrupted"
+
+            tail_start = max(0, size - TAIL_SIZE)
+            f.seek(tail_start)
+            tail = f.read()
+
+            # 截断的下载没有结束标记
+            if b'%%EOF' not in tail:
+                return "corrupted_eof"
+
+            matches = _STARTXREF_RE.findall(tail)
+            if not matches:
+                return "corrupted"
+            xref_offset = int(matches[-1])
+            if xref_offset >= size:
+                return "corrupted"
+
+            # 传统trailer在文件尾；xref流的/Root在startxref指向的对象中
+            if b'/Root' in tail:
+                return None
+            f.seek(xref_offset)
+            if b'/Root' in f.read(XREF_WINDOW):
+                return None
+            return "corrupted_no_root"
+    except OSError:
+        return "corrupted"
@@ -5,20 +5,17 @@ PDF Utility Functions Module
 import shutil
 from pathlib import Path
 from typing import Dict
-import pdfplumber
+
+from .document_catalog import get_catalog
 
 
 def check_pdf_integrity(pdf_path: Path) -> bool:
-    """检查PDF文件完整性"""
+    """检查PDF文件完整性（能打开且第一页可读取）"""
     try:
-        with pdfplumber.open(pdf_path) as pdf:
-            # 尝试读取第一页
-            if len(pdf.pages) > 0:
-                pdf.pages[0].extract_text()
-                return True
-    except:
+        entry = get_catalog().get(pdf_path)
+    except OSError:
         return False
-    return False
+    return entry['error'] is None and entry['page_count'] > 0
 
 
 def clean_pdfs(pdf_dir: str = "data/raw_reports",
@@ -43,8 +40,10 @@ def clean_pdfs(pdf_dir: str = "data/raw_reports",
     corrupted = []
     valid = []
     
-    for pdf_file in pdf_files:
-        if check_pdf_integrity(pdf_file):
+    entries = get_catalog().scan(pdf_files)
+    
+    for pdf_file, entry in entries.items():
+        if entry['error'] is None and entry['page_count'] > 0:
             valid.append(pdf_file.name)
         else:
             corrupted.append(pdf_file.name)
@@ -87,6 +86,26 @@ def generate_summary(output_dir: str = "output") -> None:
         print(f"  PDF files: {pdf_count}")
         print(f"  HTML files: {html_count}")
         print(f"  Total: {pdf_count + html_count}")
+        
+        # 文档目录统计（首次运行时分析，之后直接复用）
+        pdf_files = list(data_dir.glob("*.pdf"))
+        if pdf_files:
+            catalog = get_catalog()
+            catalog.scan(pdf_files)
+            summary = catalog.summary(pdf_files)
+            print(f"\nDocument catalog:")
+            print(f"  Valid: {summary['valid']}/{summary['documents']}")
+            print(f"  Total pages: {summary['total_pages']}")
+            print(f"  Total size: {summary['total_size_mb']:.1f} MB")
+            print(f"  Scanned: {summary['scanned']}  Hybrid: {summary['hybrid']}")
+            languages = ", ".join(f"{k}={v}" for k, v in
+                                  sorted(summary['languages'].items(), key=lambda x: -x[1]))
+            print(f"  Languages: {languages}")
+            invalid = {k: v for k, v in summary['reasons'].items() if k != 'valid'}
+            if invalid:
+                print(f"  Invalid reasons:")
+                for reason, count in sorted(invalid.items(), key=lambda x: -x[1]):
+                    print(f"    {reason}: {count}")
     
     # 提取结果统计
     print(f"\nExtraction results:")
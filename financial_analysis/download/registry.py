@@ -0,0 +1,237 @@
+"""
+公司财报登记表
+Company Report Registry
+
+Company_Financial_report.csv 只解析一次，存为紧凑的列式结构，
+并建立按公司、财年、规范化URL和生成文件名的索引。
+解析结果以二进制形式缓存，CSV修改时间变化后自动失效。
+下载、分析、PDF管理和提取器共享同一个实例。
+"""
+import re
+import csv
+import os
+import pickle
+import threading
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple, Any
+
+from .report_store import normalize_url
+
+DEFAULT_CSV_PATH = "data/Company_Financial_report.csv"
+DEFAULT_CACHE_DIR = "output/cache"
+
+# CSV列 -> 登记表列
+CSV_COLUMNS = {
+    'new_id': 'company_id',
+    'name': 'company',
+    'website': 'website',
+    'Financial Report(Y/N)': 'has_report',
+    'Fiscal_year': 'fiscal_year',
+    'Quarter': 'quarter',
+    'Report_link': 'url',
+}
+
+
+def clean_filename(text: str) -> str:
+    """清理文件名中的特殊字符"""
+    # 移除特殊字符
+    text = re.sub(r'[^\w\s-]', '_', str(text))
+    text = re.sub(r'[-\s]+', '_', text)
+    return text.strip('_')
+
+
+def report_filename(company: str, year, quarter: Optional[str]) -> str:
+    """生成财报的可读文件名: company_year_quarter.pdf"""
+    company = clean_filename(company)
+    year = str(year).replace('/', '_')
+
+    if quarter and quarter.strip() not in ['', 'None', 'nan']:
+        return f"{company}_{year}_{clean_filename(quarter)}.pdf"
+    return f"{company}_{year}_Annual.pdf"
+
+
+def _is_valid_link(url: str) -> bool:
+    """判断下载链接是否可用"""
+    return bool(url) and not url.startswith('#') and url != 'N/A'
+
+
+class CompanyRegistry:
+    """
+    列式财报登记表
+
+    每列是一个元组，行号即下标；索引把键映射到行号元组，
+    文件名和URL查找都是O(1)
+    """
+
+    CACHE_VERSION = 1
+    COLUMNS = ('company_id', 'company', 'website', 'has_report', 'fiscal_year',
+               'quarter', 'url', 'normalized_url', 'filename')
+
+    def __init__(self, columns: Dict[str, Tuple], source: Tuple = ()):
+        self.columns = columns
+        self.source = source
+        self.size = len(columns['company'])
+        self._build_indexes()
+
+    # ------------------------------------------------------------------
+    # 构建
+    # ------------------------------------------------------------------
+    @classmethod
+    def from_csv(cls, csv_path: str = DEFAULT_CSV_PATH) -> 'CompanyRegistry':
+        """解析CSV构建登记表"""
+        data = {name: [] for name in cls.COLUMNS}
+        intern = {}  # 重复字符串共享同一对象
+
+        with open(csv_path, 'r', encoding='utf-8') as f:
+            for row in csv.DictReader(f):
+                values = {
+                    target: (row.get(column) or '').strip()
+                    for column, target in CSV_COLUMNS.items()
+                }
+                url = values['url']
+                values['normalized_url'] = normalize_url(url) if _is_valid_link(url) else ''
+                values['filename'] = (
+                    report_filename(values['company'], values['fiscal_year'], values['quarter'])
+                    if values['company'] else ''
+                )
+                for name in cls.COLUMNS:
+                    value = values[name]
+                    data[name].append(intern.setdefault(value, value))
+
+        columns = {name: tuple(values) for name, values in data.items()}
+        return cls(columns, source=_source_signature(csv_path))
+
+    @classmethod
+    def load(cls, csv_path: str = DEFAULT_CSV_PATH,
+             cache_dir: str = DEFAULT_CACHE_DIR) -> 'CompanyRegistry':
+        """
+        加载登记表：优先使用二进制缓存，CSV变化后重新解析
+        """
+        source = _source_signature(csv_path)
+        cache_file = Path(cache_dir) / "company_registry.pickle"
+
+        if cache_file.exists():
+            try:
+                with open(cache_file, 'rb') as f:
+                    payload = pickle.load(f)
+                if payload.get('version') == cls.CACHE_VERSION and tuple(payload.get('source', ())) == source:
+                    return cls(payload['columns'], source=source)
+            except Exception:
+                pass  # 缓存损坏则重新解析
+
+        registry = cls.from_csv(csv_path)
+        try:
+            cache_file.parent.mkdir(parents=True, exist_ok=True)
+            tmp_file = cache_file.with_suffix('.tmp')
+            with open(tmp_file, 'wb') as f:
+                pickle.dump({
+                    'version': cls.CACHE_VERSION,
+                    'source': source,
+                    'columns': registry.columns
+                }, f, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(tmp_file, cache_file)
+        except OSError:
+            pass  # 只读环境下不写缓存
+        return registry
+
+    def _build_indexes(self) -> None:
+        """建立索引"""
+        by_company: Dict[str, List[int]] = {}
+        by_year: Dict[str, List[int]] = {}
+        by_url: Dict[str, List[int]] = {}
+        self.by_filename: Dict[str, int] = {}
+
+        for i in range(self.size):
+            by_company.setdefault(self.columns['company'][i], []).append(i)
+            by_year.setdefault(self.columns['fiscal_year'][i], []).append(i)
+            normalized = self.columns['normalized_url'][i]
+            if normalized:
+                by_url.setdefault(normalized, []).append(i)
+            filename = self.columns['filename'][i]
+            if filename:
+                # 同名文件以第一行为准（与下载器一致）
+                self.by_filename.setdefault(filename.lower(), i)
+
+        self.by_company = {k: tuple(v) for k, v in by_company.items()}
+        self.by_year = {k: tuple(v) for k, v in by_year.items()}
+        self.by_url = {k: tuple(v) for k, v in by_url.items()}
+
+    # ------------------------------------------------------------------
+    # 查询
+    # ------------------------------------------------------------------
+    def row(self, row_id: int) -> Dict[str, Any]:
+        """按行号取一行"""
+        return {name: self.columns[name][row_id] for name in self.COLUMNS}
+
+    def rows(self, row_ids) -> List[Dict[str, Any]]:
+        """按行号列表取多行"""
+        return [self.row(i) for i in row_ids]
+
+    def find_by_filename(self, filename: str) -> Optional[Dict[str, Any]]:
+        """生成的文件名 -> 行"""
+        row_id = self.by_filename.get(Path(filename).name.lower())
+        return self.row(row_id) if row_id is not None else None
+
+    def find_by_url(self, url: str) -> List[Dict[str, Any]]:
+        """URL（规范化后比较） -> 行列表"""
+        return self.rows(self.by_url.get(normalize_url(url), ()))
+
+    def company_rows(self, company: str) -> List[Dict[str, Any]]:
+        """某公司的所有行"""
+        return self.rows(self.by_company.get(company, ()))
+
+    def year_rows(self, fiscal_year: str) -> List[Dict[str, Any]]:
+        """某财年的所有行"""
+        return self.rows(self.by_year.get(str(fiscal_year), ()))
+
+    def companies(self, with_report: bool = True) -> List[str]:
+        """公司列表"""
+        if not with_report:
+            return [c for c in self.by_company if c]
+        has_report = self.columns['has_report']
+        return [
+            company for company, row_ids in self.by_company.items()
+            if company and any(has_report[i] == 'Y' for i in row_ids)
+        ]
+
+    def reports(self) -> List[Dict[str, Any]]:
+        """所有可下载的财报（有报告且链接有效），按CSV顺序"""
+        has_report = self.columns['has_report']
+        urls = self.columns['url']
+        return [
+            self.row(i) for i in range(self.size)
+            if has_report[i] == 'Y' and _is_valid_link(urls[i])
+        ]
+
+    def url_mapping(self) -> Dict[str, str]:
+        """文件名(小写) -> 下载链接"""
+        urls = self.columns['url']
+        return {
+            filename: urls[row_id] for filename, row_id in self.by_filename.items()
+            if _is_valid_link(urls[row_id])
+        }
+
+
+def _source_signature(csv_path: str) -> Tuple:
+    """CSV的缓存失效依据：绝对路径、修改时间、大小"""
+    stat = os.stat(csv_path)
+    return (str(Path(csv_path).resolve()), stat.st_mtime_ns, stat.st_size)
+
+
+_registry_lock = threading.Lock()
+_registries: Dict[str, CompanyRegistry] = {}
+
+
+def get_registry(csv_path: str = DEFAULT_CSV_PATH) -> CompanyRegistry:
+    """
+    获取进程内共享的登记表
+
+    同一进程内只加载一次；CSV被修改后下次调用自动重新加载
+    """
+    key = str(Path(csv_path).resolve())
+    with _registry_lock:
+        registry = _registries.get(key)
+        if registry is None or registry.source != _source_signature(csv_path):
+            registry = CompanyRegistry.load(csv_path)
+            _registries[key] = registry
+        return registry
@@ -0,0 +1,231 @@
+"""
+内容寻址财报存储
+Content-Addressed Report Store
+
+财报按内容哈希(SHA-256)存储为唯一的blob，
+可读的 company_year_quarter.pdf 文件名只是指向blob的链接或清单条目。
+同一份报告无论出现在CSV的多少行中，只下载、验证和提取一次。
+"""
+import os
+import json
+import shutil
+import threading
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+from urllib.parse import urlparse, urlunparse, parse_qs, parse_qsl, unquote, urlencode
+
+from .hashing import file_digest
+
+# 不影响文档内容的跟踪参数
+TRACKING_PARAMS = {'utm_source', 'utm_medium', 'utm_campaign', 'utm_term',
+                   'utm_content', 'fbclid', 'gclid', 'spm'}
+
+DEFAULT_PORTS = {'http': 80, 'https': 443}
+
+
+def unwrap_viewer_url(url: str) -> str:
+    """从PDF viewer URL中提取实际的PDF地址"""
+    if 'pdf-viewer' in url and 'file=' in url:
+        params = parse_qs(urlparse(url).query)
+        if 'file' in params:
+            return unquote(params['file'][0])
+    return url
+
+
+def normalize_url(url: str) -> str:
+    """
+    规范化下载链接，使等价的URL得到相同的键
+
+    - 解开 pdf-viewer 包装
+    - scheme/host 转小写，去掉默认端口
+    - 去掉片段(#...)和跟踪参数，查询参数排序
+    """
+    url = unwrap_viewer_url(url.strip())
+    parsed = urlparse(url)
+
+    scheme = parsed.scheme.lower()
+    host = (parsed.hostname or '').lower()
+    netloc = host
+    if parsed.port and parsed.port != DEFAULT_PORTS.get(scheme):
+        netloc = f"{host}:{parsed.port}"
+
+    path = parsed.path or '/'
+    if len(path) > 1 and path.endswith('/'):
+        path = path.rstrip('/')
+
+    query_items = [
+        (key, value) for key, value in parse_qsl(parsed.query, keep_blank_values=True)
+        if key.lower() not in TRACKING_PARAMS
+    ]
+    query = urlencode(sorted(query_items))
+
+    return urlunparse((scheme, netloc, path, '', query, ''))
+
+
+def link_or_copy(source: Path, target: Path) -> str:
+    """
+    在目标位置创建指向source的链接
+
+    依次尝试硬链接、符号链接，最后退化为复制
+
+    Returns:
+        使用的方式: 'hardlink' / 'symlink' / 'copy'
+    """
+    if target.exists() or target.is_symlink():
+        target.unlink()
+    try:
+        os.link(source, target)
+        return 'hardlink'
+    except OSError:
+        pass
+    try:
+        os.symlink(source.resolve(), target)
+        return 'symlink'
+    except OSError:
+        shutil.copy2(source, target)
+        return 'copy'
+
+
+class ReportStore:
+    """
+    内容寻址财报存储
+
+    清单结构 (manifest.json):
+        blobs: sha256 -> {size, path, canonical, urls}
+        urls:  规范化URL -> sha256
+        files: 可读文件名 -> {sha256, url, canonical}
+    """
+
+    MANIFEST_VERSION = 1
+
+    def __init__(self, store_dir: str = "data/report_store"):
+        self.store_dir = Path(store_dir)
+        self.blob_dir = self.store_dir / "blobs"
+        self.tmp_dir = self.store_dir / "tmp"
+        self.manifest_file = self.store_dir / "manifest.json"
+
+        for dir_path in [self.blob_dir, self.tmp_dir]:
+            dir_path.mkdir(parents=True, exist_ok=True)
+
+        self._lock = threading.Lock()
+        self.manifest = self._load_manifest()
+
+    def _load_manifest(self) -> Dict:
+        """加载清单"""
+        if self.manifest_file.exists():
+            with open(self.manifest_file, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        return {
+            "version": self.MANIFEST_VERSION,
+            "blobs": {},
+            "urls": {},
+            "files": {}
+        }
+
+    def save(self) -> None:
+        """原子写入清单"""
+        with self._lock:
+            tmp_file = self.manifest_file.with_suffix('.json.tmp')
+            with open(tmp_file, 'w', encoding='utf-8') as f:
+                json.dump(self.manifest, f, ensure_ascii=False, indent=2)
+            os.replace(tmp_file, self.manifest_file)
+
+    def blob_path(self, sha256: str) -> Path:
+        """blob的存储路径（按前两位分目录）"""
+        return self.blob_dir / sha256[:2] / f"{sha256}.pdf"
+
+    def lookup_url(self, url: str) -> Optional[str]:
+        """按规范化URL查找已存储的blob哈希"""
+        sha256 = self.manifest["urls"].get(normalize_url(url))
+        if sha256 and self.blob_path(sha256).exists():
+            return sha256
+        return None
+
+    def canonical_name(self, sha256: str) -> Optional[str]:
+        """blob对应的规范文件名（第一个指向它的可读文件名）"""
+        blob = self.manifest["blobs"].get(sha256)
+        return blob.get("canonical") if blob else None
+
+    def new_temp_path(self, filename: str) -> Path:
+        """为下载中的文件分配临时路径"""
+        return self.tmp_dir / f"{threading.get_ident()}_{filename}.part"
+
+    def ingest(self, tmp_path: Path, url: str, filename: str) -> Tuple[str, bool]:
+        """
+        将下载完成的临时文件放入存储
+
+        Args:
+            tmp_path: 已下载的临时文件
+            url: 原始下载链接
+            filename: 可读文件名
+
+        Returns:
+            (sha256, 是否为新内容)
+        """
+        sha256 = file_digest(tmp_path)
+        blob_path = self.blob_path(sha256)
+
+        with self._lock:
+            is_new = sha256 not in self.manifest["blobs"] or not blob_path.exists()
+            if is_new:
+                blob_path.parent.mkdir(parents=True, exist_ok=True)
+                os.replace(tmp_path, blob_path)
+                self.manifest["blobs"][sha256] = {
+                    "size": blob_path.stat().st_size,
+                    "path": str(blob_path.relative_to(self.store_dir)),
+                    "canonical": filename,
+                    "urls": []
+                }
+            else:
+                # 内容重复（不同URL指向同一文件）
+                tmp_path.unlink()
+
+            self._register(sha256, url, filename)
+
+        return sha256, is_new
+
+    def add_alias(self, sha256: str, url: str, filename: str) -> None:
+        """登记指向已有blob的别名文件名"""
+        with self._lock:
+            self._register(sha256, url, filename)
+
+    def _register(self, sha256: str, url: str, filename: str) -> None:
+        """登记URL和文件名（调用方持有锁）"""
+        blob = self.manifest["blobs"][sha256]
+        normalized = normalize_url(url)
+        if normalized not in blob["urls"]:
+            blob["urls"].append(normalized)
+        self.manifest["urls"][normalized] = sha256
+        self.manifest["files"][filename] = {
+            "sha256": sha256,
+            "url": url,
+            "canonical": blob["canonical"]
+        }
+
+    def materialize(self, sha256: str, output_dir: Path) -> Optional[Path]:
+        """
+        在输出目录中为blob创建规范文件名的链接
+
+        别名文件名只记录在清单中，不会生成文件，
+        因此下游按目录扫描时每份报告只出现一次
+        """
+        canonical = self.canonical_name(sha256)
+        if not canonical:
+            return None
+        target = Path(output_dir) / canonical
+        if not target.exists():
+            link_or_copy(self.blob_path(sha256), target)
+        return target
+
+    def aliases(self, sha256: str) -> List[str]:
+        """blob的所有可读文件名"""
+        return sorted(name for name, info in self.manifest["files"].items()
+                      if info["sha256"] == sha256)
+
+    def resolve(self, filename: str) -> Optional[Path]:
+        """可读文件名 -> blob路径"""
+        info = self.manifest["files"].get(filename)
+        if not info:
+            return None
+        blob_path = self.blob_path(info["sha256"])
+        return blob_path if blob_path.exists() else None
@@ -2,13 +2,34 @@
 提取模块 - 财务数据提取
 Extraction Module - Financial Data Extraction
 """
-from .base_extractor import BaseExtractor
-from .smart_extractor import SmartExtractor, smart_extract
-from .financial_models import FinancialData
-
-__all__ = [
-    'BaseExtractor',
-    'SmartExtractor',
-    'smart_extract',
-    'FinancialData'
-]
\ No newline at end of file
+import importlib
+from typing import TYPE_CHECKING
+
+# 按需导入（PEP 562）：首次访问时才加载子模块
+_LAZY_ATTRS = {
+    'BaseExtractor': '.base_extractor',
+    'SmartExtractor': '.smart_extractor',
+    'smart_extract': '.smart_extractor',
+    'FinancialData': '.financial_models',
+}
+
+__all__ = list(_LAZY_ATTRS)
+
+
+def __getattr__(name):
+    module = _LAZY_ATTRS.get(name)
+    if module is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(importlib.import_module(module, __name__), name)
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted(set(globals()) | set(__all__))
+
+
+if TYPE_CHECKING:
+    from .base_extractor import BaseExtractor
+    from .smart_extractor import SmartExtractor, smart_extract
+    from .financial_models import FinancialData
@@ -6,27 +6,59 @@ Base Extractor - Common functionality for all extractors
 创建时间: 2025-08-10
 """
 import re
-from typing import Optional, List, Dict, Any
+from bisect import bisect_right
+from typing import Optional, List, Dict, Any, Iterable, Tuple
 from pathlib import Path
 from abc import ABC, abstractmethod
 import pdfplumber
 
 from .financial_models import FinancialData
+from .metrics import get_metrics
+from ..download.registry import get_registry
+
+# 单位检测模式 - 所有提取器共享（预编译）
+UNIT_PATTERNS = tuple((re.compile(pattern, re.IGNORECASE), multiplier) for pattern, multiplier in [
+    (r"in\s+thousands", 1000),
+    (r"in\s+millions", 1000000),
+    (r"千元|千港元", 1000),
+    (r"百万|百萬", 1000000),
+    (r"'000", 1000),
+    (r"HK\$'000", 1000),
+])
+
+
+class PageText(str):
+    """由若干页拼接的文本，可把字符偏移换算回页码"""
+    
+    def __new__(cls, pages: Iterable[Tuple[int, str]]):
+        parts, starts, page_numbers = [], [], []
+        offset = 0
+        for page_number, page_text in pages:
+            if not page_text:
+                continue
+            starts.append(offset)
+            page_numbers.append(page_number)
+            parts.append(page_text + '\n')
+            offset += len(page_text) + 1
+        text = super().__new__(cls, "".join(parts))
+        text.starts = starts
+        text.page_numbers = page_numbers
+        return text
+    
+    def locate(self, offset: int) -> Optional[Tuple[int, float]]:
+        """字符偏移 -> (页码, 页内相对位置)"""
+        i = bisect_right(self.starts, offset) - 1
+        if i < 0:
+            return None
+        end = self.starts[i + 1] if i + 1 < len(self.starts) else len(self)
+        return self.page_numbers[i], round((offset - self.starts[i]) / max(end - self.starts[i], 1), 3)
 
 
 class BaseExtractor(ABC):
     """所有提取器的基类"""
     
     def __init__(self):
-        # 单位检测模式 - 所有提取器共享
-        self.unit_patterns = [
-            (r"in\s+thousands", 1000),
-            (r"in\s+millions", 1000000),
-            (r"千元|千港元", 1000),
-            (r"百万|百萬", 1000000),
-            (r"'000", 1000),
-            (r"HK\$'000", 1000),
-        ]
+        self.unit_patterns = UNIT_PATTERNS
     
     def extract_number(self, text: str) -> Optional[float]:
         """
@@ -94,7 +126,7 @@ class BaseExtractor(ABC):
         text_sample = text[:3000].lower()
         
         for pattern, multiplier in self.unit_patterns:
-            if re.search(pattern, text_sample, re.IGNORECASE):
+            if pattern.search(text_sample):
                 return multiplier
         
         return 1
@@ -104,6 +136,14 @@ class BaseExtractor(ABC):
         从文件名中提取公司名称
         处理各种文件命名格式
         """
+        # 优先从登记表查找（O(1)）
+        try:
+            row = get_registry().find_by_filename(filename)
+        except OSError:
+            row = None  # 登记表CSV不可用
+        if row and row['company']:
+            return row['company']
+        
         # 移除文件扩展名
         name = Path(filename).stem
         
@@ -118,10 +158,10 @@ class BaseExtractor(ABC):
         
         return company or "Unknown"
     
-    def extract_from_pdf(self, pdf_path) -> FinancialData:
+    def extract_from_pdf(self, pdf_path, **options) -> FinancialData:
         """
         从PDF提取数据的主方法
-        子类需要实现具体的提取逻辑
+        子类需要实现具体的提取逻辑（options 原样传给 _extract_data）
         """
         # 处理不同类型的输入
         if isinstance(pdf_path, str):
@@ -140,9 +180,11 @@ class BaseExtractor(ABC):
         )
         
         try:
-            with pdfplumber.open(pdf_path) as pdf:
+            with get_metrics().timer('open'):
+                pdf = pdfplumber.open(pdf_path)
+            with pdf:
                 # 调用子类实现的具体提取方法
-                self._extract_data(pdf, result)
+                self._extract_data(pdf, result, **options)
                 
                 # 更新状态
                 if result.has_data:
@@ -150,11 +192,13 @@ class BaseExtractor(ABC):
                     
         except Exception as e:
             result.status = f"Error: {str(e)[:50]}"
+            # 异常类型供隔离区生成失败签名
+            result.extraction_trace = dict(result.extraction_trace or {}, error=type(e).__name__)
         
         return result
     
     @abstractmethod
-    def _extract_data(self, pdf: pdfplumber.PDF, result: FinancialData) -> None:
+    def _extract_data(self, pdf: pdfplumber.PDF, result: FinancialData, **options) -> None:
         """
         具体的数据提取逻辑
         子类必须实现此方法
@@ -162,6 +206,7 @@ class BaseExtractor(ABC):
         Args:
             pdf: pdfplumber PDF对象
             result: 要填充的FinancialData对象
+            options: 子类支持的提取选项
         """
         pass
     
@@ -203,20 +248,30 @@ class BaseExtractor(ABC):
         Returns:
             提取的文本内容
         """
-        text = ""
-        pages_to_read = min(max_pages, len(pdf.pages))
-        
-        for i in range(pages_to_read):
-            try:
-                page = pdf.pages[i]
-                if page:
-                    page_text = page.extract_text()
-                    if page_text:
-                        text += page_text + '\n'
-            except Exception:
-                continue
+        return "".join(page_text + '\n' for page_text in self.extract_page_texts(pdf, 0, max_pages)
+                       if page_text)
+    
+    def extract_page_texts(self, pdf: pdfplumber.PDF, start: int, end: int) -> List[str]:
+        """
+        逐页提取 [start, end) 范围内的文本（失败或空白页为空字符串）
         
-        return text
+        Returns:
+            每页一个字符串
+        """
+        texts = []
+        metrics = get_metrics()
+        with metrics.timer('text'):
+            end = min(end, len(pdf.pages))
+            
+            for i in range(start, end):
+                try:
+                    page = pdf.pages[i]
+                    texts.append((page.extract_text() or "") if page else "")
+                except Exception:
+                    texts.append("")
+        metrics.inc('pages_parsed', max(end - start, 0))
+        
+        return texts
     
     def find_value_near_keyword(self, text: str, keywords: List[str], 
                                 search_window: int = 100) -> Optional[float]:
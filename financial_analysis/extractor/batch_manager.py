@@ -8,40 +8,26 @@ Batch Extraction Manager
 
 import json
 import time
-import pandas as pd
 from pathlib import Path
 from datetime import datetime
 from typing import Dict, List, Optional
 import warnings
 warnings.filterwarnings('ignore')
 
-from .smart_extractor import smart_extract
+# status / monitor 只依赖主控表和进度服务；提取与合并所需的重依赖在函数内导入
+from .master_store import MasterStore
+from .progress import subscribe_events
 
 
 def load_master_table() -> Dict:
-    """加载主控制表"""
-    master_file = Path("output/extraction_master.json")
-    if master_file.exists():
-        with open(master_file, 'r', encoding='utf-8') as f:
-            return json.load(f)
-    return {
-        "metadata": {
-            "total_files": 0,
-            "processed": 0,
-            "successful": 0,
-            "partial": 0,
-            "failed": 0,
-            "last_update": None,
-            "batches": {}
-        },
-        "files": {}
-    }
+    """加载主控制表（快照 + 日志重放）"""
+    return MasterStore().snapshot()
 
 
 def show_status():
     """显示提取进度"""
-    master = load_master_table()
-    meta = master["metadata"]
+    store = MasterStore()
+    meta = store.metadata
     
     print("\n" + "="*80)
     print("财报提取进度监控")
@@ -49,7 +35,7 @@ def show_status():
     
     # 总体进度
     total = meta["total_files"]
-    processed = meta["processed"]
+    processed = store.processed
     
     if total > 0:
         progress_pct = processed / total * 100
@@ -60,9 +46,9 @@ def show_status():
     
     # 质量统计
     print(f"\n提取质量:")
-    print(f"  ✅ 完全成功: {meta['successful']} 份")
-    print(f"  ⚠️  部分成功: {meta['partial']} 份")
-    print(f"  ❌ 失败: {meta['failed']} 份")
+    print(f"  ✅ 完全成功: {store.counts['completed']} 份")
+    print(f"  ⚠️  部分成功: {store.counts['partial']} 份")
+    print(f"  ❌ 失败: {store.counts['failed']} 份")
     
     # 批次进度
     if meta["batches"]:
@@ -85,43 +71,148 @@ def show_status():
         print(f"  下一批次: python main.py extract --batch {next_batch}")
 
 
-def retry_failed(failed_only: bool = True, partial_only: bool = False, mode: str = "llm_only"):
-    """重试失败或部分成功的文件"""
-    master = load_master_table()
+def retry_failed(failed_only: bool = True, partial_only: bool = False,
+                 files: Optional[List[str]] = None, use_llm: bool = False,
+                 max_workers: int = 4, force: bool = False,
+                 input_dir: str = "data/raw_reports") -> Dict:
+    """
+    定向重试：每个文件沿 regex → table → ocr → llm 阶梯只执行尚未尝试过的阶段，补齐缺失字段
     
-    # 筛选需要重试的文件
-    retry_files = []
-    for filename, info in master["files"].items():
-        if failed_only and info["status"] == "failed":
-            retry_files.append(filename)
-        elif partial_only and info["status"] == "partial":
-            retry_files.append(filename)
-        elif not failed_only and not partial_only and info["status"] in ["failed", "partial"]:
-            retry_files.append(filename)
-    
-    if not retry_files:
+    Args:
+        files: 明确指定的文件（文件名或路径）；为空时按状态从主控表选取
+        failed_only / partial_only: 按状态选取失败 / 部分成功的文件（都不指定时两者都选）
+        use_llm: 启用LLM阶段
+        force: 忽略退避时间
+    
+    Returns:
+        重试统计
+    """
+    import concurrent.futures
+    from collections import Counter
+    from .smart_extractor import extract_single_file, get_extractor, write_results_csv
+    from .retry_queue import RetryQueue, LADDER, FIELDS
+    from .strategies.ocr_strategy import HAS_OCR
+    from .page_hints import get_page_hints
+    from .pattern_packs import get_pattern_packs
+    from .quarantine import get_quarantine
+    from ..download.document_catalog import get_catalog
+    from . import page_parallel
+    
+    store = MasterStore()
+    queue = RetryQueue()
+    quarantine = get_quarantine()
+    quarantine.reset_run()
+    
+    # 选取文件：明确指定的文件集合优先
+    if files:
+        names = list(dict.fromkeys(Path(f).name for f in files))
+    else:
+        statuses = []
+        if failed_only:
+            statuses.append("failed")
+        if partial_only:
+            statuses.append("partial")
+        names = store.names_with_status(*(statuses or ["failed", "partial"]))
+    
+    # 每个文件本次要执行的阶段
+    unavailable = {'ocr': not HAS_OCR, 'llm': not use_llm}
+    if use_llm and getattr(get_extractor('regex_first', True).strategies.get('llm'), 'client', None) is None:
+        print("  ⚠️ LLM不可用（未配置API密钥？），本次不执行LLM阶段")
+        unavailable['llm'] = True
+    available = [stage for stage in LADDER if not unavailable.get(stage)]
+    plans = {}
+    waiting = Counter()
+    candidates = [Path(input_dir) / name for name in sorted(names)]
+    existing = [pdf_path for pdf_path in candidates if pdf_path.exists()]
+    waiting['missing'] = len(candidates) - len(existing)
+    existing, quarantined = quarantine.partition(existing, get_catalog().hash_files(existing))
+    waiting['quarantined'] = len(quarantined)
+    for pdf_path in existing:
+        name = pdf_path.name
+        plan = queue.plan(name, store.get(name), available, force=force)
+        if plan['stages']:
+            plans[pdf_path] = plan['stages']
+        else:
+            waiting[plan['reason']] += 1
+    
+    print(f"\n重试候选 {len(names)} 个文件，本次重试 {len(plans)} 个")
+    reasons = {'completed': '已完整', 'exhausted': '阶段已用尽', 'backoff': '退避中',
+               'unavailable': '剩余阶段不可用（如未启用LLM）', 'missing': 'PDF不存在',
+               'quarantined': '在隔离区（extract --slow-lane 处理）'}
+    waiting = +waiting  # 去掉为0的计数
+    for reason, count in waiting.items():
+        print(f"  跳过 {count} 个: {reasons[reason]}")
+    stats = {'retried': len(plans), 'completed': 0, 'improved': 0, 'errors': 0, 'skipped': dict(waiting)}
+    # 文档目录：未登记的文件先分析，是否扫描版供阶梯的OCR判断使用
+    get_catalog().scan(list(plans), show_progress=False)
+    if not plans:
+        queue.save()
+        quarantine.save()
         print("没有需要重试的文件")
-        return
+        return stats
     
-    print(f"\n准备重试 {len(retry_files)} 个文件")
-    print(f"使用模式: {mode}")
+    def attempt(pdf_path: Path, stages: List[str]):
+        """执行一个文件的阶梯（工作线程）"""
+        prior = (store.get(pdf_path.name) or {}).get('values')
+        start = time.perf_counter()
+        result = extract_single_file(pdf_path, 'regex_first', use_llm, stages=stages, prior=prior or {})
+        return result, prior, time.perf_counter() - start
     
-    # 分批重试
-    batch_size = 50
-    for i in range(0, len(retry_files), batch_size):
-        batch = retry_files[i:i+batch_size]
-        print(f"\n重试批次 {i//batch_size + 1}: {len(batch)} 个文件")
-        
-        # 调用smart_extract重试
-        stats = smart_extract(
-            extraction_mode=mode,
-            use_llm=True if "llm" in mode else False,
-            max_workers=2 if "llm" in mode else 4,
-            use_cache=True,
-            limit=len(batch)
-        )
-        
-        print(f"重试结果: 成功={stats['successful']}, 部分={stats['partial']}, 失败={stats['failed']}")
+    # LLM限制并发数（API限制）
+    workers = min(max_workers, 2) if use_llm else max_workers
+    store.start()
+    results = []
+    stage_counts = Counter()
+    with concurrent.futures.ThreadPoolExecutor(max_workers=max(workers, 1)) as executor:
+        futures = {executor.submit(attempt, pdf_path, stages): pdf_path for pdf_path, stages in plans.items()}
+        for future in concurrent.futures.as_completed(futures):
+            pdf_path = futures[future]
+            result, prior, seconds = future.result()
+            error = result.status if str(result.status).startswith('Error') else None
+            stages = (result.extraction_trace or {}).get('stages', {})
+            outcome = queue.record_attempt(pdf_path.name, stages, prior,
+                                           {name: getattr(result, name) for name in FIELDS},
+                                           seconds, error)
+            stage_counts.update(f"{stage}:{status}" for stage, status in stages.items())
+            
+            if error is not None:
+                # 整个文件失败（如无法打开）：保留主控表中原来的结果
+                stats['errors'] += 1
+                print(f"  ❌ {pdf_path.name}: {error}")
+                continue
+            results.append(result)
+            store.record_result(pdf_path, result, (store.get(pdf_path.name) or {}).get('batch_id'), retry=True)
+            if not outcome['missing_after']:
+                stats['completed'] += 1
+            if outcome['gained']:
+                stats['improved'] += 1
+            icon = "✅" if not outcome['missing_after'] else "⚠️" if outcome['gained'] else "➖"
+            print(f"  {icon} {pdf_path.name}: {' → '.join(f'{s}({st})' for s, st in stages.items()) or '无'}"
+                  f"，补齐 {len(outcome['gained'])} 个字段，仍缺 {len(outcome['missing_after'])} 个")
+    
+    store.close()
+    queue.save()
+    quarantine.save()
+    get_page_hints().save()
+    get_pattern_packs().save()
+    page_parallel.shutdown()
+    
+    # 重试结果作为新的结果分区（合并时按文件保留最新结果）
+    if results:
+        results_dir = Path('output/results')
+        results_dir.mkdir(parents=True, exist_ok=True)
+        output_file = results_dir / f"retry_extraction_{datetime.now().strftime('%Y%m%d%H%M')}.csv"
+        write_results_csv(results, output_file)
+        from .results_store import ResultsStore
+        ResultsStore().write_results(results, source=str(output_file))
+        print(f"\n结果已保存至: {output_file}")
+    
+    print(f"\n重试完成: {len(plans)} 个文件 | 补齐全部字段 {stats['completed']} | "
+          f"有新增字段 {stats['improved']} | 出错 {stats['errors']}")
+    if stage_counts:
+        print("阶段结果: " + ", ".join(f"{key} {count}" for key, count in sorted(stage_counts.items())))
+    print(f"尝试记录: {queue.log_path}")
+    return stats
 
 
 def generate_quality_report():
@@ -206,6 +297,8 @@ def generate_quality_report():
 
 def batch_extract_all(batch_size: int = 200, mode: str = "regex_only", max_workers: int = 4):
     """批量提取所有文件"""
+    from .smart_extractor import smart_extract
+    
     # 获取总文件数
     pdf_dir = Path("data/raw_reports")
     all_pdfs = list(pdf_dir.glob("*.pdf"))
@@ -251,32 +344,127 @@ def batch_extract_all(batch_size: int = 200, mode: str = "regex_only", max_worke
 
 
 def monitor_extraction():
-    """实时监控提取进度"""
+    """
+    实时监控提取进度
+
+    优先订阅运行中提取进程发布的进度事件（无磁盘轮询）；
+    没有可用的进度服务时回退为读取主控表日志
+    """
+    try:
+        _monitor_events()
+    except KeyboardInterrupt:
+        print("\n\n监控已停止")
+    except OSError:
+        print("未发现运行中的进度服务，改为读取主控表日志")
+        _monitor_master_table()
+
+
+def _format_seconds(seconds: Optional[float]) -> str:
+    if seconds is None:
+        return "未知"
+    return f"{int(seconds // 60)}分{int(seconds % 60)}秒"
+
+
+def _render_progress(snapshot: Dict) -> None:
+    """显示进度服务发布的快照"""
+    total = snapshot['total_files']
+    done = snapshot['done']
+    counts = snapshot['status_counts']
+    
+    print("\033[2J\033[H")  # 清屏
+    print("="*70)
+    print("📊 财报全量提取实时监控")
+    print("="*70)
+    print(f"本次待处理: {total}")
+    print(f"已完成: {done} ({done/total*100:.1f}%)" if total else f"已完成: {done}")
+    print(f"  ✅ 成功: {counts.get('completed', 0)}")
+    print(f"  ⚠️ 部分: {counts.get('partial', 0)}")
+    print(f"  ❌ 失败: {counts.get('failed', 0)}")
+    if counts.get('cached'):
+        print(f"  💾 缓存: {counts['cached']}")
+    
+    print("-"*70)
+    print(f"瞬时速度: {snapshot['recent_files_per_min']:.1f} 文件/分钟 (最近60秒)")
+    print(f"平均速度: {snapshot['files_per_min']:.1f} 文件/分钟")
+    if snapshot['seconds_per_page']:
+        print(f"每页耗时: {snapshot['seconds_per_page']:.3f}秒 "
+              f"({snapshot['pages_done']}/{snapshot['total_pages']} 页)")
+    print(f"预计剩余: {_format_seconds(snapshot['eta_seconds'])}")
+    print(f"运行时间: {_format_seconds(snapshot['elapsed'])}")
+    print("-"*70)
+    
+    bar_length = 50
+    filled = int(bar_length * done / total) if total > 0 else 0
+    bar = "█" * filled + "░" * (bar_length - filled)
+    print(f"进度: [{bar}] {done}/{total}")
+    
+    if snapshot['in_flight']:
+        print("\n正在处理:")
+        for item in sorted(snapshot['in_flight'], key=lambda x: -x['seconds'])[:8]:
+            print(f"  ⏳ {item['file'][:45]:<45} {item['stage']:<6} {item['seconds']:.0f}秒")
+    
+    if snapshot['last_finished']:
+        print("\n最近处理:")
+        for item in reversed(snapshot['last_finished'][-3:]):
+            status = item['status']
+            emoji = '✅' if status == 'completed' else '⚠️' if status == 'partial' else \
+                '💾' if status == 'cached' else '❌'
+            print(f"  {emoji} {item['file'][:50]}")
+
+
+def _monitor_events(min_interval: float = 0.5) -> None:
+    """订阅进度事件流，状态变化时刷新显示"""
+    last_render = 0.0
+    snapshot = None
+    for event in subscribe_events():
+        snapshot = event.get('snapshot', snapshot)
+        if snapshot is None:
+            continue
+        # 事件密集时限制刷新频率
+        now = time.time()
+        if now - last_render >= min_interval or event['type'] in ('hello', 'run_finished'):
+            _render_progress(snapshot)
+            last_render = now
+    if snapshot is not None:
+        _render_progress(snapshot)
+    print("\n提取进程已结束")
+
+
+def _monitor_master_table():
+    """回退方式：增量读取主控表日志"""
     print("\n" + "="*70)
     print("📊 财报全量提取实时监控")
     print("="*70)
     
-    last_count = 0
+    # 以开始监控时已处理的文件数为基线：之前处理的文件不计入速度
+    store = MasterStore()
+    store.refresh()
+    start_count = last_count = len(store.files)
     monitor_start = time.time()
+    last_check = monitor_start
     
     while True:
         try:
-            # 读取主控制表
-            master = load_master_table()
+            # 增量读取主控表日志中的新记录
+            store.refresh()
             
-            # 实际统计文件状态
-            total = len([f for f in Path('data/raw_reports').glob('*.pdf')])
-            all_files = master.get('files', {})
+            # 实际统计文件状态（总数由提取进程写入主控表）
+            total = store.metadata.get('total_files') or \
+                len([f for f in Path('data/raw_reports').glob('*.pdf')])
+            all_files = store.files
             processed = len(all_files)
-            successful = len([f for f, d in all_files.items() if d.get('status') == 'completed'])
-            partial = len([f for f, d in all_files.items() if d.get('status') == 'partial'])
-            failed = len([f for f, d in all_files.items() if d.get('status') == 'failed'])
+            successful = store.counts['completed']
+            partial = store.counts['partial']
+            failed = store.counts['failed']
             
-            # 计算速度
-            elapsed = time.time() - monitor_start
-            if processed > last_count and elapsed > 0:
-                recent_speed = (processed - last_count) / 5  # 最近5秒的速度
-                overall_speed = processed / (elapsed / 60)  # 整体速度（文件/分钟）
+            # 计算速度（按实际间隔）
+            now = time.time()
+            elapsed = now - monitor_start
+            interval = now - last_check
+            last_check = now
+            if processed > last_count and interval > 0:
+                recent_speed = (processed - last_count) / interval
+                overall_speed = (processed - start_count) / (elapsed / 60)  # 整体速度（文件/分钟）
                 eta = (total - processed) / recent_speed if recent_speed > 0 else 0
                 eta_min = int(eta / 60)
                 eta_sec = int(eta % 60)
@@ -287,7 +475,7 @@ def monitor_extraction():
                 eta_sec = 0
             
             # 获取当前批次信息
-            batches = master.get('metadata', {}).get('batches', {})
+            batches = store.metadata.get('batches', {})
             current_batch = None
             for bid, info in batches.items():
                 if info.get('status') == 'processing':
@@ -346,59 +534,31 @@ def monitor_extraction():
 
 
 def merge_all_results(output_prefix: str = 'output/final_combined_results') -> Optional[Dict]:
-    """合并所有提取结果"""
+    """
+    合并所有提取结果
+    
+    结果存储为分区列式数据，只有新分区（以及新出现的旧CSV）需要读取；
+    CSV/Excel为导出视图
+    """
     results_dir = Path('output/results')
     archive_dir = Path('output/archive')
-    all_dfs = []
+    from .results_store import ResultsStore
+    store = ResultsStore()
     
-    # 读取results目录
-    for csv_file in results_dir.glob('*.csv'):
-        try:
-            df = pd.read_csv(csv_file)
-            if len(df) > 0:
-                all_dfs.append(df)
-                print(f'读取 {csv_file.name}: {len(df)} 条')
-        except:
-            pass
-    
-    # 读取archive目录
+    # 旧CSV（未被存储登记过的）作为新分区导入
+    csv_files = list(results_dir.glob('*.csv'))
     if archive_dir.exists():
         for batch_dir in archive_dir.glob('batch_results_*'):
-            for csv_file in batch_dir.glob('*.csv'):
-                try:
-                    df = pd.read_csv(csv_file)
-                    if len(df) > 0:
-                        all_dfs.append(df)
-                        print(f'读取归档 {csv_file.name}: {len(df)} 条')
-                except:
-                    pass
+            csv_files.extend(batch_dir.glob('*.csv'))
+    store.import_csv_files(sorted(csv_files, key=lambda f: f.stat().st_mtime))
+    
+    # 增量压缩：只读取新分区
+    pending = len(store.manifest['partitions'])
+    combined_df = store.compact()
+    print(f'合并新分区: {pending} 个')
     
     # 合并所有数据
-    if all_dfs:
-        combined_df = pd.concat(all_dfs, ignore_index=True)
-        
-        # 规范化列名
-        column_mapping = {
-            'company': 'Company',
-            'year': 'Year', 
-            'total_assets': 'Total Assets',
-            'total_liabilities': 'Total Liabilities',
-            'revenue': 'Revenue',
-            'net_profit': 'Net Profit',
-            'success_level': 'Success Level',
-            'method': 'Method',
-            'file': 'File'
-        }
-        
-        # 重命名列
-        for old_col, new_col in column_mapping.items():
-            if old_col in combined_df.columns and new_col not in combined_df.columns:
-                combined_df.rename(columns={old_col: new_col}, inplace=True)
-        
-        # 去重（保留最新的）
-        if 'File' in combined_df.columns:
-            combined_df = combined_df.drop_duplicates(subset=['File'], keep='last')
-        
+    if len(combined_df) > 0:
         # 清理数据 - 只保留有效数据
         if 'Success Level' in combined_df.columns:
             combined_df = combined_df[combined_df['Success Level'].notna()]
@@ -413,13 +573,10 @@ def merge_all_results(output_prefix: str = 'output/final_combined_results') -> O
             for level, count in success_counts.items():
                 print(f'  {level}: {count}')
         
-        # 保存最终结果
-        output_file = Path(f'{output_prefix}.csv')
-        combined_df.to_csv(output_file, index=False)
-        
-        # 保存Excel版本
-        excel_file = Path(f'{output_prefix}.xlsx')
-        combined_df.to_excel(excel_file, index=False)
+        # 导出视图
+        exported = store.export(combined_df, output_prefix)
+        output_file = exported['csv_file']
+        excel_file = exported['excel_file']
         
         print(f'\n✅ 最终合并结果:')
         print(f'  总记录数: {len(combined_df)}')
@@ -450,8 +607,8 @@ def merge_all_results(output_prefix: str = 'output/final_combined_results') -> O
         return {
             'total': len(combined_df),
             'companies': combined_df['Company'].nunique() if 'Company' in combined_df.columns else 0,
-            'csv_file': str(output_file),
-            'excel_file': str(excel_file)
+            'csv_file': output_file,
+            'excel_file': excel_file
         }
     else:
         print('未找到任何数据文件')
@@ -465,6 +622,7 @@ def generate_final_report():
     
     if merge_stats:
         # 读取合并后的数据
+        import pandas as pd
         df = pd.read_csv(merge_stats['csv_file'])
         
         # 生成可视化报告
@@ -0,0 +1,293 @@
+"""
+多节点协调
+Lease-based Multi-node Coordination
+
+多台机器上的 extract --all 通过共享目录中的 SQLite 数据库（coordination.db）协作：
+    - 工作项：每个PDF一行（文件名为键），记录工作键（内容哈希:模式:提取逻辑版本指纹）。节点只登记本机判断
+      需要处理的文件：新文件加入；工作键变化（内容、模式或版本变化）的重新开放；之前的运行中失败或放弃的
+      重新开放（本次运行中其他节点刚处理过的不变）
+    - 分片：文件名哈希到 NUM_SHARDS 个固定分片，分片按最高随机权重（rendezvous）哈希分给存活节点，
+      节点加入或退出只移动它自己的分片。节点优先领取自己分片的文件，做完后再领取其他分片中未领取的文件
+    - 租约：领取时加租约（LEASE_SECONDS），后台心跳线程定期续约；节点崩溃后租约过期，
+      其他节点重新领取。领取 MAX_ATTEMPTS 次仍未完成的文件标记为失败
+    - 提交：只有仍持有租约的节点能提交完成，租约过期后被接管的文件不会被重复提交
+每个节点的主控表、缓存和结果文件仍写在本机的输出目录，共享目录只存放协调数据库。
+共享目录需支持文件锁（SQLite 在部分网络文件系统上的锁不可靠）。
+"""
+import os
+import time
+import socket
+import sqlite3
+import hashlib
+import threading
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional
+
+COORD_DB_NAME = "coordination.db"
+
+# 固定分片数（与节点数无关，保证文件的分片稳定）
+NUM_SHARDS = 64
+# 租约时长与心跳间隔（秒）
+LEASE_SECONDS = 300
+HEARTBEAT_SECONDS = 30
+# 最多领取次数（节点反复在同一文件上崩溃时不再分配）
+MAX_ATTEMPTS = 3
+# 以这些结果结束的工作项在之后的运行中可重新开放
+RETRY_RESULTS = ('failed', 'quarantined')
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS work_items (
+    name TEXT PRIMARY KEY,
+    shard INTEGER NOT NULL,
+    cost REAL NOT NULL DEFAULT 0,
+    status TEXT NOT NULL DEFAULT 'pending',   -- pending / leased / done / failed
+    owner TEXT,
+    lease_until REAL,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    result_status TEXT,
+    work_key TEXT,
+    updated REAL
+);
+CREATE INDEX IF NOT EXISTS idx_work_status ON work_items (status, lease_until);
+CREATE TABLE IF NOT EXISTS nodes (
+    node TEXT PRIMARY KEY,
+    host TEXT,
+    pid INTEGER,
+    started REAL,
+    heartbeat REAL
+);
+"""
+
+
+def shard_of(name: str) -> int:
+    """文件名 -> 分片（稳定哈希，不受文件增减影响）"""
+    return int(hashlib.sha1(name.encode('utf-8')).hexdigest()[:8], 16) % NUM_SHARDS
+
+
+def _weight(node: str, shard: int) -> str:
+    return hashlib.sha1(f"{node}:{shard}".encode('utf-8')).hexdigest()
+
+
+def owner_of(shard: int, nodes: Iterable[str]) -> str:
+    """分片的所属节点（rendezvous 哈希：权重最高的存活节点）"""
+    return max(nodes, key=lambda node: _weight(node, shard))
+
+
+def default_node_id() -> str:
+    return f"{socket.gethostname()}-{os.getpid()}"
+
+
+class Coordinator:
+    """共享目录中的工作项、租约与心跳"""
+
+    def __init__(self, coord_dir: str, node_id: Optional[str] = None,
+                 lease_seconds: float = LEASE_SECONDS):
+        Path(coord_dir).mkdir(parents=True, exist_ok=True)
+        self.db_path = Path(coord_dir) / COORD_DB_NAME
+        self.node_id = node_id or default_node_id()
+        self.lease_seconds = lease_seconds
+        self.heartbeat_seconds = min(HEARTBEAT_SECONDS, lease_seconds / 3)
+
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(str(self.db_path), timeout=60, isolation_level=None,
+                                     check_same_thread=False)
+        self._conn.executescript(SCHEMA)
+        # 旧版协调库没有工作键列
+        columns = [row[1] for row in self._conn.execute("PRAGMA table_info(work_items)")]
+        if 'work_key' not in columns:
+            self._conn.execute("ALTER TABLE work_items ADD COLUMN work_key TEXT")
+        self._stop = threading.Event()
+        self._heartbeat: Optional[threading.Thread] = None
+
+    @contextmanager
+    def _transaction(self) -> Iterator[sqlite3.Connection]:
+        """写事务（BEGIN IMMEDIATE：多个节点的领取互斥）"""
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                yield self._conn
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+            self._conn.execute("COMMIT")
+
+    # ------------------------------------------------------------------
+    # 节点
+    # ------------------------------------------------------------------
+    def start(self) -> 'Coordinator':
+        """登记节点并启动心跳线程"""
+        now = time.time()
+        with self._transaction() as conn:
+            conn.execute("INSERT OR REPLACE INTO nodes (node, host, pid, started, heartbeat) "
+                         "VALUES (?, ?, ?, ?, ?)",
+                         (self.node_id, socket.gethostname(), os.getpid(), now, now))
+        self._stop.clear()
+        self._heartbeat = threading.Thread(target=self._heartbeat_loop, name="coord-heartbeat", daemon=True)
+        self._heartbeat.start()
+        return self
+
+    def stop(self) -> None:
+        """停止心跳，归还未完成的租约并注销节点（其分片立即转给其他节点）"""
+        self._stop.set()
+        if self._heartbeat is not None:
+            self._heartbeat.join()
+            self._heartbeat = None
+        with self._transaction() as conn:
+            conn.execute("UPDATE work_items SET status = 'pending', owner = NULL, lease_until = NULL, "
+                         "attempts = MAX(attempts - 1, 0) WHERE owner = ? AND status = 'leased'",
+                         (self.node_id,))
+            conn.execute("DELETE FROM nodes WHERE node = ?", (self.node_id,))
+
+    def heartbeat(self) -> None:
+        """刷新节点心跳并续约本节点持有的工作项"""
+        now = time.time()
+        with self._transaction() as conn:
+            conn.execute("UPDATE nodes SET heartbeat = ? WHERE node = ?", (now, self.node_id))
+            conn.execute("UPDATE work_items SET lease_until = ? WHERE owner = ? AND status = 'leased'",
+                         (now + self.lease_seconds, self.node_id))
+
+    def _heartbeat_loop(self) -> None:
+        while not self._stop.wait(self.heartbeat_seconds):
+            try:
+                self.heartbeat()
+            except sqlite3.Error as e:
+                print(f"  ⚠️ 协调心跳失败: {e}")
+
+    def live_nodes(self, conn: Optional[sqlite3.Connection] = None) -> List[str]:
+        """心跳未超时的节点"""
+        conn = conn or self._conn
+        cutoff = time.time() - self.lease_seconds
+        nodes = [row[0] for row in conn.execute("SELECT node FROM nodes WHERE heartbeat >= ?", (cutoff,))]
+        if self.node_id not in nodes:
+            nodes.append(self.node_id)
+        return sorted(nodes)
+
+    # ------------------------------------------------------------------
+    # 工作项
+    # ------------------------------------------------------------------
+    def register(self, pdf_paths: Iterable[Path], costs: Optional[Dict[Path, float]] = None,
+                 keys: Optional[Dict[Path, str]] = None) -> int:
+        """
+        登记本节点判断需要处理的文件，返回新增和重新开放的工作项数
+
+        已登记的工作项在以下情况重新开放（回到待领取，领取次数清零）：
+            - 工作键与登记时不同（文件内容、提取模式或提取逻辑版本变化）
+            - 以失败/隔离结束或已放弃，且结束于所有存活节点启动之前（之前的运行），
+              本次运行中其他节点刚处理过的不会重复处理
+
+        Args:
+            keys: 路径 -> 工作键（内容哈希:模式:版本指纹）
+        """
+        now = time.time()
+        costs, keys = costs or {}, keys or {}
+        registered = 0
+        with self._transaction() as conn:
+            # 本次运行的开始：存活节点中最早的启动时间
+            session_start = conn.execute("SELECT MIN(started) FROM nodes WHERE heartbeat >= ?",
+                                         (now - self.lease_seconds,)).fetchone()[0]
+            session_start = min(session_start or now, now)
+
+            for path in pdf_paths:
+                key = keys.get(path)
+                row = conn.execute("SELECT status, result_status, work_key, updated FROM work_items "
+                                   "WHERE name = ?", (path.name,)).fetchone()
+                if row is None:
+                    conn.execute("INSERT INTO work_items (name, shard, cost, work_key, updated) "
+                                 "VALUES (?, ?, ?, ?, ?)",
+                                 (path.name, shard_of(path.name), costs.get(path, 0.0), key, now))
+                    registered += 1
+                    continue
+                status, result, old_key, updated = row
+                changed = key is not None and old_key is not None and key != old_key
+                retry = (status == 'failed' or (status == 'done' and result in RETRY_RESULTS)) \
+                    and (updated or 0) < session_start
+                if changed or retry:
+                    conn.execute("UPDATE work_items SET status = 'pending', owner = NULL, lease_until = NULL, "
+                                 "attempts = 0, result_status = NULL, cost = ?, work_key = ?, updated = ? "
+                                 "WHERE name = ?",
+                                 (costs.get(path, 0.0), key or old_key, now, path.name))
+                    registered += 1
+                elif old_key is None and key is not None:
+                    # 旧版工作项补记工作键（不重新开放）
+                    conn.execute("UPDATE work_items SET work_key = ? WHERE name = ?", (key, path.name))
+        return registered
+
+    def claim(self, limit: int, order: str = 'longest',
+              accept: Optional[Callable[[str], bool]] = None) -> List[str]:
+        """
+        领取至多 limit 个工作项：未领取的和租约已过期的，本节点分片优先
+
+        Args:
+            order: 同一优先级内的顺序 longest（预计耗时长的先）/ shortest / name
+            accept: 本节点能否处理该文件（如本机是否有该文件）；不能处理的留给其他节点
+
+        Returns:
+            领取到的文件名
+        """
+        now = time.time()
+        cost_order = {'longest': 'cost DESC', 'shortest': 'cost ASC'}.get(order, 'name')
+        with self._transaction() as conn:
+            # 反复领取仍未完成（节点在该文件上崩溃）的不再分配
+            conn.execute("UPDATE work_items SET status = 'failed', result_status = 'failed', owner = NULL, "
+                         "lease_until = NULL, updated = ? "
+                         "WHERE status = 'leased' AND lease_until < ? AND attempts >= ?",
+                         (now, now, MAX_ATTEMPTS))
+
+            nodes = self.live_nodes(conn)
+            owned = [shard for shard in range(NUM_SHARDS) if owner_of(shard, nodes) == self.node_id]
+            placeholders = ','.join('?' * len(owned)) or 'NULL'
+            cursor = conn.execute(
+                f"SELECT name, status FROM work_items "
+                f"WHERE status = 'pending' OR (status = 'leased' AND lease_until < ?) "
+                f"ORDER BY shard IN ({placeholders}) DESC, {cost_order}, name",
+                (now, *owned)
+            )
+            rows = []
+            for name, status in cursor:
+                if accept is None or accept(name):
+                    rows.append((name, status))
+                    if len(rows) >= limit:
+                        break
+            cursor.close()
+            conn.executemany("UPDATE work_items SET status = 'leased', owner = ?, lease_until = ?, "
+                             "attempts = attempts + 1, updated = ? WHERE name = ?",
+                             [(self.node_id, now + self.lease_seconds, now, name) for name, _ in rows])
+
+        recovered = sum(1 for _, status in rows if status == 'leased')
+        if recovered:
+            print(f"  ♻️ 接管 {recovered} 个租约过期的文件（原节点可能已崩溃）")
+        return [name for name, _ in rows]
+
+    def complete(self, name: str, status: str) -> bool:
+        """提交完成（status 为主控表状态）；租约已被其他节点接管时返回False"""
+        with self._transaction() as conn:
+            cursor = conn.execute("UPDATE work_items SET status = 'done', result_status = ?, owner = NULL, "
+                                  "lease_until = NULL, updated = ? "
+                                  "WHERE name = ? AND owner = ? AND status = 'leased'",
+                                  (status, time.time(), name, self.node_id))
+        if cursor.rowcount == 0:
+            print(f"  ⚠️ {name}: 租约已失效，结果未提交到协调库")
+            return False
+        return True
+
+    # ------------------------------------------------------------------
+    # 报告
+    # ------------------------------------------------------------------
+    def summary(self) -> Dict[str, Any]:
+        """各状态的工作项数与存活节点"""
+        with self._lock:
+            counts = dict(self._conn.execute("SELECT status, COUNT(*) FROM work_items GROUP BY status"))
+            nodes = self.live_nodes()
+        return {
+            'pending': counts.get('pending', 0),
+            'leased': counts.get('leased', 0),
+            'done': counts.get('done', 0),
+            'failed': counts.get('failed', 0),
+            'nodes': nodes,
+        }
+
+    def print_summary(self) -> None:
+        summary = self.summary()
+        print(f"\n协调库 {self.db_path}: 完成 {summary['done']} | 处理中 {summary['leased']} | "
+              f"待处理 {summary['pending']} | 放弃 {summary['failed']} | 存活节点 {len(summary['nodes'])}")
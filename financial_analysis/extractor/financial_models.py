@@ -39,6 +39,9 @@ class FinancialData:
     unit_scale: Optional[str] = None            # 数值单位（千、百万、十亿）
     language: Optional[str] = None              # 财报语言
     
+    # 各策略执行记录（公司/语言/文档类型 + 每步补齐字段、耗时、token），供策略规划器学习
+    extraction_trace: Optional[Dict[str, Any]] = None
+    
     def to_dict(self) -> Dict[str, Any]:
         """转换为字典"""
         return {
@@ -0,0 +1,322 @@
+"""
+提取主控表存储
+Journaled Extraction Master Store
+
+extraction_master.json 不再整表重写：每个文件的结果作为一行追加到
+extraction_master.journal.jsonl，由唯一的写线程通过队列接收并落盘；
+日志达到一定长度后压缩进快照（原子替换），再清空日志。
+启动时读取快照并重放日志，最后一行不完整（进程崩溃）时直接丢弃。
+状态计数随记录增量维护，查询为O(1)。
+"""
+import os
+import json
+import queue
+import threading
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+from .financial_models import FinancialData
+
+DEFAULT_MASTER_PATH = "output/extraction_master.json"
+
+# 日志记录数达到该值后压缩进快照
+COMPACT_EVERY = 500
+
+STATUSES = ('completed', 'partial', 'failed')
+
+VALUE_FIELDS = ('total_assets', 'total_liabilities', 'revenue', 'net_profit')
+
+
+def result_status(result: FinancialData) -> str:
+    """提取结果 -> 主控表状态"""
+    if result.success_level == "Complete":
+        return "completed"
+    if "Partial" in str(result.success_level):
+        return "partial"
+    return "failed"
+
+
+class MasterStore:
+    """
+    主控表：快照 + 追加日志
+
+    快照格式与原 extraction_master.json 相同:
+        metadata: total_files / processed / successful / partial / failed / last_update / batches
+        files: 文件名 -> 记录
+
+    日志每行一个操作:
+        {"op": "file", "name": ..., "record": {...}}
+        {"op": "meta", "key": ..., "value": ...}
+        {"op": "batch", "id": ..., "info": {...}}   # 合并更新
+    """
+
+    def __init__(self, path: str = DEFAULT_MASTER_PATH, compact_every: int = COMPACT_EVERY):
+        self.snapshot_file = Path(path)
+        self.journal_file = self.snapshot_file.with_suffix('.journal.jsonl')
+        self.compact_every = compact_every
+
+        self.metadata: Dict[str, Any] = {
+            "total_files": 0,
+            "last_update": None,
+            "batches": {}
+        }
+        self.files: Dict[str, Dict[str, Any]] = {}
+        self.counts: Dict[str, int] = {status: 0 for status in STATUSES}
+
+        self._lock = threading.RLock()
+        self._queue: "queue.Queue[Optional[str]]" = queue.Queue()
+        self._writer: Optional[threading.Thread] = None
+        self._journal_offset = 0
+        self._journal_lines = 0
+        self._journal_id = None
+
+        self._load()
+
+    # ------------------------------------------------------------------
+    # 加载与恢复
+    # ------------------------------------------------------------------
+    def _load(self) -> None:
+        """读取快照并重放日志"""
+        if self.snapshot_file.exists():
+            try:
+                with open(self.snapshot_file, 'r', encoding='utf-8') as f:
+                    data = json.load(f)
+                meta = data.get("metadata", {})
+                self.metadata["total_files"] = meta.get("total_files", 0)
+                self.metadata["last_update"] = meta.get("last_update")
+                self.metadata["batches"] = meta.get("batches", {})
+                for name, record in data.get("files", {}).items():
+                    self._set_file(name, record)
+            except (OSError, ValueError) as e:
+                print(f"  ⚠️ 主控表快照损坏，仅从日志恢复: {e}")
+        self.refresh()
+
+    def refresh(self) -> int:
+        """
+        读取日志中新增的记录（供监控等只读进程增量刷新）
+
+        Returns:
+            新读取的记录数
+        """
+        with self._lock:
+            try:
+                stat = os.stat(self.journal_file)
+            except OSError:
+                return 0
+
+            journal_id = (stat.st_dev, stat.st_ino)
+            if self._journal_id is not None and (
+                    journal_id != self._journal_id or stat.st_size < self._journal_offset):
+                # 日志已被其他进程压缩：重新加载快照
+                self._journal_id = None
+                self._journal_offset = 0
+                self._journal_lines = 0
+                self.files.clear()
+                self.counts = {status: 0 for status in STATUSES}
+                self._load()
+                return 0
+            self._journal_id = journal_id
+
+            applied = 0
+            with open(self.journal_file, 'rb') as f:
+                f.seek(self._journal_offset)
+                for raw in f:
+                    if not raw.endswith(b'\n'):
+                        break  # 不完整的最后一行（写入时崩溃或仍在写）
+                    self._journal_offset += len(raw)
+                    try:
+                        op = json.loads(raw)
+                    except ValueError:
+                        continue
+                    self._apply(op)
+                    self._journal_lines += 1
+                    applied += 1
+            return applied
+
+    def _apply(self, op: Dict[str, Any]) -> None:
+        """把一条日志操作应用到内存状态"""
+        kind = op.get("op")
+        if kind == "file":
+            self._set_file(op["name"], op["record"])
+        elif kind == "meta":
+            self.metadata[op["key"]] = op["value"]
+        elif kind == "batch":
+            self.metadata["batches"].setdefault(str(op["id"]), {}).update(op["info"])
+        if op.get("time"):
+            self.metadata["last_update"] = op["time"]
+
+    def _set_file(self, name: str, record: Dict[str, Any]) -> None:
+        """更新文件记录并增量维护计数"""
+        old = self.files.get(name)
+        if old is not None and old.get("status") in self.counts:
+            self.counts[old["status"]] -= 1
+        self.files[name] = record
+        if record.get("status") in self.counts:
+            self.counts[record["status"]] += 1
+
+    # ------------------------------------------------------------------
+    # 写入（单写线程）
+    # ------------------------------------------------------------------
+    def start(self) -> 'MasterStore':
+        """启动写线程"""
+        with self._lock:
+            if self._writer is None:
+                self.snapshot_file.parent.mkdir(parents=True, exist_ok=True)
+                self._writer = threading.Thread(target=self._writer_loop,
+                                                name="master-store-writer", daemon=True)
+                self._writer.start()
+        return self
+
+    def _submit(self, op: Dict[str, Any]) -> None:
+        """更新内存状态并把操作交给写线程"""
+        op["time"] = datetime.now().isoformat()
+        with self._lock:
+            self._apply(op)
+        if self._writer is None:
+            self.start()
+        self._queue.put(json.dumps(op, ensure_ascii=False))
+
+    def _writer_loop(self) -> None:
+        """唯一写线程：追加日志，定期压缩"""
+        journal = open(self.journal_file, 'a', encoding='utf-8')
+        try:
+            while True:
+                line = self._queue.get()
+                if line is None:
+                    break
+                journal.write(line + '\n')
+                # 队列暂时为空时才刷盘，批量写入
+                if self._queue.empty():
+                    journal.flush()
+                with self._lock:
+                    self._journal_lines += 1
+                    self._journal_offset = journal.tell()
+                    need_compact = self._journal_lines >= self.compact_every
+                if need_compact:
+                    journal.close()
+                    self._compact()
+                    journal = open(self.journal_file, 'a', encoding='utf-8')
+        finally:
+            if not journal.closed:
+                journal.flush()
+                os.fsync(journal.fileno())
+                journal.close()
+
+    def _compact(self) -> None:
+        """把当前状态写入快照并清空日志（只在写线程或关闭后调用）"""
+        with self._lock:
+            data = self.snapshot()
+            tmp_file = self.snapshot_file.with_suffix('.tmp')
+            with open(tmp_file, 'w', encoding='utf-8') as f:
+                json.dump(data, f, ensure_ascii=False)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp_file, self.snapshot_file)
+            # 快照已包含日志内容；此处崩溃时重放日志也是幂等的
+            # 用新文件替换日志，只读进程据此发现日志已压缩
+            empty_file = self.journal_file.with_suffix('.tmp')
+            open(empty_file, 'w').close()
+            os.replace(empty_file, self.journal_file)
+            stat = os.stat(self.journal_file)
+            self._journal_id = (stat.st_dev, stat.st_ino)
+            self._journal_offset = 0
+            self._journal_lines = 0
+
+    def close(self, compact: bool = True) -> None:
+        """等待写线程写完所有记录，并压缩为快照"""
+        writer = self._writer
+        if writer is not None:
+            self._queue.put(None)
+            writer.join()
+            self._writer = None
+        if compact and (writer is not None or self._journal_lines):
+            self._compact()
+
+    # ------------------------------------------------------------------
+    # 记录接口
+    # ------------------------------------------------------------------
+    def record_result(self, pdf_path: Path, result: FinancialData,
+                      batch_id: Optional[int] = None, retry: bool = False) -> None:
+        """记录单个文件的提取结果（retry: 由重试队列提交，重试次数加一）"""
+        values = {field: getattr(result, field) for field in VALUE_FIELDS}
+        extracted_fields = sum(1 for value in values.values() if value is not None)
+        name = Path(pdf_path).name
+        record = {
+            "status": result_status(result),
+            "batch_id": batch_id,
+            "extracted_fields": extracted_fields,
+            "quality_score": extracted_fields / 4.0,
+            "values": values,  # 重试时从这些字段值出发，只补缺失字段
+            "retry_count": self.retry_count(name) + (1 if retry else 0),
+            "last_update": datetime.now().isoformat()
+        }
+        if result.extraction_trace:
+            record["trace"] = result.extraction_trace
+        self._submit({"op": "file", "name": name, "record": record})
+
+    def record_failure(self, pdf_path: Path, error: str,
+                       batch_id: Optional[int] = None) -> None:
+        """记录提取失败（超时、异常），标记需要重试"""
+        name = Path(pdf_path).name
+        self._submit({"op": "file", "name": name, "record": {
+            "status": "failed",
+            "batch_id": batch_id,
+            "retry_needed": True,
+            "error": error,
+            "retry_count": self.retry_count(name),
+            "last_update": datetime.now().isoformat()
+        }})
+
+    def set_total_files(self, total: int) -> None:
+        """记录总文件数"""
+        if self.metadata.get("total_files") != total:
+            self._submit({"op": "meta", "key": "total_files", "value": total})
+
+    def update_batch(self, batch_id: int, **info) -> None:
+        """更新批次信息"""
+        self._submit({"op": "batch", "id": str(batch_id), "info": info})
+
+    # ------------------------------------------------------------------
+    # 查询
+    # ------------------------------------------------------------------
+    def get(self, name: str) -> Optional[Dict[str, Any]]:
+        """文件记录"""
+        return self.files.get(name)
+
+    def status(self, name: str) -> Optional[str]:
+        """文件状态"""
+        record = self.files.get(name)
+        return record.get("status") if record else None
+
+    def retry_count(self, name: str) -> int:
+        """文件重试次数"""
+        record = self.files.get(name)
+        return record.get("retry_count", 0) if record else 0
+
+    def names_with_status(self, *statuses: str) -> List[str]:
+        """指定状态的文件名列表"""
+        with self._lock:
+            return [name for name, record in self.files.items()
+                    if record.get("status") in statuses]
+
+    @property
+    def processed(self) -> int:
+        """已处理（完全或部分成功）的文件数"""
+        return self.counts["completed"] + self.counts["partial"]
+
+    def snapshot(self) -> Dict[str, Any]:
+        """原 extraction_master.json 格式的完整视图"""
+        with self._lock:
+            return {
+                "metadata": {
+                    "total_files": self.metadata.get("total_files", 0),
+                    "processed": self.processed,
+                    "successful": self.counts["completed"],
+                    "partial": self.counts["partial"],
+                    "failed": self.counts["failed"],
+                    "last_update": self.metadata.get("last_update"),
+                    "batches": self.metadata.get("batches", {})
+                },
+                "files": dict(self.files)
+            }
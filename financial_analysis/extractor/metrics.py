@@ -0,0 +1,245 @@
+"""
+提取运行指标
+Extraction Run Metrics
+
+进程内共享的指标注册表：
+    - 各阶段耗时直方图（open / text / regex / table / ocr / llm / write）
+    - 计数器：解析页数、缓存命中、LLM token、重试、各策略成功/失败
+    - 仪表：队列深度、进程内存(RSS)
+进度服务的 /metrics 路径输出 Prometheus 文本格式，每次运行结束时写入
+output/reports/metrics_<时间>.json。
+"""
+import os
+import json
+import time
+import threading
+from contextlib import contextmanager
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterator, Optional, Tuple
+
+# 尝试导入psutil（用于读取内存）
+try:
+    import psutil
+    HAS_PSUTIL = True
+except ImportError:
+    HAS_PSUTIL = False
+
+DEFAULT_REPORT_DIR = "output/reports"
+METRIC_PREFIX = "extraction"
+
+# 直方图分桶（秒）
+BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+Labels = Tuple[Tuple[str, str], ...]
+
+
+def _labels(labels: Optional[Dict[str, str]]) -> Labels:
+    return tuple(sorted((labels or {}).items()))
+
+
+def _format_labels(labels: Labels, extra: Optional[Tuple[str, str]] = None) -> str:
+    items = list(labels) + ([extra] if extra else [])
+    if not items:
+        return ""
+    return "{" + ",".join(f'{k}="{v}"' for k, v in items) + "}"
+
+
+def _format_value(value: float) -> str:
+    return str(int(value)) if float(value).is_integer() else repr(float(value))
+
+
+def rss_bytes() -> Optional[int]:
+    """当前进程常驻内存（字节）"""
+    if HAS_PSUTIL:
+        return psutil.Process().memory_info().rss
+    try:
+        with open('/proc/self/statm', 'r') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError, IndexError):
+        return None
+
+
+class Histogram:
+    """累计分桶直方图"""
+
+    def __init__(self, buckets: Tuple[float, ...] = BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * len(buckets)
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, value: float) -> None:
+        self.count += 1
+        self.sum += value
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                self.counts[i] += 1
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            'count': self.count,
+            'sum': round(self.sum, 6),
+            'avg': round(self.sum / self.count, 6) if self.count else None,
+            'buckets': {str(bound): n for bound, n in zip(self.buckets, self.counts)}
+        }
+
+
+class MetricsRegistry:
+    """线程安全的指标注册表"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._gauge_callbacks: Dict[str, Callable[[], Optional[float]]] = {}
+        self.reset()
+        self.register_gauge('rss_bytes', rss_bytes)
+
+    def reset(self) -> None:
+        """清空本次运行的指标（仪表回调保留）"""
+        with self._lock:
+            self.started_at = time.time()
+            self.histograms: Dict[Tuple[str, Labels], Histogram] = {}
+            self.counters: Dict[Tuple[str, Labels], float] = {}
+            self.gauges: Dict[Tuple[str, Labels], float] = {}
+
+    # ------------------------------------------------------------------
+    # 记录
+    # ------------------------------------------------------------------
+    def observe(self, stage: str, seconds: float) -> None:
+        """记录一个阶段的耗时"""
+        key = ('stage_seconds', _labels({'stage': stage}))
+        with self._lock:
+            histogram = self.histograms.get(key)
+            if histogram is None:
+                histogram = self.histograms[key] = Histogram()
+            histogram.observe(seconds)
+
+    @contextmanager
+    def timer(self, stage: str) -> Iterator[None]:
+        """计时上下文：with get_metrics().timer('regex'): ..."""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(stage, time.perf_counter() - start)
+
+    def inc(self, name: str, value: float = 1, labels: Optional[Dict[str, str]] = None) -> None:
+        """计数器累加"""
+        key = (name, _labels(labels))
+        with self._lock:
+            self.counters[key] = self.counters.get(key, 0) + value
+
+    def set_gauge(self, name: str, value: float, labels: Optional[Dict[str, str]] = None) -> None:
+        """设置仪表值"""
+        with self._lock:
+            self.gauges[(name, _labels(labels))] = value
+
+    def register_gauge(self, name: str, callback: Callable[[], Optional[float]]) -> None:
+        """注册导出时才读取的仪表（例如队列长度）"""
+        with self._lock:
+            self._gauge_callbacks[name] = callback
+
+    def unregister_gauge(self, name: str) -> None:
+        with self._lock:
+            self._gauge_callbacks.pop(name, None)
+
+    def _read_gauges(self) -> Dict[Tuple[str, Labels], float]:
+        with self._lock:
+            gauges = dict(self.gauges)
+            callbacks = dict(self._gauge_callbacks)
+        for name, callback in callbacks.items():
+            try:
+                value = callback()
+            except Exception:
+                value = None
+            if value is not None:
+                gauges[(name, ())] = value
+        return gauges
+
+    # ------------------------------------------------------------------
+    # 导出
+    # ------------------------------------------------------------------
+    def to_prometheus(self) -> str:
+        """Prometheus 文本格式"""
+        gauges = self._read_gauges()
+        lines = []
+        with self._lock:
+            declared = set()
+            for (name, labels), histogram in sorted(self.histograms.items()):
+                metric = f"{METRIC_PREFIX}_{name}"
+                if metric not in declared:
+                    lines.append(f"# TYPE {metric} histogram")
+                    declared.add(metric)
+                for bound, n in zip(histogram.buckets, histogram.counts):
+                    lines.append(f"{metric}_bucket{_format_labels(labels, ('le', str(bound)))} {n}")
+                lines.append(f"{metric}_bucket{_format_labels(labels, ('le', '+Inf'))} {histogram.count}")
+                lines.append(f"{metric}_sum{_format_labels(labels)} {histogram.sum:.6f}")
+                lines.append(f"{metric}_count{_format_labels(labels)} {histogram.count}")
+
+            for (name, labels), value in sorted(self.counters.items()):
+                metric = f"{METRIC_PREFIX}_{name}_total"
+                if metric not in declared:
+                    lines.append(f"# TYPE {metric} counter")
+                    declared.add(metric)
+                lines.append(f"{metric}{_format_labels(labels)} {_format_value(value)}")
+
+        for (name, labels), value in sorted(gauges.items()):
+            metric = f"{METRIC_PREFIX}_{name}"
+            if metric not in declared:
+                lines.append(f"# TYPE {metric} gauge")
+                declared.add(metric)
+            lines.append(f"{metric}{_format_labels(labels)} {_format_value(value)}")
+        return "\n".join(lines) + "\n"
+
+    def to_dict(self) -> Dict[str, Any]:
+        """JSON格式"""
+        def key_name(name: str, labels: Labels) -> str:
+            return name + "".join(f"[{k}={v}]" for k, v in labels)
+
+        gauges = self._read_gauges()
+        with self._lock:
+            return {
+                'started_at': datetime.fromtimestamp(self.started_at).isoformat(),
+                'elapsed': round(time.time() - self.started_at, 3),
+                'stages': {dict(labels).get('stage', name): histogram.to_dict()
+                           for (name, labels), histogram in self.histograms.items()},
+                'counters': {key_name(name, labels): value
+                             for (name, labels), value in sorted(self.counters.items())},
+                'gauges': {key_name(name, labels): value
+                           for (name, labels), value in sorted(gauges.items())}
+            }
+
+    def dump_json(self, report_dir: str = DEFAULT_REPORT_DIR, name: Optional[str] = None) -> Path:
+        """把本次运行的指标写入JSON文件"""
+        report_path = Path(report_dir)
+        report_path.mkdir(parents=True, exist_ok=True)
+        output_file = report_path / (name or f"metrics_{datetime.now().strftime('%Y%m%d%H%M%S')}.json")
+        tmp_file = output_file.with_suffix('.tmp')
+        with open(tmp_file, 'w', encoding='utf-8') as f:
+            json.dump(self.to_dict(), f, indent=2, ensure_ascii=False)
+        os.replace(tmp_file, output_file)
+        return output_file
+
+    def print_summary(self) -> None:
+        """打印各阶段耗时"""
+        stages = self.to_dict()['stages']
+        if not stages:
+            return
+        print("\n阶段耗时:")
+        for stage in sorted(stages, key=lambda s: -stages[s]['sum']):
+            info = stages[stage]
+            print(f"  {stage:<6} 次数 {info['count']:>6} | 总计 {info['sum']:>9.2f}秒 | "
+                  f"平均 {info['avg'] * 1000:>8.1f}毫秒")
+
+
+_metrics: Optional[MetricsRegistry] = None
+_metrics_lock = threading.Lock()
+
+
+def get_metrics() -> MetricsRegistry:
+    """进程内共享的指标注册表"""
+    global _metrics
+    with _metrics_lock:
+        if _metrics is None:
+            _metrics = MetricsRegistry()
+        return _metrics
@@ -0,0 +1,208 @@
+"""
+公司页码提示
+Per-company Page Location Hints
+
+同一家银行历年年报的资产负债表、损益表大多在相近的页码。每次提取后按公司记录
+各字段所在的页码、页码在全文中的相对位置、所在报表的标题和在页内的相对位置；
+下一份该公司的财报先读取提示页附近的页面，正则找到过的字段全部找到即为命中
+（表格找到的字段只提供页码，不计入命中条件），命中后仍有缺失字段或未命中时再全量扫描。命中率按公司累计，保存在 output/cache/page_hints.json。
+"""
+import os
+import re
+import json
+import threading
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, Optional
+
+DEFAULT_HINTS_PATH = "output/cache/page_hints.json"
+
+# 提示页前后各读取的页数
+NEIGHBOURHOOD = 2
+# 每个字段保留的最近观测数
+MAX_OBSERVATIONS = 5
+
+# 报表标题（用于记录字段所在报表）
+STATEMENT_HEADINGS = re.compile(
+    r'(statement\s+of\s+financial\s+position|balance\s+sheet|statement\s+of\s+(?:comprehensive\s+)?income|'
+    r'income\s+statement|statement\s+of\s+profit\s+or\s+loss|profit\s+and\s+loss|'
+    r'资产负债表|資產負債表|利润表|損益表|损益表|综合收益表|綜合收益表|'
+    r'balan[çc]o\s+patrimonial|demonstra[çc][ãa]o\s+do\s+resultado)',
+    re.IGNORECASE
+)
+
+
+def find_heading(page_text: str) -> Optional[str]:
+    """页面中第一个报表标题所在的行"""
+    match = STATEMENT_HEADINGS.search(page_text or "")
+    if not match:
+        return None
+    start = page_text.rfind('\n', 0, match.start()) + 1
+    end = page_text.find('\n', match.end())
+    return page_text[start:end if end != -1 else None].strip()[:80]
+
+
+class PageHints:
+    """
+    页码提示存储
+
+    格式:
+        companies: 公司 -> {
+            fields: 字段 -> [{page, page_rel, heading, pos, source, year, file}, ...]（最近的在后）
+                    source 为找到该字段的策略
+            unit: 最近一次的单位乘数
+            hits / misses: 累计命中次数
+        }
+    """
+
+    def __init__(self, path: str = DEFAULT_HINTS_PATH):
+        self.path = Path(path)
+        self._lock = threading.Lock()
+        self.companies: Dict[str, Dict[str, Any]] = {}
+        self.run_hits = 0
+        self.run_misses = 0
+        self._dirty = False
+        self._load()
+
+    def _load(self) -> None:
+        if not self.path.exists():
+            return
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                self.companies = json.load(f).get('companies', {})
+        except (OSError, ValueError) as e:
+            print(f"  ⚠️ 页码提示文件损坏，重新学习: {e}")
+            self.companies = {}
+
+    def save(self) -> None:
+        """原子写入（没有变化时跳过）"""
+        with self._lock:
+            if not self._dirty:
+                return
+            data = {'updated': datetime.now().isoformat(), 'companies': self.companies}
+            self._dirty = False
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_file = self.path.with_suffix('.tmp')
+        with open(tmp_file, 'w', encoding='utf-8') as f:
+            json.dump(data, f, ensure_ascii=False, indent=1)
+        os.replace(tmp_file, self.path)
+
+    # ------------------------------------------------------------------
+    # 查询
+    # ------------------------------------------------------------------
+    def lookup(self, company: str, page_count: int) -> Optional[Dict[str, Any]]:
+        """
+        公司的提示页
+
+        Returns:
+            {pages: 按离提示页距离排序的页码, fields: 正则找到过的字段（命中条件）, unit: 单位乘数}；
+            没有提示时为None
+        """
+        with self._lock:
+            entry = self.companies.get(company)
+            if not entry or not entry.get('fields') or page_count <= 0:
+                return None
+            centers = set()
+            for observations in entry['fields'].values():
+                for obs in observations:
+                    centers.add(obs['page'])
+                    # 页数变化时按相对位置换算
+                    if obs.get('page_rel') is not None:
+                        centers.add(int(obs['page_rel'] * page_count))
+            fields = [field for field, observations in entry['fields'].items()
+                      if any(obs.get('source') == 'regex' for obs in observations)]
+            unit = entry.get('unit', 1)
+
+        distance: Dict[int, int] = {}
+        for center in centers:
+            for page in range(center - NEIGHBOURHOOD, center + NEIGHBOURHOOD + 1):
+                if 0 <= page < page_count:
+                    distance[page] = min(distance.get(page, NEIGHBOURHOOD + 1), abs(page - center))
+        if not distance:
+            return None
+        pages = sorted(distance, key=lambda p: (distance[p], p))
+        return {'pages': pages, 'fields': fields, 'unit': unit}
+
+    # ------------------------------------------------------------------
+    # 记录
+    # ------------------------------------------------------------------
+    def reset_run(self) -> None:
+        """开始新一次运行的命中计数"""
+        with self._lock:
+            self.run_hits = 0
+            self.run_misses = 0
+
+    def record_lookup(self, company: str, hit: bool) -> None:
+        """记录一次提示查询的结果"""
+        with self._lock:
+            entry = self.companies.setdefault(company, {'fields': {}, 'hits': 0, 'misses': 0})
+            entry['hits' if hit else 'misses'] = entry.get('hits' if hit else 'misses', 0) + 1
+            if hit:
+                self.run_hits += 1
+            else:
+                self.run_misses += 1
+            self._dirty = True
+
+    def record(self, company: str, locations: Dict[str, Dict[str, Any]], page_count: int,
+               year: Optional[int] = None, file_name: Optional[str] = None,
+               unit: Optional[int] = None) -> None:
+        """记录各字段在本份财报中的位置"""
+        if not locations:
+            return
+        with self._lock:
+            entry = self.companies.setdefault(company, {'fields': {}, 'hits': 0, 'misses': 0})
+            for field, location in locations.items():
+                observations = entry['fields'].setdefault(field, [])
+                observations[:] = [obs for obs in observations if obs.get('file') != file_name]
+                observations.append({
+                    'page': location['page'],
+                    'page_rel': round(location['page'] / page_count, 4) if page_count else None,
+                    'heading': location.get('heading'),
+                    'pos': location.get('pos'),
+                    'source': location.get('strategy'),
+                    'year': year,
+                    'file': file_name
+                })
+                del observations[:-MAX_OBSERVATIONS]
+            if unit:
+                entry['unit'] = unit
+            self._dirty = True
+
+    # ------------------------------------------------------------------
+    # 报告
+    # ------------------------------------------------------------------
+    def summary(self) -> Dict[str, Any]:
+        """本次运行与累计的命中率"""
+        with self._lock:
+            total_hits = sum(e.get('hits', 0) for e in self.companies.values())
+            total_misses = sum(e.get('misses', 0) for e in self.companies.values())
+            run_lookups = self.run_hits + self.run_misses
+            return {
+                'companies_with_hints': sum(1 for e in self.companies.values() if e.get('fields')),
+                'run_lookups': run_lookups,
+                'run_hit_rate': self.run_hits / run_lookups if run_lookups else None,
+                'total_lookups': total_hits + total_misses,
+                'total_hit_rate': total_hits / (total_hits + total_misses) if total_hits + total_misses else None,
+            }
+
+    def print_summary(self) -> None:
+        """打印命中率"""
+        summary = self.summary()
+        if not summary['run_lookups']:
+            return
+        print(f"\n页码提示: 命中 {self.run_hits}/{summary['run_lookups']} "
+              f"({summary['run_hit_rate']:.1%}) | 累计命中率 {summary['total_hit_rate']:.1%} | "
+              f"有提示的公司 {summary['companies_with_hints']}")
+
+
+_hints: Optional[PageHints] = None
+_hints_lock = threading.Lock()
+
+
+def get_page_hints(path: str = DEFAULT_HINTS_PATH) -> PageHints:
+    """进程内共享的页码提示"""
+    global _hints
+    with _hints_lock:
+        if _hints is None:
+            _hints = PageHints(path)
+        return _hints
@@ -0,0 +1,240 @@
+"""
+大文档按页并行
+Intra-document Page Parallelism
+
+300–500 页的年报在单个线程里逐页解析文本、表格和OCR，会拖住整批提取的尾延迟。
+文档目录登记的页数超过 PAGE_PARALLEL_THRESHOLD 时，把页范围拆成若干段交给
+进程内共享的进程池，各段结果按页码顺序拼回；页数较少的文档仍在当前线程处理。
+
+工作函数都是模块级函数（可pickle），参数只有 PDF 路径和页范围，每个子进程自行打开PDF。
+"""
+import os
+import threading
+import multiprocessing
+import concurrent.futures
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+import pdfplumber
+
+from . import profiling
+from .metrics import get_metrics
+
+# 超过该页数的文档按页拆分
+PAGE_PARALLEL_THRESHOLD = int(os.environ.get('PAGE_PARALLEL_THRESHOLD', 150))
+# 页解析进程数
+PAGE_WORKERS = int(os.environ.get('PAGE_WORKERS', min(4, os.cpu_count() or 1)))
+# 每段最少页数（过小的段进程间通信开销大于收益）
+MIN_CHUNK_PAGES = 10
+
+# 财务报表页判断（LLM模式扫描全文时使用）
+TABLE_KEYWORDS = ('asset', 'liabil', 'revenue', 'income', 'ativo', 'passivo')
+
+
+def should_split(page_count: Optional[int]) -> bool:
+    """文档是否按页拆分"""
+    return bool(page_count) and page_count > PAGE_PARALLEL_THRESHOLD and PAGE_WORKERS > 1
+
+
+def split_range(start: int, end: int, workers: int = PAGE_WORKERS) -> List[Tuple[int, int]]:
+    """把 [start, end) 拆成至多 workers 段，每段不少于 MIN_CHUNK_PAGES 页"""
+    total = max(end - start, 0)
+    chunks = max(1, min(workers, total // MIN_CHUNK_PAGES))
+    size, extra = divmod(total, chunks)
+    ranges = []
+    for i in range(chunks):
+        chunk_end = start + size + (1 if i < extra else 0)
+        ranges.append((start, chunk_end))
+        start = chunk_end
+    return ranges
+
+
+# ----------------------------------------------------------------------
+# 进程池（进程内共享，首次拆分时创建）
+# ----------------------------------------------------------------------
+_pool: Optional[concurrent.futures.ProcessPoolExecutor] = None
+_pool_lock = threading.Lock()
+
+
+def get_page_pool() -> concurrent.futures.ProcessPoolExecutor:
+    """页解析进程池（spawn 启动，避免在多线程的父进程中 fork）"""
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = concurrent.futures.ProcessPoolExecutor(
+                max_workers=PAGE_WORKERS,
+                mp_context=multiprocessing.get_context('spawn'),
+                initializer=profiling.init_worker,
+                initargs=(profiling.get_sampler(),)
+            )
+        return _pool
+
+
+def shutdown(wait: bool = True) -> None:
+    """
+    关闭进程池（每次运行结束时调用）
+
+    wait=False：取消排队的任务并结束子进程，不等待卡在子进程中的解析（看门狗放弃文件时使用）
+    """
+    global _pool
+    with _pool_lock:
+        pool, _pool = _pool, None
+    _close(pool, wait)
+
+
+def _close(pool: Optional[concurrent.futures.ProcessPoolExecutor], wait: bool) -> None:
+    if pool is None:
+        return
+    if wait:
+        pool.shutdown(wait=True)
+        return
+    processes = list((getattr(pool, '_processes', None) or {}).values())
+    pool.shutdown(wait=False, cancel_futures=True)
+    for process in processes:
+        if process.is_alive():
+            process.kill()
+
+
+def _discard(pool: Optional[concurrent.futures.ProcessPoolExecutor]) -> None:
+    """进程池损坏时关闭（只关闭出错的池：其他线程可能已换用新池）"""
+    global _pool
+    with _pool_lock:
+        if pool is None or pool is not _pool:
+            return
+        _pool = None
+    _close(pool, wait=True)
+
+
+def map_pages(func: Callable[[str, int, int], List[Any]], pdf_path: str,
+              start: int, end: int) -> List[Any]:
+    """
+    按页范围并行执行 func(pdf_path, start, end)，结果按页码顺序拼接
+
+    只有一段时在当前线程执行；进程池不可用时退回当前线程逐段执行。
+    """
+    chunks = split_range(start, end)
+    if len(chunks) == 1:
+        return func(pdf_path, start, end)
+
+    stage = func.__name__
+    metrics = get_metrics()
+    metrics.inc('page_parallel_chunks', len(chunks), labels={'stage': stage})
+    pool = None
+    try:
+        pool = get_page_pool()
+        futures = [pool.submit(func, pdf_path, chunk_start, chunk_end) for chunk_start, chunk_end in chunks]
+        results = []
+        for future in futures:
+            results.extend(future.result())
+        return results
+    except Exception as e:
+        # 进程池损坏（如子进程被系统杀死）时重建，本次在当前线程完成
+        print(f"  ⚠️ 按页并行失败，改为单线程处理: {str(e)[:100]}")
+        metrics.inc('page_parallel_fallback', labels={'stage': stage})
+        _discard(pool)
+        return func(pdf_path, start, end)
+
+
+# ----------------------------------------------------------------------
+# 工作函数
+# ----------------------------------------------------------------------
+def page_texts(pdf_path: str, start: int, end: int) -> List[str]:
+    """[start, end) 各页文本（失败或空白页为空字符串）"""
+    with profiling.maybe_profile(f"text-{os.path.basename(pdf_path)}-{start}"):
+        texts = []
+        with pdfplumber.open(pdf_path) as pdf:
+            for i in range(start, min(end, len(pdf.pages))):
+                try:
+                    texts.append(pdf.pages[i].extract_text() or "")
+                except Exception:
+                    texts.append("")
+        return texts
+
+
+def scan_page(page: Any) -> Tuple[str, bool]:
+    """
+    扫描单页：返回 (文本, 是否含财务表格)
+
+    财务表格：至少4行且包含资产/负债/收入等关键词的表格
+    """
+    text = page.extract_text() or ""
+    for table in page.extract_tables() or []:
+        if table and len(table) > 3:
+            table_text = str(table).lower()
+            if any(keyword in table_text for keyword in TABLE_KEYWORDS):
+                return text, True
+    return text, False
+
+
+def scan_pages(pdf_path: str, start: int, end: int) -> List[Tuple[str, bool]]:
+    """[start, end) 各页的 scan_page 结果"""
+    with profiling.maybe_profile(f"scan-{os.path.basename(pdf_path)}-{start}"):
+        with pdfplumber.open(pdf_path) as pdf:
+            return [scan_page(pdf.pages[i]) for i in range(start, min(end, len(pdf.pages)))]
+
+
+def page_tables(pdf_path: str, pages: List[int]) -> List[List[List[Any]]]:
+    """指定各页的表格（pdfplumber extract_tables 的结果）"""
+    with profiling.maybe_profile(f"tables-{os.path.basename(pdf_path)}-{pages[0] if pages else 0}"):
+        tables = []
+        with pdfplumber.open(pdf_path) as pdf:
+            for i in pages:
+                try:
+                    tables.append((pdf.pages[i].extract_tables() or []) if i < len(pdf.pages) else [])
+                except Exception:
+                    tables.append([])
+        return tables
+
+
+class LazyPageTables:
+    """
+    按需并行提取表格（传给表格策略的 page_tables）
+
+    表格策略按 page_order 逐页检查并在字段找齐时提前结束。第一次取某页时，
+    把该页及其后尚未提取的一批页（首批为提示页）分给进程池；提前结束后余下的页不再解析。
+    """
+
+    def __init__(self, pdf_path: str, page_order: List[int], first_batch: int = 0,
+                 batch_pages: int = PAGE_WORKERS * 2):
+        self.pdf_path = pdf_path
+        self.page_order = list(page_order)
+        self.first_batch = first_batch
+        self.batch_pages = max(batch_pages, 1)
+        self._tables: Dict[int, List[List[List[Any]]]] = {}
+
+    def __contains__(self, page: int) -> bool:
+        return page in self.page_order
+
+    def __getitem__(self, page: int) -> List[List[List[Any]]]:
+        if page not in self._tables:
+            self._fetch(page)
+        return self._tables[page]
+
+    def _fetch(self, page: int) -> None:
+        pending = [p for p in self.page_order[self.page_order.index(page):] if p not in self._tables]
+        count = self.first_batch if not self._tables and self.first_batch else self.batch_pages
+        batch = pending[:max(count, 1)]
+        # 每个进程至少两页（表格解析远比进程间通信耗时）
+        chunks = max(1, min(PAGE_WORKERS, len(batch) // 2))
+        size, extra = divmod(len(batch), chunks)
+        groups, start = [], 0
+        for i in range(chunks):
+            end = start + size + (1 if i < extra else 0)
+            groups.append(batch[start:end])
+            start = end
+
+        metrics = get_metrics()
+        if len(groups) == 1:
+            tables = page_tables(self.pdf_path, batch)
+        else:
+            metrics.inc('page_parallel_chunks', len(groups), labels={'stage': 'page_tables'})
+            pool = None
+            try:
+                pool = get_page_pool()
+                futures = [pool.submit(page_tables, self.pdf_path, group) for group in groups]
+                tables = [t for future in futures for t in future.result()]
+            except Exception as e:
+                print(f"  ⚠️ 按页并行失败，改为单线程处理: {str(e)[:100]}")
+                metrics.inc('page_parallel_fallback', labels={'stage': 'page_tables'})
+                _discard(pool)
+                tables = page_tables(self.pdf_path, batch)
+        self._tables.update(zip(batch, tables))
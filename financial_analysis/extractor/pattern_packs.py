@@ -0,0 +1,250 @@
+"""
+公司专用模式包
+Per-company Compiled Pattern Packs
+
+通用正则对每份财报依次尝试约60个多语言模式。模式包按公司在通用模式之前尝试：
+    - 配置：config/config.yaml 的 banks 段。patterns 中的报表标题把对应字段的搜索
+      限定在标题之后的区域，可选的 fields 段直接给出各字段的行标签
+    - 学习：往年正则命中该字段时的行标签（如 "Total assets"、"Loss for the year"）；表格策略按
+      "assets" 等宽松关键词匹配的行（如 "Deferred tax assets"）不学习，避免错误标签排在通用模式之前
+每个公司的模式包只编译一次（学习到新的行标签时重新编译），模式包补齐全部字段时跳过通用模式。
+学习到的行标签保存在 output/cache/pattern_packs.json。
+"""
+import os
+import re
+import json
+import threading
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Pattern, Tuple
+
+try:
+    import yaml
+    HAS_YAML = True
+except ImportError:
+    HAS_YAML = False
+
+DEFAULT_CONFIG_PATH = Path(__file__).resolve().parents[2] / "config" / "config.yaml"
+DEFAULT_PACKS_PATH = "output/cache/pattern_packs.json"
+
+FIELDS = ('total_assets', 'total_liabilities', 'revenue', 'net_profit')
+
+# 每个字段保留的最近行标签数
+MAX_LABELS = 3
+# 报表 -> 所含字段
+STATEMENT_FIELDS = {
+    'balance_sheet': ('total_assets', 'total_liabilities'),
+    'income_statement': ('revenue', 'net_profit'),
+}
+
+# 行标签之后的数值（与通用模式一致）
+_VALUE = r'[\s:：]*[\$\s]*\(?([0-9,]+(?:\.[0-9]+)?)\)?'
+_LOSS_WORDS = ('loss', '亏损', '虧損', 'prejuízo')
+_NAME_NOISE = re.compile(r'\(.*?\)|（.*?）|\blimited\b|\bltd\b|有限公司|[^0-9a-z一-鿿]')
+_CURRENCY = re.compile(r'(?:HK|US|RMB|R)?\$|港元|人民币|人民幣')
+
+
+def normalize_company(name: Optional[str]) -> str:
+    """公司名归一化：去掉括号内容、Limited 等后缀和标点（"Ant Bank (Hong Kong) Limited" -> "antbank"）"""
+    return _NAME_NOISE.sub('', (name or '').lower().replace('_', ' '))
+
+
+def clean_label(label: Optional[str]) -> Optional[str]:
+    """行标签：去掉货币符号和标点，合并空白；含数字或过短过长的不作为标签"""
+    label = re.sub(r'\s+', ' ', _CURRENCY.sub('', label or '')).strip(' :：()（）-')
+    if not 2 <= len(label) <= 60 or re.search(r'\d', label):
+        return None
+    return label
+
+
+def _phrase(text: str) -> str:
+    """短语转正则：单词之间允许任意空白（含换行）"""
+    return r'\s+'.join(re.escape(word) for word in text.split())
+
+
+def compile_label(field: str, label: str) -> Tuple[Pattern, bool]:
+    """行标签 -> (模式, 是否为亏损)"""
+    pattern = re.compile(r'(?<![A-Za-z])' + _phrase(label) + _VALUE, re.IGNORECASE)
+    return pattern, field == 'net_profit' and any(word in label.lower() for word in _LOSS_WORDS)
+
+
+class PatternPack:
+    """一个公司的已编译模式包"""
+    __slots__ = ('company', 'labels', 'sections')
+
+    def __init__(self, company: str, labels: Dict[str, Tuple[Tuple[Pattern, bool], ...]],
+                 sections: Dict[str, Tuple[Pattern, ...]]):
+        self.company = company
+        self.labels = labels      # 字段 -> ((行标签模式, 是否亏损), ...)，最近学到的在前
+        self.sections = sections  # 字段 -> (报表标题模式, ...)
+
+    @property
+    def fields(self) -> List[str]:
+        return [name for name in FIELDS if name in self.labels or name in self.sections]
+
+
+class PatternPacks:
+    """
+    模式包存储
+
+    格式:
+        companies: 公司 -> {fields: 字段 -> [{label, year, file}, ...]（最近的在后）}
+    """
+
+    def __init__(self, path: str = DEFAULT_PACKS_PATH, config_path: Path = DEFAULT_CONFIG_PATH):
+        self.path = Path(path)
+        self._lock = threading.Lock()
+        self.companies: Dict[str, Dict[str, Any]] = {}
+        self.banks = self._load_banks(Path(config_path))
+        self._compiled: Dict[str, Optional[PatternPack]] = {}
+        self.run_used = 0
+        self.run_complete = 0
+        self._dirty = False
+        self._load()
+
+    @staticmethod
+    def _load_banks(config_path: Path) -> Dict[str, Dict[str, Any]]:
+        """读取配置中的银行，按归一化名称（名称和键）索引"""
+        if not HAS_YAML or not config_path.exists():
+            return {}
+        try:
+            with open(config_path, 'r', encoding='utf-8') as f:
+                banks = (yaml.safe_load(f) or {}).get('banks') or {}
+        except (OSError, yaml.YAMLError) as e:
+            print(f"  ⚠️ 读取银行配置失败: {e}")
+            return {}
+        index = {}
+        for key, bank in banks.items():
+            if not isinstance(bank, dict):
+                continue
+            for name in (key, bank.get('name')):
+                if normalize_company(name):
+                    index[normalize_company(name)] = bank
+        return index
+
+    def _load(self) -> None:
+        if not self.path.exists():
+            return
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                self.companies = json.load(f).get('companies', {})
+        except (OSError, ValueError) as e:
+            print(f"  ⚠️ 模式包文件损坏，重新学习: {e}")
+            self.companies = {}
+
+    def save(self) -> None:
+        """原子写入（没有变化时跳过）"""
+        with self._lock:
+            if not self._dirty:
+                return
+            data = {'updated': datetime.now().isoformat(), 'companies': self.companies}
+            self._dirty = False
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_file = self.path.with_suffix('.tmp')
+        with open(tmp_file, 'w', encoding='utf-8') as f:
+            json.dump(data, f, ensure_ascii=False, indent=1)
+        os.replace(tmp_file, self.path)
+
+    # ------------------------------------------------------------------
+    # 编译
+    # ------------------------------------------------------------------
+    def pack_for(self, company: Optional[str]) -> Optional[PatternPack]:
+        """公司的已编译模式包；既无配置也无学习记录时为None"""
+        if not company:
+            return None
+        with self._lock:
+            if company not in self._compiled:
+                self._compiled[company] = self._compile(company)
+            return self._compiled[company]
+
+    def _compile(self, company: str) -> Optional[PatternPack]:
+        labels: Dict[str, List[str]] = {}
+        sections: Dict[str, Tuple[Pattern, ...]] = {}
+
+        bank = self.banks.get(normalize_company(company))
+        if bank:
+            for statement, headings in (bank.get('patterns') or {}).items():
+                if not headings:
+                    continue
+                heading_patterns = tuple(re.compile(_phrase(h), re.IGNORECASE) for h in headings)
+                for name in STATEMENT_FIELDS.get(statement, ()):
+                    sections[name] = sections.get(name, ()) + heading_patterns
+            for name, configured in (bank.get('fields') or {}).items():
+                if name in FIELDS:
+                    labels[name] = [label for label in configured if clean_label(label)]
+
+        # 学习到的行标签在配置之前（最近的优先）；未标明来源的旧记录可能来自表格，不使用
+        entry = self.companies.get(company, {})
+        for name, observations in entry.get('fields', {}).items():
+            learned = [obs['label'] for obs in reversed(observations) if obs.get('source') == 'regex']
+            labels[name] = learned + [label for label in labels.get(name, []) if label not in learned]
+
+        if not labels and not sections:
+            return None
+        compiled = {name: tuple(compile_label(name, label) for label in field_labels)
+                    for name, field_labels in labels.items() if field_labels}
+        return PatternPack(company, compiled, sections)
+
+    # ------------------------------------------------------------------
+    # 学习
+    # ------------------------------------------------------------------
+    def learn(self, company: Optional[str], labels: Dict[str, Optional[str]],
+              year: Optional[int] = None, file_name: Optional[str] = None) -> None:
+        """记录本份财报各字段正则命中的行标签；标签有变化时该公司的模式包重新编译"""
+        if not company:
+            return
+        with self._lock:
+            entry = self.companies.setdefault(company, {'fields': {}})
+            changed = False
+            for name, label in labels.items():
+                label = clean_label(label)
+                if name not in FIELDS or label is None:
+                    continue
+                observations = entry['fields'].setdefault(name, [])
+                before = [obs['label'] for obs in observations]
+                observations[:] = [obs for obs in observations
+                                   if obs.get('source') == 'regex' and obs['label'].lower() != label.lower()]
+                observations.append({'label': label, 'source': 'regex', 'year': year, 'file': file_name})
+                del observations[:-MAX_LABELS]
+                if [obs['label'] for obs in observations] != before:
+                    changed = True
+                self._dirty = True
+            if changed:
+                self._compiled.pop(company, None)
+
+    # ------------------------------------------------------------------
+    # 报告
+    # ------------------------------------------------------------------
+    def reset_run(self) -> None:
+        """开始新一次运行的计数"""
+        with self._lock:
+            self.run_used = 0
+            self.run_complete = 0
+
+    def record_use(self, complete: bool) -> None:
+        """记录一次模式包的使用（complete: 模式包补齐了全部字段，跳过了通用模式）"""
+        with self._lock:
+            self.run_used += 1
+            if complete:
+                self.run_complete += 1
+
+    def print_summary(self) -> None:
+        """打印本次运行的模式包效果"""
+        if not self.run_used:
+            return
+        print(f"\n模式包: 补齐全部字段（跳过通用模式）{self.run_complete}/{self.run_used} "
+              f"({self.run_complete / self.run_used:.1%}) | 有模式包的公司 "
+              f"{sum(1 for pack in self._compiled.values() if pack)}")
+
+
+_packs: Optional[PatternPacks] = None
+_packs_lock = threading.Lock()
+
+
+def get_pattern_packs(path: str = DEFAULT_PACKS_PATH) -> PatternPacks:
+    """进程内共享的模式包"""
+    global _packs
+    with _packs_lock:
+        if _packs is None:
+            _packs = PatternPacks(path)
+        return _packs
@@ -0,0 +1,207 @@
+"""
+成本感知的策略规划器
+Cost-aware Strategy Planner
+
+按历史收益和实测成本决定 adaptive 模式下各策略的执行顺序与取舍：
+    收益 = 预计补齐的字段数 = 历史补齐率 × 当前缺失字段数
+    成本 = 平均耗时(秒) + token数 × TOKEN_COST_SECONDS
+收益折算成秒（× FIELD_VALUE_SECONDS）低于成本时停止。
+
+历史来自主控表中每个文件的 trace（各策略补齐的字段、耗时、token），
+按 公司 -> 语言/文档类型 -> 全局 -> 先验 逐级收缩估计，样本少时向上一级靠拢。
+每个文件的全部决策追加到 output/reports/planner_decisions.jsonl，便于审计。
+"""
+import json
+import threading
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+DECISION_LOG = "output/reports/planner_decisions.jsonl"
+
+# 参与规划的策略（OCR只决定文本来源，由文档目录判断）
+PLANNED_STRATEGIES = ('regex', 'table', 'llm')
+
+# 先验：每次执行补齐缺失字段的比例、耗时（秒）、token
+PRIORS = {
+    'regex': {'yield': 0.5, 'seconds': 0.05, 'tokens': 0},
+    'table': {'yield': 0.25, 'seconds': 1.0, 'tokens': 0},
+    'llm': {'yield': 0.6, 'seconds': 8.0, 'tokens': 3000},
+}
+# 上一级估计相当于多少次观测
+PRIOR_WEIGHT = 3.0
+# 一个字段折合多少秒
+FIELD_VALUE_SECONDS = 10.0
+# 每个token折合多少秒
+TOKEN_COST_SECONDS = 0.002
+
+
+def doc_profile(company: Optional[str], catalog_entry: Optional[Dict[str, Any]]) -> Dict[str, str]:
+    """文档画像：公司、语言、文档类型（text / hybrid / scanned）"""
+    if catalog_entry is None:
+        language, doc_class = 'unknown', 'unknown'
+    else:
+        language = catalog_entry.get('language') or 'unknown'
+        if catalog_entry.get('scanned'):
+            doc_class = 'scanned'
+        elif catalog_entry.get('hybrid'):
+            doc_class = 'hybrid'
+        else:
+            doc_class = 'text'
+    return {'company': company or 'Unknown', 'language': language, 'doc_class': doc_class}
+
+
+class _Tally:
+    """某一级别下某策略的累计观测"""
+    __slots__ = ('attempts', 'yield_sum', 'seconds_sum', 'tokens_sum')
+
+    def __init__(self):
+        self.attempts = 0
+        self.yield_sum = 0.0
+        self.seconds_sum = 0.0
+        self.tokens_sum = 0.0
+
+    def add(self, yield_rate: float, seconds: float, tokens: float) -> None:
+        self.attempts += 1
+        self.yield_sum += yield_rate
+        self.seconds_sum += seconds
+        self.tokens_sum += tokens
+
+
+class StrategyPlanner:
+    """根据历史收益与成本选择下一个策略"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._tallies: Dict[Tuple[Tuple[str, ...], str], _Tally] = {}
+        self._log_lock = threading.Lock()
+
+    # ------------------------------------------------------------------
+    # 历史
+    # ------------------------------------------------------------------
+    @staticmethod
+    def _levels(profile: Dict[str, str]) -> List[Tuple[str, ...]]:
+        """由粗到细的统计级别"""
+        return [
+            ('global',),
+            ('class', profile['language'], profile['doc_class']),
+            ('company', profile['company']),
+        ]
+
+    def observe(self, trace: Optional[Dict[str, Any]]) -> None:
+        """记录一次提取的各策略结果（trace 格式见 SmartExtractor）"""
+        if not trace or not trace.get('steps'):
+            return
+        profile = {key: trace.get(key) or 'unknown' for key in ('company', 'language', 'doc_class')}
+        levels = self._levels(profile)
+        with self._lock:
+            for step in trace['steps']:
+                if step.get('strategy') not in PRIORS or not step.get('missing'):
+                    continue
+                yield_rate = step.get('gained', 0) / step['missing']
+                for level in levels:
+                    tally = self._tallies.get((level, step['strategy']))
+                    if tally is None:
+                        tally = self._tallies[(level, step['strategy'])] = _Tally()
+                    tally.add(yield_rate, step.get('seconds', 0.0), step.get('tokens', 0))
+
+    @classmethod
+    def from_records(cls, records: Iterable[Dict[str, Any]]) -> 'StrategyPlanner':
+        """由主控表记录构建"""
+        planner = cls()
+        for record in records:
+            planner.observe(record.get('trace'))
+        return planner
+
+    # ------------------------------------------------------------------
+    # 估计与决策
+    # ------------------------------------------------------------------
+    def estimate(self, strategy: str, profile: Dict[str, str]) -> Dict[str, Any]:
+        """逐级收缩后的补齐率、耗时、token 估计"""
+        estimate = dict(PRIORS[strategy])
+        samples = 0
+        with self._lock:
+            for level in self._levels(profile):
+                tally = self._tallies.get((level, strategy))
+                if tally is None or tally.attempts == 0:
+                    continue
+                n = tally.attempts
+                estimate = {
+                    'yield': (tally.yield_sum + PRIOR_WEIGHT * estimate['yield']) / (n + PRIOR_WEIGHT),
+                    'seconds': (tally.seconds_sum + PRIOR_WEIGHT * estimate['seconds']) / (n + PRIOR_WEIGHT),
+                    'tokens': (tally.tokens_sum + PRIOR_WEIGHT * estimate['tokens']) / (n + PRIOR_WEIGHT),
+                }
+                samples = n
+        estimate['samples'] = samples
+        return estimate
+
+    def evaluate(self, strategy: str, profile: Dict[str, str], missing: int) -> Dict[str, Any]:
+        """某策略在当前缺失字段数下的预计收益与成本"""
+        estimate = self.estimate(strategy, profile)
+        expected_gain = estimate['yield'] * missing
+        cost = estimate['seconds'] + estimate['tokens'] * TOKEN_COST_SECONDS
+        return {
+            'strategy': strategy,
+            'expected_gain': round(expected_gain, 3),
+            'cost': round(cost, 3),
+            'value': round(expected_gain * FIELD_VALUE_SECONDS - cost, 3),
+            'samples': estimate['samples'],
+        }
+
+    def choose(self, profile: Dict[str, str], missing: int,
+               candidates: Iterable[str]) -> Tuple[Optional[str], List[Dict[str, Any]]]:
+        """
+        选择下一个策略
+
+        Returns:
+            (策略名或None表示停止, 各候选的评估)
+        """
+        evaluations = [self.evaluate(name, profile, missing) for name in candidates]
+        # 按单位成本收益排序
+        evaluations.sort(key=lambda e: -e['expected_gain'] / max(e['cost'], 1e-6))
+        if missing == 0:
+            return None, evaluations
+        for evaluation in evaluations:
+            if evaluation['value'] >= 0:
+                return evaluation['strategy'], evaluations
+        return None, evaluations
+
+    # ------------------------------------------------------------------
+    # 决策日志
+    # ------------------------------------------------------------------
+    def log_decisions(self, file_name: Optional[str], profile: Dict[str, str],
+                      decisions: List[Dict[str, Any]], log_file: str = DECISION_LOG) -> None:
+        """追加一个文件的全部决策"""
+        entry = {'time': datetime.now().isoformat(timespec='seconds'),
+                 'file': file_name, **profile, 'decisions': decisions}
+        line = json.dumps(entry, ensure_ascii=False) + "\n"
+        with self._log_lock:
+            try:
+                Path(log_file).parent.mkdir(parents=True, exist_ok=True)
+                with open(log_file, 'a', encoding='utf-8') as f:
+                    f.write(line)
+            except OSError as e:
+                print(f"  ⚠️ 规划日志写入失败: {e}")
+
+
+_planner: Optional[StrategyPlanner] = None
+_planner_lock = threading.Lock()
+
+
+def get_planner() -> StrategyPlanner:
+    """进程内共享的规划器（首次使用时从默认主控表读取历史）"""
+    global _planner
+    with _planner_lock:
+        if _planner is None:
+            from .master_store import MasterStore
+            _planner = StrategyPlanner.from_records(MasterStore().snapshot()['files'].values())
+        return _planner
+
+
+def load_history(records: Iterable[Dict[str, Any]]) -> StrategyPlanner:
+    """用指定的主控表记录重建共享规划器"""
+    global _planner
+    planner = StrategyPlanner.from_records(records)
+    with _planner_lock:
+        _planner = planner
+    return planner
@@ -0,0 +1,285 @@
+"""
+提取性能剖析
+Extraction Profiling Hooks
+
+每个工作线程/进程对其处理的前N个文件运行cProfile，各自写入 .prof 文件
+（不依赖共享内存，线程池和进程池均可使用；同一进程同一时刻只剖析一个文件）；运行结束后合并为一份统计，输出：
+    profile.prof       合并后的pstats数据
+    call_tree.txt      按策略归类的热点 + 调用树
+    stacks.collapsed   折叠栈（可直接用 flamegraph.pl / speedscope 生成火焰图）
+"""
+import os
+import json
+import pstats
+import cProfile
+import threading
+from collections import defaultdict
+from contextlib import contextmanager
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional, Tuple
+
+DEFAULT_REPORT_DIR = "output/reports"
+
+# 调用树/折叠栈中忽略的小分支（占总耗时比例）
+MIN_FRACTION = 0.005
+MAX_DEPTH = 60
+
+# 源文件 -> 策略名（用于热点归类）
+STRATEGY_FILES = {
+    'regex_strategy.py': 'regex',
+    'table_strategy.py': 'table',
+    'ocr_strategy.py': 'ocr',
+    'llm_strategy.py': 'llm',
+}
+# 策略之外的页解析函数 -> 阶段（当前线程逐页解析，以及大文档页解析进程中的工作函数）
+STAGE_FUNCTIONS = {
+    ('base_extractor.py', 'extract_text_from_pages'): 'text',
+    ('base_extractor.py', 'extract_page_texts'): 'text',
+    ('page_parallel.py', 'page_texts'): 'text',
+    ('page_parallel.py', 'scan_pages'): 'text',
+    ('page_parallel.py', 'scan_page'): 'text',
+    ('page_parallel.py', 'page_tables'): 'table',
+}
+
+Func = Tuple[str, int, str]
+
+# 进程内同一时刻只允许一个活动剖析器
+_active = threading.Lock()
+
+
+class ProfileSampler:
+    """按工作线程抽样剖析（可pickle，传给进程池的initializer）"""
+
+    def __init__(self, output_dir: str, sample_per_worker: int = 3):
+        self.output_dir = output_dir
+        self.sample_per_worker = sample_per_worker
+        self._local = threading.local()
+
+    def __getstate__(self):
+        return {'output_dir': self.output_dir, 'sample_per_worker': self.sample_per_worker}
+
+    def __setstate__(self, state):
+        self.__init__(state['output_dir'], state['sample_per_worker'])
+
+    @contextmanager
+    def profile(self, name: str) -> Iterator[None]:
+        """
+        当前工作线程尚未达到抽样数时剖析本次调用
+
+        同一进程同一时刻只剖析一个调用（Python 3.12 起第二个活动剖析器会报错），
+        其他线程此时直接执行、不计入抽样数；剖析出错不影响被剖析的调用
+        """
+        count = getattr(self._local, 'count', 0)
+        profiler = None
+        if count < self.sample_per_worker and _active.acquire(blocking=False):
+            profiler = cProfile.Profile()
+            try:
+                profiler.enable()
+            except ValueError:  # 进程内已有其他剖析器（如调试器）
+                profiler = None
+                _active.release()
+        if profiler is None:
+            yield
+            return
+        self._local.count = count + 1
+
+        try:
+            yield
+        finally:
+            try:
+                profiler.disable()
+                Path(self.output_dir).mkdir(parents=True, exist_ok=True)
+                worker = f"{os.getpid()}-{threading.get_ident()}"
+                safe_name = "".join(c if c.isalnum() or c in '-_.' else '_' for c in name)[:80]
+                profiler.dump_stats(str(Path(self.output_dir) / f"{worker}-{count:03d}-{safe_name}.prof"))
+            except Exception as e:
+                print(f"  ⚠️ 剖析 {name} 失败: {e}")
+            finally:
+                _active.release()
+
+
+# ----------------------------------------------------------------------
+# 进程内的当前抽样器（未启动时为空操作）
+# ----------------------------------------------------------------------
+_sampler: Optional[ProfileSampler] = None
+
+
+def start_profiling(sample_per_worker: int = 3,
+                    report_dir: str = DEFAULT_REPORT_DIR) -> ProfileSampler:
+    """开始本次运行的抽样剖析"""
+    global _sampler
+    run_dir = Path(report_dir) / f"profile_{datetime.now().strftime('%Y%m%d%H%M%S')}"
+    _sampler = ProfileSampler(str(run_dir / "raw"), sample_per_worker)
+    print(f"🔬 性能剖析: 每个工作线程抽样 {sample_per_worker} 个文件 -> {run_dir}")
+    return _sampler
+
+
+def init_worker(sampler: Optional[ProfileSampler]) -> None:
+    """进程池initializer：在子进程中启用同一抽样器"""
+    global _sampler
+    _sampler = sampler
+
+
+def get_sampler() -> Optional[ProfileSampler]:
+    return _sampler
+
+
+@contextmanager
+def maybe_profile(name: str) -> Iterator[None]:
+    """启用剖析时按抽样规则剖析，否则直接执行"""
+    if _sampler is None:
+        yield
+    else:
+        with _sampler.profile(name):
+            yield
+
+
+def stop_profiling() -> Optional[Path]:
+    """合并各工作线程的剖析结果并生成报告，返回报告目录"""
+    global _sampler
+    sampler, _sampler = _sampler, None
+    if sampler is None:
+        return None
+    raw_dir = Path(sampler.output_dir)
+    profile_files = sorted(raw_dir.glob("*.prof")) if raw_dir.exists() else []
+    if not profile_files:
+        print("  ⚠️ 没有剖析数据")
+        return None
+    return write_profile_report(profile_files, raw_dir.parent)
+
+
+# ----------------------------------------------------------------------
+# 报告
+# ----------------------------------------------------------------------
+def _func_name(func: Func) -> str:
+    filename, line, name = func
+    if filename == '~':
+        return name  # 内置函数
+    return f"{Path(filename).name}:{line}({name})"
+
+
+def _strategy_of(func: Func) -> Optional[str]:
+    filename = Path(func[0]).name
+    if filename in STRATEGY_FILES:
+        return STRATEGY_FILES[filename]
+    return STAGE_FUNCTIONS.get((filename, func[2]))
+
+
+class _CallGraph:
+    """由pstats数据重建的调用图"""
+
+    def __init__(self, stats: pstats.Stats):
+        self.stats = stats.stats
+        self.callees: Dict[Func, List[Func]] = defaultdict(list)
+        for func, (_, _, _, _, callers) in self.stats.items():
+            for caller in callers:
+                self.callees[caller].append(func)
+        self.roots = [func for func, value in self.stats.items() if not value[4]]
+        self.total = sum(value[2] for value in self.stats.values()) or 1e-9
+
+    def cumulative(self, func: Func) -> float:
+        return self.stats[func][3]
+
+    def edge_time(self, caller: Func, callee: Func) -> float:
+        """caller调用callee的累计耗时"""
+        return self.stats[callee][4][caller][3]
+
+    def walk(self, visit) -> None:
+        """
+        从根节点深度优先遍历调用路径
+
+        递归调用被截断；经过某条边的耗时按该边占被调函数累计耗时的比例分摊
+        visit(path, self_time, total_time)
+        """
+        def recurse(path: List[Func], scale: float) -> None:
+            func = path[-1]
+            tt, ct = self.stats[func][2], self.stats[func][3]
+            if ct * scale < self.total * MIN_FRACTION and len(path) > 1:
+                return
+            visit(path, tt * scale, ct * scale)
+            if len(path) >= MAX_DEPTH:
+                return
+            for callee in sorted(self.callees.get(func, []),
+                                 key=lambda c: -self.edge_time(func, c)):
+                if callee in path:
+                    continue
+                callee_ct = self.cumulative(callee)
+                if callee_ct <= 0:
+                    continue
+                share = min(self.edge_time(func, callee) / callee_ct, 1.0)
+                recurse(path + [callee], scale * share)
+
+        for root in sorted(self.roots, key=lambda f: -self.cumulative(f)):
+            recurse([root], 1.0)
+
+
+def write_profile_report(profile_files: List[Path], run_dir: Path) -> Path:
+    """合并 .prof 文件并写出调用树、折叠栈与按策略归类的热点"""
+    stats = pstats.Stats(*[str(p) for p in profile_files])
+    run_dir.mkdir(parents=True, exist_ok=True)
+    stats.dump_stats(str(run_dir / "profile.prof"))
+
+    graph = _CallGraph(stats)
+    tree_lines: List[str] = []
+    collapsed: Dict[str, float] = defaultdict(float)
+    by_strategy: Dict[str, Dict[str, float]] = defaultdict(lambda: defaultdict(float))
+
+    def visit(path: List[Func], self_time: float, total_time: float) -> None:
+        depth = len(path) - 1
+        tree_lines.append(f"{'  ' * depth}{total_time:8.3f}s {total_time / graph.total * 100:5.1f}%  "
+                          f"{_func_name(path[-1])}")
+        if self_time <= 0:
+            return
+        collapsed[";".join(_func_name(f) for f in path)] += self_time
+        # 调用路径上最内层的策略
+        strategy = 'other'
+        for func in reversed(path):
+            owner = _strategy_of(func)
+            if owner:
+                strategy = owner
+                break
+        by_strategy[strategy][_func_name(path[-1])] += self_time
+
+    graph.walk(visit)
+
+    # 折叠栈（单位：微秒）
+    with open(run_dir / "stacks.collapsed", 'w', encoding='utf-8') as f:
+        for stack, seconds in sorted(collapsed.items()):
+            micros = int(seconds * 1e6)
+            if micros > 0:
+                f.write(f"{stack} {micros}\n")
+
+    # 按策略归类的热点
+    hotspots = {
+        strategy: {
+            'self_time': round(sum(funcs.values()), 4),
+            'top': [{'function': name, 'self_time': round(seconds, 4)}
+                    for name, seconds in sorted(funcs.items(), key=lambda x: -x[1])[:10]]
+        }
+        for strategy, funcs in sorted(by_strategy.items(), key=lambda x: -sum(x[1].values()))
+    }
+    with open(run_dir / "hotspots.json", 'w', encoding='utf-8') as f:
+        json.dump({'files_profiled': len(profile_files),
+                   'total_time': round(graph.total, 4),
+                   'strategies': hotspots}, f, indent=2, ensure_ascii=False)
+
+    with open(run_dir / "call_tree.txt", 'w', encoding='utf-8') as f:
+        f.write(f"剖析文件数: {len(profile_files)}  总耗时: {graph.total:.3f}s\n\n")
+        f.write("按策略归类的热点 (自身耗时)\n")
+        f.write("=" * 70 + "\n")
+        for strategy, info in hotspots.items():
+            f.write(f"\n[{strategy}] {info['self_time']:.3f}s "
+                    f"({info['self_time'] / graph.total * 100:.1f}%)\n")
+            for item in info['top'][:5]:
+                f.write(f"    {item['self_time']:8.3f}s  {item['function']}\n")
+        f.write("\n\n调用树 (累计耗时，省略占比<{:.1f}%的分支)\n".format(MIN_FRACTION * 100))
+        f.write("=" * 70 + "\n")
+        f.write("\n".join(tree_lines) + "\n")
+
+    print(f"\n🔬 剖析报告: {run_dir / 'call_tree.txt'}")
+    print(f"   折叠栈: {run_dir / 'stacks.collapsed'}")
+    for strategy, info in list(hotspots.items())[:5]:
+        top = info['top'][0]['function'] if info['top'] else '-'
+        print(f"   {strategy:<6} {info['self_time']:8.3f}s  最热: {top}")
+    return run_dir
@@ -0,0 +1,349 @@
+"""
+提取进度实时发布
+Live Extraction Progress Endpoint
+
+运行中的提取进程在本地启动一个小型HTTP服务：
+    GET /progress  当前进度快照(JSON)
+    GET /events    进度事件流(Server-Sent Events)，每个事件附带最新快照
+    GET /metrics   运行指标(Prometheus文本格式，见 metrics.py)
+文件开始/阶段变化/完成时发布事件，监控端订阅事件流即可，无需轮询磁盘。
+速度按实际完成时间计算，剩余时间按已测得的每页耗时估算。
+"""
+import json
+import os
+import queue
+import threading
+import time
+import urllib.request
+from collections import deque
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional
+
+from .metrics import get_metrics
+
+DEFAULT_PROGRESS_PORT = 8765
+ENDPOINT_FILE = "output/progress_endpoint.json"
+
+# 瞬时速度的统计窗口（秒）
+RATE_WINDOW = 60.0
+
+
+class ProgressTracker:
+    """线程安全的进度状态，状态变化时向所有订阅者发布事件"""
+
+    def __init__(self, total_files: int = 0, total_pages: int = 0):
+        self.started_at = time.time()
+        self.total_files = total_files
+        self.total_pages = total_pages
+        self.done = 0
+        self.pages_done = 0
+        self.status_counts: Dict[str, int] = {}
+        self.in_flight: Dict[str, Dict[str, Any]] = {}
+        self.recent: deque = deque()      # (完成时间, 页数)
+        self.last_finished: deque = deque(maxlen=5)
+        self.finished = False
+
+        self._lock = threading.Lock()
+        self._subscribers: List[queue.Queue] = []
+
+    # ------------------------------------------------------------------
+    # 事件
+    # ------------------------------------------------------------------
+    def files_queued(self, count: int = 1, pages: int = 0) -> None:
+        """运行中追加待处理文件（流水线模式下总数随下载增长）"""
+        with self._lock:
+            self.total_files += count
+            self.total_pages += pages
+        self._publish({'type': 'files_queued', 'count': count})
+
+    def file_started(self, name: str, pages: Optional[int] = None) -> None:
+        with self._lock:
+            self.in_flight[name] = {'started': time.time(), 'stage': 'open', 'pages': pages}
+        self._publish({'type': 'file_started', 'file': name})
+
+    def file_stage(self, name: str, stage: str) -> None:
+        with self._lock:
+            info = self.in_flight.get(name)
+            if info is None:
+                return
+            info['stage'] = stage
+        self._publish({'type': 'stage', 'file': name, 'stage': stage})
+
+    def file_finished(self, name: str, status: str, pages: Optional[int] = None) -> None:
+        now = time.time()
+        with self._lock:
+            info = self.in_flight.pop(name, None)
+            if pages is None and info:
+                pages = info.get('pages')
+            pages = pages or 0
+            self.done += 1
+            self.pages_done += pages
+            self.status_counts[status] = self.status_counts.get(status, 0) + 1
+            self.recent.append((now, pages))
+            self.last_finished.append({
+                'file': name,
+                'status': status,
+                'seconds': round(now - info['started'], 2) if info else None
+            })
+        self._publish({'type': 'file_finished', 'file': name, 'status': status})
+
+    def run_finished(self) -> None:
+        with self._lock:
+            self.finished = True
+        self._publish({'type': 'run_finished'})
+
+    # ------------------------------------------------------------------
+    # 快照
+    # ------------------------------------------------------------------
+    def snapshot(self) -> Dict[str, Any]:
+        """当前进度（速度、剩余时间均由实际完成记录计算）"""
+        now = time.time()
+        with self._lock:
+            while self.recent and now - self.recent[0][0] > RATE_WINDOW:
+                self.recent.popleft()
+            elapsed = now - self.started_at
+            window = min(RATE_WINDOW, elapsed) or 1.0
+
+            remaining_files = max(self.total_files - self.done, 0)
+            remaining_pages = max(self.total_pages - self.pages_done, 0)
+            if self.pages_done and self.total_pages:
+                seconds_per_page = elapsed / self.pages_done
+                eta = remaining_pages * seconds_per_page
+            elif self.done:
+                seconds_per_page = None
+                eta = remaining_files * elapsed / self.done
+            else:
+                seconds_per_page = None
+                eta = None
+
+            return {
+                'pid': os.getpid(),
+                'elapsed': round(elapsed, 1),
+                'total_files': self.total_files,
+                'done': self.done,
+                'total_pages': self.total_pages,
+                'pages_done': self.pages_done,
+                'status_counts': dict(self.status_counts),
+                'files_per_min': round(self.done / elapsed * 60, 2) if elapsed else 0.0,
+                'recent_files_per_min': round(len(self.recent) / window * 60, 2),
+                'seconds_per_page': round(seconds_per_page, 3) if seconds_per_page else None,
+                'eta_seconds': round(eta, 1) if eta is not None else None,
+                'in_flight': [
+                    {'file': name, 'stage': info['stage'],
+                     'seconds': round(now - info['started'], 1)}
+                    for name, info in self.in_flight.items()
+                ],
+                'last_finished': list(self.last_finished),
+                'finished': self.finished
+            }
+
+    # ------------------------------------------------------------------
+    # 订阅
+    # ------------------------------------------------------------------
+    def subscribe(self) -> queue.Queue:
+        q: queue.Queue = queue.Queue(maxsize=1000)
+        with self._lock:
+            self._subscribers.append(q)
+        return q
+
+    def unsubscribe(self, q: queue.Queue) -> None:
+        with self._lock:
+            if q in self._subscribers:
+                self._subscribers.remove(q)
+
+    def _publish(self, event: Dict[str, Any]) -> None:
+        with self._lock:
+            subscribers = list(self._subscribers)
+        if not subscribers:
+            return
+        event['snapshot'] = self.snapshot()
+        for q in subscribers:
+            try:
+                q.put_nowait(event)
+            except queue.Full:
+                pass  # 订阅者太慢则丢弃事件，下一个事件仍带完整快照
+
+
+class _ProgressHandler(BaseHTTPRequestHandler):
+    """HTTP处理：/progress、/events 与 /metrics"""
+
+    tracker: ProgressTracker = None
+
+    def do_GET(self):
+        if self.path.startswith('/progress'):
+            body = json.dumps(self.tracker.snapshot(), ensure_ascii=False).encode('utf-8')
+            self.send_response(200)
+            self.send_header('Content-Type', 'application/json; charset=utf-8')
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+        elif self.path.startswith('/metrics'):
+            body = get_metrics().to_prometheus().encode('utf-8')
+            self.send_response(200)
+            self.send_header('Content-Type', 'text/plain; version=0.0.4; charset=utf-8')
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+        elif self.path.startswith('/events'):
+            self._stream_events()
+        else:
+            self.send_error(404)
+
+    def _stream_events(self):
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/event-stream; charset=utf-8')
+        self.send_header('Cache-Control', 'no-cache')
+        self.end_headers()
+
+        q = self.tracker.subscribe()
+        try:
+            self._send({'type': 'hello', 'snapshot': self.tracker.snapshot()})
+            while True:
+                try:
+                    event = q.get(timeout=15)
+                except queue.Empty:
+                    self.wfile.write(b': keepalive\n\n')
+                    self.wfile.flush()
+                    continue
+                self._send(event)
+                if event['type'] == 'run_finished':
+                    break
+        except (BrokenPipeError, ConnectionResetError):
+            pass
+        finally:
+            self.tracker.unsubscribe(q)
+
+    def _send(self, event: Dict[str, Any]) -> None:
+        data = json.dumps(event, ensure_ascii=False)
+        self.wfile.write(f"event: {event['type']}\ndata: {data}\n\n".encode('utf-8'))
+        self.wfile.flush()
+
+    def log_message(self, format, *args):
+        pass  # 不输出访问日志
+
+
+class ProgressServer:
+    """本地进度服务（只监听127.0.0.1）"""
+
+    def __init__(self, tracker: ProgressTracker, port: int = DEFAULT_PROGRESS_PORT):
+        handler = type('ProgressHandler', (_ProgressHandler,), {'tracker': tracker})
+        try:
+            self.httpd = ThreadingHTTPServer(('127.0.0.1', port), handler)
+        except OSError:
+            # 默认端口被占用（例如另一个提取进程），改用随机端口
+            self.httpd = ThreadingHTTPServer(('127.0.0.1', 0), handler)
+        self.httpd.daemon_threads = True
+        self.tracker = tracker
+        self.port = self.httpd.server_address[1]
+        self.url = f"http://127.0.0.1:{self.port}"
+        self._thread = threading.Thread(target=self.httpd.serve_forever,
+                                        name="progress-server", daemon=True)
+
+    def start(self) -> 'ProgressServer':
+        self._thread.start()
+        try:
+            endpoint = Path(ENDPOINT_FILE)
+            endpoint.parent.mkdir(parents=True, exist_ok=True)
+            with open(endpoint, 'w', encoding='utf-8') as f:
+                json.dump({'url': self.url, 'pid': os.getpid()}, f)
+        except OSError:
+            pass
+        return self
+
+    def stop(self) -> None:
+        self.tracker.run_finished()
+        self.httpd.shutdown()
+        self.httpd.server_close()
+        try:
+            endpoint = Path(ENDPOINT_FILE)
+            with open(endpoint, 'r', encoding='utf-8') as f:
+                if json.load(f).get('url') == self.url:
+                    endpoint.unlink()
+        except (OSError, ValueError):
+            pass
+
+
+# ----------------------------------------------------------------------
+# 进程内的当前进度（未启动时所有调用均为空操作）
+# ----------------------------------------------------------------------
+_active: Optional[ProgressTracker] = None
+
+
+def start_progress(total_files: int, total_pages: int = 0,
+                   port: Optional[int] = DEFAULT_PROGRESS_PORT) -> Optional[ProgressServer]:
+    """开始发布本次运行的进度；port为None时只在进程内记录"""
+    global _active
+    _active = ProgressTracker(total_files, total_pages)
+    if port is None:
+        return None
+    try:
+        server = ProgressServer(_active, port).start()
+    except OSError as e:
+        print(f"  ⚠️ 无法启动进度服务: {e}")
+        return None
+    print(f"📡 进度服务: {server.url}/progress  (事件流: {server.url}/events)")
+    return server
+
+
+def stop_progress(server: Optional[ProgressServer]) -> None:
+    """结束本次运行的进度发布"""
+    global _active
+    if server is not None:
+        server.stop()
+    elif _active is not None:
+        _active.run_finished()
+    _active = None
+
+
+def files_queued(count: int = 1, pages: int = 0) -> None:
+    if _active is not None:
+        _active.files_queued(count, pages)
+
+
+def file_started(name: str, pages: Optional[int] = None) -> None:
+    if _active is not None:
+        _active.file_started(name, pages)
+
+
+def file_stage(name: str, stage: str) -> None:
+    if _active is not None:
+        _active.file_stage(name, stage)
+
+
+def file_finished(name: str, status: str, pages: Optional[int] = None) -> None:
+    if _active is not None:
+        _active.file_finished(name, status, pages)
+
+
+# ----------------------------------------------------------------------
+# 订阅端
+# ----------------------------------------------------------------------
+def find_endpoint() -> str:
+    """正在运行的提取进程的进度服务地址"""
+    try:
+        with open(ENDPOINT_FILE, 'r', encoding='utf-8') as f:
+            return json.load(f)['url']
+    except (OSError, ValueError, KeyError):
+        return f"http://127.0.0.1:{DEFAULT_PROGRESS_PORT}"
+
+
+def subscribe_events(url: Optional[str] = None, timeout: float = 30.0) -> Iterator[Dict[str, Any]]:
+    """
+    订阅进度事件流
+
+    连接失败时抛出 OSError（包括 URLError），调用方可回退到旧的轮询方式
+    """
+    url = url or find_endpoint()
+    with urllib.request.urlopen(f"{url}/events", timeout=timeout) as response:
+        event_type = None
+        for raw in response:
+            line = raw.decode('utf-8').rstrip('\n')
+            if line.startswith('event: '):
+                event_type = line[7:]
+            elif line.startswith('data: '):
+                event = json.loads(line[6:])
+                event.setdefault('type', event_type)
+                yield event
+                if event['type'] == 'run_finished':
+                    return
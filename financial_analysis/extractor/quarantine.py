@@ -0,0 +1,358 @@
+"""
+问题文件隔离区
+Poison-file Quarantine
+
+少数PDF会让 pdfminer 反复卡死或崩溃。隔离区按内容哈希（sha256）登记失败，改名的副本和重新下载的同一文件
+同样命中；每次失败记录签名 "阶段:类型"：
+    - 异常：提取中抛出的异常类型，如 text:PSSyntaxError
+    - 超时：单文件耗时超过时间预算，阶段为卡住或最慢的一步，如 table:timeout
+      （提取在看门狗线程中执行，超出预算时放弃等待，调度继续处理下一个文件）
+    - 崩溃：进程在处理该文件时退出（上次运行遗留的处理中记录），如 text:crash；
+      正常结束、Ctrl+C 或 SIGTERM 时处理中的文件记为中断，不计失败
+同一签名出现 QUARANTINE_AFTER 次或累计失败 MAX_FAILURES 次后隔离。
+调度前按文档目录的哈希（文件未变化时只需 stat）查表，隔离的文件直接跳过；
+extract --slow-lane 只处理隔离区的文件（串行，放宽时间预算），成功后解除隔离。
+登记表保存在 output/cache/quarantine.json，处理中记录追加到 output/cache/quarantine_inflight.jsonl。
+"""
+import os
+import sys
+import json
+import time
+import uuid
+import atexit
+import signal
+import threading
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+try:
+    import psutil
+    HAS_PSUTIL = True
+except ImportError:
+    HAS_PSUTIL = False
+
+DEFAULT_QUARANTINE_PATH = "output/cache/quarantine.json"
+
+# 单文件时间预算（秒）：普通通道 / 慢速通道
+FILE_BUDGET_SECONDS = float(os.environ.get('FILE_BUDGET_SECONDS', 120))
+SLOW_LANE_BUDGET_SECONDS = float(os.environ.get('SLOW_LANE_BUDGET_SECONDS', 1800))
+# 同一签名出现次数 / 累计失败次数达到该值后隔离
+QUARANTINE_AFTER = 2
+MAX_FAILURES = 3
+# 每个文件保留的最近失败记录数
+MAX_EVENTS = 10
+
+
+def failure_signature(stage: Optional[str], kind: str) -> str:
+    """失败签名：阶段:异常类型 / timeout / crash"""
+    return f"{stage or 'open'}:{kind}"
+
+
+def _process_started(pid: int) -> Optional[float]:
+    """进程的启动时间（与PID一起识别进程，PID被复用时不会误判）；进程不存在或无法判断时返回 None"""
+    try:
+        with open(f'/proc/{pid}/stat', encoding='utf-8') as f:
+            return float(f.read().rsplit(')', 1)[1].split()[19])  # 开机后的时钟滴答数
+    except (OSError, IndexError, ValueError):
+        pass
+    if HAS_PSUTIL:
+        try:
+            return psutil.Process(pid).create_time()
+        except psutil.Error:
+            return None
+    return None
+
+
+def _owner_alive(op: Dict[str, Any], run_id: str) -> bool:
+    """写下处理中记录的进程是否仍在运行（按运行ID、PID和进程启动时间判断，无法判断时按慢速通道预算估计）"""
+    if op.get('run') == run_id:
+        return True
+    pid = op['pid']
+    if pid == os.getpid():
+        return False  # 之前使用同一PID的进程已退出（如容器重启后PID相同）
+    started = _process_started(pid)
+    if started is not None:
+        return op.get('proc_start') is None or abs(started - op['proc_start']) < 1.0
+    if HAS_PSUTIL:
+        return psutil.pid_exists(pid)
+    if os.name == 'posix':
+        try:
+            os.kill(pid, 0)
+        except ProcessLookupError:
+            return False
+        except PermissionError:
+            return True
+        return True
+    return time.time() - op['time'] < SLOW_LANE_BUDGET_SECONDS
+
+
+def _exit_on_sigterm(signum, frame) -> None:
+    """SIGTERM 按正常退出处理（执行 atexit，处理中的文件记为中断而不是崩溃）"""
+    sys.exit(128 + signum)
+
+
+class Quarantine:
+    """
+    隔离区登记表
+
+    格式:
+        documents: sha256 -> {names, signatures: 签名 -> 次数, failures, quarantined, since, events: [...]}
+    """
+
+    def __init__(self, path: str = DEFAULT_QUARANTINE_PATH):
+        self.path = Path(path)
+        self.inflight_file = self.path.with_name(self.path.stem + '_inflight.jsonl')
+        self._lock = threading.Lock()
+        self.documents: Dict[str, Dict[str, Any]] = {}
+        self._inflight: Dict[str, Dict[str, Any]] = {}  # 文件名 -> {sha, stage, started}
+        self.run_id = uuid.uuid4().hex[:12]
+        self._process_started = _process_started(os.getpid())
+        self.slow_lane = False
+        self.budget = FILE_BUDGET_SECONDS
+        self.run_skipped = 0
+        self.run_quarantined: List[str] = []
+        self._dirty = False
+        self._load()
+
+    def _load(self) -> None:
+        if not self.path.exists():
+            return
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                self.documents = json.load(f).get('documents', {})
+        except (OSError, ValueError) as e:
+            print(f"  ⚠️ 隔离区登记表损坏，重新建立: {e}")
+            self.documents = {}
+
+    def save(self) -> None:
+        """原子写入（没有变化时跳过）"""
+        with self._lock:
+            if not self._dirty:
+                return
+            data = {'updated': datetime.now().isoformat(), 'documents': self.documents}
+            self._dirty = False
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_file = self.path.with_suffix('.tmp')
+        with open(tmp_file, 'w', encoding='utf-8') as f:
+            json.dump(data, f, ensure_ascii=False, indent=1)
+        os.replace(tmp_file, self.path)
+
+    # ------------------------------------------------------------------
+    # 调度
+    # ------------------------------------------------------------------
+    def reset_run(self, slow_lane: bool = False) -> None:
+        """开始新一次运行：选择时间预算并清点上次运行中崩溃的文件"""
+        with self._lock:
+            self.slow_lane = slow_lane
+            self.budget = SLOW_LANE_BUDGET_SECONDS if slow_lane else FILE_BUDGET_SECONDS
+            self.run_skipped = 0
+            self.run_quarantined = []
+        if threading.current_thread() is threading.main_thread() \
+                and signal.getsignal(signal.SIGTERM) == signal.SIG_DFL:
+            signal.signal(signal.SIGTERM, _exit_on_sigterm)
+        self.recover()
+
+    def partition(self, pdf_files: Iterable[Path],
+                  digests: Dict[Path, str]) -> Tuple[List[Path], List[Path]]:
+        """
+        按内容哈希分出隔离的文件（保持顺序）
+
+        Args:
+            digests: 路径 -> sha256（文档目录的 hash_files，文件未变化时只需 stat）
+
+        Returns:
+            (可处理的文件, 隔离的文件)
+        """
+        allowed, quarantined = [], []
+        with self._lock:
+            for pdf in pdf_files:
+                entry = self.documents.get(digests.get(pdf, ''))
+                (quarantined if entry and entry.get('quarantined') else allowed).append(pdf)
+        return allowed, quarantined
+
+    def skipped(self, count: int) -> None:
+        with self._lock:
+            self.run_skipped += count
+
+    # ------------------------------------------------------------------
+    # 处理中记录（工作线程调用）
+    # ------------------------------------------------------------------
+    def _journal(self, op: Dict[str, Any]) -> None:
+        """追加处理中记录（每行立即落盘，进程崩溃后可据此找出当时处理的文件）"""
+        self.inflight_file.parent.mkdir(parents=True, exist_ok=True)
+        with open(self.inflight_file, 'a', encoding='utf-8') as f:
+            f.write(json.dumps(op, ensure_ascii=False) + '\n')
+
+    def begin(self, name: str, sha256: Optional[str]) -> None:
+        """文件开始处理"""
+        if not sha256:
+            return
+        now = time.time()
+        with self._lock:
+            self._inflight[name] = {'sha': sha256, 'stage': 'open', 'started': now}
+            self._journal({'op': 'begin', 'name': name, 'sha': sha256, 'pid': os.getpid(),
+                           'run': self.run_id, 'proc_start': self._process_started, 'time': now})
+
+    def stage(self, name: Optional[str], stage: str) -> None:
+        """文件进入新阶段（阶段变化时才记录）"""
+        with self._lock:
+            info = self._inflight.get(name)
+            if info is None or info['stage'] == stage:
+                return
+            info['stage'] = stage
+            self._journal({'op': 'stage', 'name': name, 'stage': stage})
+
+    def finish(self, name: str, seconds: float, error: Optional[str] = None,
+               steps: Iterable[Dict[str, Any]] = ()) -> Optional[str]:
+        """
+        文件处理结束：出现异常或超出时间预算时记录失败
+
+        Args:
+            error: 异常类型
+            steps: 各策略的执行记录（trace 的 steps）；超时签名取耗时最长的阶段，
+                   策略之外的耗时计为 text（逐页解析文本）
+
+        Returns:
+            记录的失败签名（没有失败时为None）
+        """
+        with self._lock:
+            info = self._inflight.pop(name, None)
+            if info is None:
+                return None
+            self._journal({'op': 'end', 'name': name})
+        if error:
+            signature = failure_signature(info['stage'], error)
+        elif seconds > self.budget:
+            stage_seconds = {'text': seconds}
+            for step in steps:
+                stage_seconds['text'] -= step['seconds']
+                stage_seconds[step['strategy']] = stage_seconds.get(step['strategy'], 0.0) + step['seconds']
+            signature = failure_signature(max(stage_seconds, key=stage_seconds.get), 'timeout')
+        else:
+            if self.slow_lane:
+                self.release(info['sha'])
+            return None
+        self.record_failure(info['sha'], name, signature, seconds)
+        return signature
+
+    def abandon(self, name: str, seconds: float) -> Optional[str]:
+        """看门狗放弃仍在运行的文件：按当前阶段记录超时，返回失败签名"""
+        with self._lock:
+            info = self._inflight.pop(name, None)
+            if info is None:
+                return None
+            self._journal({'op': 'end', 'name': name, 'timed_out': True})
+        signature = failure_signature(info['stage'], 'timeout')
+        self.record_failure(info['sha'], name, signature, seconds)
+        return signature
+
+    def recover(self) -> int:
+        """上次运行遗留的处理中记录（进程已退出）记为崩溃，返回崩溃的文件数"""
+        if not self.inflight_file.exists():
+            return 0
+        pending: Dict[str, Dict[str, Any]] = {}
+        try:
+            with open(self.inflight_file, 'r', encoding='utf-8') as f:
+                for line in f:
+                    try:
+                        op = json.loads(line)
+                    except ValueError:
+                        continue  # 写入时崩溃的不完整行
+                    if op['op'] == 'begin':
+                        pending[op['name']] = op
+                    elif op['op'] == 'stage' and op['name'] in pending:
+                        pending[op['name']]['stage'] = op['stage']
+                    elif op['op'] == 'end':
+                        pending.pop(op['name'], None)
+        except OSError:
+            return 0
+
+        crashed = {name: op for name, op in pending.items() if not _owner_alive(op, self.run_id)}
+        for name, op in crashed.items():
+            print(f"  💥 上次运行在处理 {name} 时中断（阶段 {op.get('stage', 'open')}）")
+            self.record_failure(op['sha'], name, failure_signature(op.get('stage'), 'crash'),
+                                time.time() - op['time'])
+
+        # 只保留仍在运行的进程的记录
+        with self._lock:
+            alive = [op for name, op in pending.items() if name not in crashed]
+            tmp_file = self.inflight_file.with_suffix('.tmp')
+            with open(tmp_file, 'w', encoding='utf-8') as f:
+                for op in alive:
+                    f.write(json.dumps(op, ensure_ascii=False) + '\n')
+            os.replace(tmp_file, self.inflight_file)
+        return len(crashed)
+
+    def close(self) -> None:
+        """进程正常结束或被中断时：仍在处理中的文件记为中断（不计失败），并保存登记表"""
+        with self._lock:
+            for name in list(self._inflight):
+                self._journal({'op': 'end', 'name': name, 'interrupted': True})
+            self._inflight.clear()
+        self.save()
+
+    # ------------------------------------------------------------------
+    # 登记
+    # ------------------------------------------------------------------
+    def record_failure(self, sha256: str, name: str, signature: str, seconds: float = 0.0) -> bool:
+        """记录一次失败，返回是否因此进入隔离区"""
+        with self._lock:
+            entry = self.documents.setdefault(sha256, {'names': [], 'signatures': {}, 'failures': 0,
+                                                       'quarantined': False, 'since': None, 'events': []})
+            if name not in entry['names']:
+                entry['names'].append(name)
+            entry['signatures'][signature] = entry['signatures'].get(signature, 0) + 1
+            entry['failures'] += 1
+            entry['events'].append({'time': datetime.now().isoformat(), 'file': name,
+                                    'signature': signature, 'seconds': round(seconds, 1)})
+            del entry['events'][:-MAX_EVENTS]
+            self._dirty = True
+
+            newly = not entry['quarantined'] and (
+                entry['signatures'][signature] >= QUARANTINE_AFTER or entry['failures'] >= MAX_FAILURES)
+            if newly:
+                entry['quarantined'] = True
+                entry['since'] = datetime.now().isoformat()
+                self.run_quarantined.append(name)
+        if newly:
+            print(f"  🚫 {name}: 失败 {entry['failures']} 次（{signature}），移入隔离区")
+        return newly
+
+    def release(self, sha256: str) -> None:
+        """解除隔离（慢速通道处理成功）"""
+        with self._lock:
+            entry = self.documents.get(sha256)
+            if entry is None:
+                return
+            if entry['quarantined']:
+                print(f"  ✅ {entry['names'][-1]}: 慢速通道处理成功，解除隔离")
+            entry.update(quarantined=False, failures=0, signatures={}, since=None)
+            self._dirty = True
+
+    # ------------------------------------------------------------------
+    # 报告
+    # ------------------------------------------------------------------
+    def print_summary(self) -> None:
+        """打印本次运行的隔离情况"""
+        total = sum(1 for entry in self.documents.values() if entry['quarantined'])
+        if not (total or self.run_skipped or self.run_quarantined):
+            return
+        print(f"\n隔离区: 共 {total} 个文件 | 本次跳过 {self.run_skipped} | "
+              f"本次新隔离 {len(self.run_quarantined)}")
+        if self.run_skipped:
+            print("  隔离的文件可用 python main.py extract --slow-lane 单独处理")
+
+
+_quarantine: Optional[Quarantine] = None
+_quarantine_lock = threading.Lock()
+
+
+def get_quarantine(path: str = DEFAULT_QUARANTINE_PATH) -> Quarantine:
+    """进程内共享的隔离区"""
+    global _quarantine
+    with _quarantine_lock:
+        if _quarantine is None:
+            _quarantine = Quarantine(path)
+            atexit.register(_quarantine.close)
+        return _quarantine
@@ -0,0 +1,173 @@
+"""
+提取结果缓存
+Extraction Result Cache
+
+缓存键为 PDF内容哈希 + 提取模式 + 提取逻辑版本指纹：
+文件改名仍可命中，文件内容或提取代码变化后自动失效。
+文件哈希通过文档目录的 (大小, 修改时间) 索引获取，未变化的文件不重新计算。
+"""
+import os
+import json
+import hashlib
+import threading
+from dataclasses import asdict, fields
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional
+
+from .financial_models import FinancialData
+from ..download.document_catalog import get_catalog
+
+DEFAULT_CACHE_DIR = "output/extraction_cache"
+
+# 参与版本指纹的源文件（相对于extractor包）
+FINGERPRINT_SOURCES = (
+    "base_extractor.py",
+    "smart_extractor.py",
+    "planner.py",
+    "page_hints.py",
+    "pattern_packs.py",
+    "strategies/*.py",
+)
+
+_fingerprint: Optional[str] = None
+
+
+def extractor_fingerprint() -> str:
+    """提取逻辑版本指纹：提取器与各策略源码的哈希"""
+    global _fingerprint
+    if _fingerprint is None:
+        package_dir = Path(__file__).parent
+        hasher = hashlib.sha256()
+        for pattern in FINGERPRINT_SOURCES:
+            for source in sorted(package_dir.glob(pattern)):
+                hasher.update(source.name.encode())
+                # 统一换行符，避免不同检出方式导致指纹不同
+                hasher.update(source.read_bytes().replace(b'\r\n', b'\n'))
+        _fingerprint = hasher.hexdigest()[:16]
+    return _fingerprint
+
+
+def mode_key(extraction_mode: str, use_llm: bool) -> str:
+    """提取模式键（是否启用LLM会影响结果）"""
+    return f"{extraction_mode}+llm" if use_llm else extraction_mode
+
+
+class ResultCache:
+    """
+    提取结果缓存
+
+    文件格式 (JSON):
+        entries: "sha256:模式:指纹" -> 完整的FinancialData字段
+        files: 文件名 -> 最近一次缓存的 [sha256, 模式, 指纹]
+    """
+
+    VERSION = 1
+
+    def __init__(self, cache_dir: str = DEFAULT_CACHE_DIR):
+        self.cache_file = Path(cache_dir) / "results.json"
+        self.fingerprint = extractor_fingerprint()
+        self.entries: Dict[str, Dict[str, Any]] = {}
+        self.files: Dict[str, List[str]] = {}
+        self._hashes: Dict[Path, str] = {}
+        self._lock = threading.Lock()
+        self._load()
+
+    def _load(self) -> None:
+        """加载缓存文件"""
+        if not self.cache_file.exists():
+            return
+        try:
+            with open(self.cache_file, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+            if data.get('version') == self.VERSION:
+                self.entries = data.get('entries', {})
+                self.files = data.get('files', {})
+        except (OSError, ValueError):
+            pass  # 缓存损坏则重建
+
+    def save(self) -> None:
+        """原子写入缓存文件，并保存文档目录中的哈希索引"""
+        with self._lock:
+            data = {
+                'version': self.VERSION,
+                'updated': datetime.now().isoformat(),
+                'entries': self.entries,
+                'files': self.files
+            }
+            self.cache_file.parent.mkdir(parents=True, exist_ok=True)
+            tmp_file = self.cache_file.with_suffix('.tmp')
+            with open(tmp_file, 'w', encoding='utf-8') as f:
+                json.dump(data, f, ensure_ascii=False)
+            os.replace(tmp_file, self.cache_file)
+        get_catalog().save()
+
+    def _key(self, sha256: str, mode: str) -> str:
+        return f"{sha256}:{mode}:{self.fingerprint}"
+
+    def hash_files(self, pdf_paths: Iterable[Path]) -> Dict[Path, str]:
+        """批量获取内容哈希（未变化的文件走 stat 快速路径）"""
+        pdf_paths = [Path(p) for p in pdf_paths]
+        missing = [p for p in pdf_paths if p not in self._hashes]
+        if missing:
+            self._hashes.update(get_catalog().hash_files(missing))
+        return {p: self._hashes[p] for p in pdf_paths if p in self._hashes}
+
+    def get(self, pdf_path: Path, mode: str) -> Optional[FinancialData]:
+        """缓存命中时返回结果（文件路径与文件名更新为当前文件）"""
+        sha256 = self.hash_files([pdf_path]).get(Path(pdf_path))
+        if sha256 is None:
+            return None
+        with self._lock:
+            cached = self.entries.get(self._key(sha256, mode))
+        if cached is None:
+            return None
+
+        known = {f.name for f in fields(FinancialData)}
+        result = FinancialData(**{k: v for k, v in cached.items() if k in known})
+        result.file_name = Path(pdf_path).name
+        result.file_path = str(pdf_path)
+        result.extraction_method = "cached"
+        return result
+
+    def put(self, pdf_path: Path, mode: str, result: FinancialData) -> None:
+        """缓存结果（失败结果不缓存）"""
+        if result.success_level in (None, "Failed", "Skipped"):
+            return
+        sha256 = self.hash_files([pdf_path]).get(Path(pdf_path))
+        if sha256 is None:
+            return
+        with self._lock:
+            self.entries[self._key(sha256, mode)] = asdict(result)
+            self.files[Path(pdf_path).name] = [sha256, mode, self.fingerprint]
+
+    def plan(self, pdf_paths: Iterable[Path], mode: str) -> Dict[str, List[Path]]:
+        """
+        增量处理计划
+
+        Returns:
+            new: 从未缓存过的文件
+            changed: 同名文件内容已变化
+            invalidated: 内容未变但提取模式或提取逻辑版本已变化
+            unchanged: 缓存有效，可以跳过
+        """
+        pdf_paths = [Path(p) for p in pdf_paths]
+        digests = self.hash_files(pdf_paths)
+        plan = {'new': [], 'changed': [], 'invalidated': [], 'unchanged': []}
+        cached_shas = {key.split(':', 1)[0] for key in self.entries}
+
+        for path in pdf_paths:
+            sha256 = digests.get(path)
+            if sha256 is None:
+                continue
+            if self._key(sha256, mode) in self.entries:
+                plan['unchanged'].append(path)
+                continue
+            previous = self.files.get(path.name)
+            if previous and previous[0] != sha256:
+                plan['changed'].append(path)
+            elif previous or sha256 in cached_shas:
+                plan['invalidated'].append(path)
+            else:
+                plan['new'].append(path)
+        return plan
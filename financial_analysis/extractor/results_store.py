@@ -0,0 +1,266 @@
+"""
+列式结果存储
+Partitioned Columnar Results Store
+
+每次提取运行的结果写成一个分区（安装pyarrow时为Parquet，否则为CSV.gz），
+列结构固定。合并时只读取尚未压缩的新分区，与已合并数据去重后
+写回合并文件并删除已压缩的分区。CSV/XLSX只是导出视图。
+"""
+import os
+import json
+import threading
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional
+
+import pandas as pd
+
+from .financial_models import FinancialData
+
+# 尝试导入Parquet支持
+try:
+    import pyarrow  # noqa: F401
+    HAS_PARQUET = True
+except ImportError:
+    HAS_PARQUET = False
+
+DEFAULT_STORE_DIR = "output/results_store"
+
+# 固定列结构
+RESULT_COLUMNS = ['Company', 'Year', 'Total Assets', 'Total Liabilities',
+                  'Revenue', 'Net Profit', 'Method', 'File', 'Status',
+                  'Success Level', 'Currency', 'Unit', 'Language']
+NUMERIC_COLUMNS = ['Year', 'Total Assets', 'Total Liabilities', 'Revenue', 'Net Profit']
+
+# 旧CSV中的小写列名
+LEGACY_COLUMN_MAPPING = {
+    'company': 'Company',
+    'year': 'Year',
+    'total_assets': 'Total Assets',
+    'total_liabilities': 'Total Liabilities',
+    'revenue': 'Revenue',
+    'net_profit': 'Net Profit',
+    'success_level': 'Success Level',
+    'method': 'Method',
+    'file': 'File'
+}
+
+
+def normalize_frame(df: pd.DataFrame) -> pd.DataFrame:
+    """统一为固定列结构和类型"""
+    df = df.rename(columns={
+        old: new for old, new in LEGACY_COLUMN_MAPPING.items()
+        if old in df.columns and new not in df.columns
+    })
+    for column in RESULT_COLUMNS:
+        if column not in df.columns:
+            df[column] = None
+    df = df[RESULT_COLUMNS].copy()
+    for column in NUMERIC_COLUMNS:
+        df[column] = pd.to_numeric(df[column], errors='coerce')
+    df['Year'] = df['Year'].round().astype('Int64')
+    for column in RESULT_COLUMNS:
+        if column not in NUMERIC_COLUMNS:
+            df[column] = df[column].astype('object').where(df[column].notna(), None)
+    return df
+
+
+def results_to_frame(results: Iterable[FinancialData]) -> pd.DataFrame:
+    """FinancialData列表 -> 固定列结构的DataFrame"""
+    rows = []
+    for result in results:
+        row = result.to_dict()
+        row['Method'] = result.extraction_method
+        rows.append(row)
+    return normalize_frame(pd.DataFrame(rows, columns=RESULT_COLUMNS))
+
+
+class ResultsStore:
+    """
+    分区结果存储
+
+    目录结构:
+        partitions/part-<时间>-<序号>.parquet|.csv.gz   未合并的分区
+        merged.parquet|.csv.gz                          已合并（按File去重）的数据
+        manifest.json                                   分区列表、已导入的旧CSV
+    """
+
+    VERSION = 1
+
+    def __init__(self, store_dir: str = DEFAULT_STORE_DIR):
+        self.store_dir = Path(store_dir)
+        self.partition_dir = self.store_dir / "partitions"
+        self.manifest_file = self.store_dir / "manifest.json"
+        self.format = "parquet" if HAS_PARQUET else "csv.gz"
+        self._lock = threading.Lock()
+        self.manifest = self._load_manifest()
+
+    def _load_manifest(self) -> Dict[str, Any]:
+        """加载清单"""
+        if self.manifest_file.exists():
+            try:
+                with open(self.manifest_file, 'r', encoding='utf-8') as f:
+                    manifest = json.load(f)
+                if manifest.get('version') == self.VERSION:
+                    return manifest
+            except (OSError, ValueError):
+                pass
+        return {
+            'version': self.VERSION,
+            'partitions': [],
+            'merged': None,
+            'imported': {}
+        }
+
+    def _save_manifest(self) -> None:
+        """原子写入清单"""
+        self.store_dir.mkdir(parents=True, exist_ok=True)
+        tmp_file = self.manifest_file.with_suffix('.tmp')
+        with open(tmp_file, 'w', encoding='utf-8') as f:
+            json.dump(self.manifest, f, indent=2, ensure_ascii=False)
+        os.replace(tmp_file, self.manifest_file)
+
+    # ------------------------------------------------------------------
+    # 读写文件
+    # ------------------------------------------------------------------
+    def _write_frame(self, df: pd.DataFrame, path: Path) -> None:
+        tmp_file = path.with_name(path.name + '.tmp')
+        if path.name.endswith('.parquet'):
+            df.to_parquet(tmp_file, index=False)
+        else:
+            df.to_csv(tmp_file, index=False, compression='gzip')
+        os.replace(tmp_file, path)
+
+    def _read_frame(self, path: Path) -> pd.DataFrame:
+        if path.name.endswith('.parquet'):
+            return normalize_frame(pd.read_parquet(path))
+        return normalize_frame(pd.read_csv(path, compression='gzip'))
+
+    # ------------------------------------------------------------------
+    # 写入
+    # ------------------------------------------------------------------
+    def write_partition(self, df: pd.DataFrame, source: Optional[str] = None) -> Optional[str]:
+        """
+        写入一个新分区
+
+        Args:
+            df: 结果数据
+            source: 对应的导出CSV路径（登记为已导入，合并时不再重复读取）
+
+        Returns:
+            分区文件名
+        """
+        if df.empty:
+            return None
+        df = normalize_frame(df)
+        with self._lock:
+            self.partition_dir.mkdir(parents=True, exist_ok=True)
+            seq = len(self.manifest['partitions'])
+            name = f"part-{datetime.now().strftime('%Y%m%d%H%M%S')}-{seq:04d}.{self.format}"
+            self._write_frame(df, self.partition_dir / name)
+            self.manifest['partitions'].append({
+                'name': name,
+                'rows': len(df),
+                'created': datetime.now().isoformat()
+            })
+            if source:
+                self._mark_imported(Path(source))
+            self._save_manifest()
+        return name
+
+    def write_results(self, results: List[FinancialData], source: Optional[str] = None) -> Optional[str]:
+        """把一次运行的提取结果写成分区"""
+        return self.write_partition(results_to_frame(results), source=source)
+
+    def _mark_imported(self, csv_file: Path) -> None:
+        stat = csv_file.stat()
+        self.manifest['imported'][str(csv_file)] = [stat.st_size, stat.st_mtime_ns]
+
+    def import_csv_files(self, csv_files: Iterable[Path]) -> int:
+        """
+        把尚未导入（或导入后被修改）的旧结果CSV写成分区
+
+        Returns:
+            新导入的文件数
+        """
+        imported = 0
+        for csv_file in csv_files:
+            try:
+                stat = csv_file.stat()
+                if self.manifest['imported'].get(str(csv_file)) == [stat.st_size, stat.st_mtime_ns]:
+                    continue
+                df = pd.read_csv(csv_file)
+            except Exception:
+                continue
+            if len(df) > 0:
+                self.write_partition(df, source=str(csv_file))
+                print(f'导入 {csv_file.name}: {len(df)} 条')
+                imported += 1
+            else:
+                with self._lock:
+                    self._mark_imported(csv_file)
+                    self._save_manifest()
+        return imported
+
+    # ------------------------------------------------------------------
+    # 合并与压缩
+    # ------------------------------------------------------------------
+    def compact(self) -> pd.DataFrame:
+        """
+        把新分区合并进已合并数据（同一File保留最新结果），删除已合并的分区
+
+        Returns:
+            合并后的完整数据
+        """
+        with self._lock:
+            merged_info = self.manifest.get('merged')
+            frames = []
+            if merged_info and (self.store_dir / merged_info['name']).exists():
+                frames.append(self._read_frame(self.store_dir / merged_info['name']))
+
+            partitions = self.manifest['partitions']
+            for partition in partitions:
+                path = self.partition_dir / partition['name']
+                if path.exists():
+                    frames.append(self._read_frame(path))
+
+            if not frames:
+                return normalize_frame(pd.DataFrame(columns=RESULT_COLUMNS))
+
+            combined = pd.concat(frames, ignore_index=True) if len(frames) > 1 else frames[0]
+            if not partitions:
+                return combined
+
+            # 去重（保留最新的）
+            with_file = combined[combined['File'].notna()].drop_duplicates(subset=['File'], keep='last')
+            combined = pd.concat([with_file, combined[combined['File'].isna()]], ignore_index=True)
+
+            name = f"merged.{self.format}"
+            self._write_frame(combined, self.store_dir / name)
+            self.manifest['merged'] = {
+                'name': name,
+                'rows': len(combined),
+                'updated': datetime.now().isoformat()
+            }
+            self.manifest['partitions'] = []
+            self._save_manifest()
+
+            for partition in partitions:
+                (self.partition_dir / partition['name']).unlink(missing_ok=True)
+
+            return combined
+
+    # ------------------------------------------------------------------
+    # 导出视图
+    # ------------------------------------------------------------------
+    @staticmethod
+    def export(df: pd.DataFrame, output_prefix: str) -> Dict[str, str]:
+        """导出CSV和Excel视图"""
+        output_file = Path(f'{output_prefix}.csv')
+        output_file.parent.mkdir(parents=True, exist_ok=True)
+        df.to_csv(output_file, index=False)
+
+        excel_file = Path(f'{output_prefix}.xlsx')
+        df.to_excel(excel_file, index=False)
+
+        return {'csv_file': str(output_file), 'excel_file': str(excel_file)}
@@ -0,0 +1,191 @@
+"""
+定向重试队列
+Targeted Retry Queue with Escalation Ladder
+
+重试不再按某个提取模式把文件整体重跑一遍，而是每个文件沿阶梯逐级升级：
+    regex → table → ocr → llm
+    - 只执行尚未尝试过的阶段：主控表 trace 中已执行的策略和之前重试执行过的阶段都算已尝试
+    - 从上次的字段值出发，缺失字段补齐即停止
+    - 不适用的阶段（文本版PDF的OCR、扫描版的表格）记为已尝试；
+      出错的阶段（策略异常、OCR无输出、LLM无响应）不记为已尝试，退避后再试；
+      不可用的阶段（未启用LLM、未安装OCR）留到以后可用时再试
+每次尝试后未补齐的文件按指数退避安排下次尝试，阶段全部尝试过或尝试次数用尽的文件不再重试。
+队列状态保存在 output/cache/retry_queue.json，每次尝试的结果追加到 output/reports/retry_attempts.jsonl。
+"""
+import os
+import json
+import time
+import threading
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Set
+
+LADDER = ('regex', 'table', 'ocr', 'llm')
+FIELDS = ('total_assets', 'total_liabilities', 'revenue', 'net_profit')
+
+DEFAULT_QUEUE_PATH = "output/cache/retry_queue.json"
+DEFAULT_ATTEMPTS_LOG = "output/reports/retry_attempts.jsonl"
+
+# 退避：第n次尝试未补齐后等待 BACKOFF_SECONDS × 2^(n-1)，不超过 MAX_BACKOFF_SECONDS
+BACKOFF_SECONDS = 300
+MAX_BACKOFF_SECONDS = 6 * 3600
+# 每个文件最多尝试次数（出错的阶段会反复重试）
+MAX_ATTEMPTS = 6
+
+# 阶段结果：ok / skipped 记为已尝试，error / unavailable 以后再试
+TRIED_STATUSES = ('ok', 'skipped')
+
+
+def tried_in_trace(trace: Optional[Dict[str, Any]]) -> Set[str]:
+    """主控表 trace 中已执行（且未出错）的阶梯阶段；重试的 trace 直接记录了各阶段的结果"""
+    trace = trace or {}
+    if 'stages' in trace:
+        return {stage for stage, status in trace['stages'].items() if status in TRIED_STATUSES}
+    return {step['strategy'] for step in trace.get('steps', [])
+            if step.get('strategy') in LADDER and not step.get('error')}
+
+
+def missing_fields(values: Optional[Dict[str, Any]]) -> List[str]:
+    """缺失的字段"""
+    return [name for name in FIELDS if (values or {}).get(name) is None]
+
+
+class RetryQueue:
+    """
+    重试队列
+
+    格式:
+        files: 文件名 -> {tried: [...], attempts, next_attempt（时间戳）, last_error, state, updated}
+        state: pending / completed / exhausted
+    """
+
+    def __init__(self, path: str = DEFAULT_QUEUE_PATH, log_path: str = DEFAULT_ATTEMPTS_LOG):
+        self.path = Path(path)
+        self.log_path = Path(log_path)
+        self._lock = threading.Lock()
+        self.files: Dict[str, Dict[str, Any]] = {}
+        self._load()
+
+    def _load(self) -> None:
+        if not self.path.exists():
+            return
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                self.files = json.load(f).get('files', {})
+        except (OSError, ValueError) as e:
+            print(f"  ⚠️ 重试队列文件损坏，重新建立: {e}")
+            self.files = {}
+
+    def save(self) -> None:
+        """原子写入"""
+        with self._lock:
+            data = {'updated': datetime.now().isoformat(), 'files': self.files}
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            tmp_file = self.path.with_suffix('.tmp')
+            with open(tmp_file, 'w', encoding='utf-8') as f:
+                json.dump(data, f, ensure_ascii=False, indent=1)
+            os.replace(tmp_file, self.path)
+
+    # ------------------------------------------------------------------
+    # 计划
+    # ------------------------------------------------------------------
+    def plan(self, name: str, record: Optional[Dict[str, Any]], available: Iterable[str],
+             force: bool = False, now: Optional[float] = None) -> Dict[str, Any]:
+        """
+        文件本次要执行的阶段
+
+        Args:
+            record: 主控表记录（trace 中的策略记为已尝试）
+            available: 本次可用的阶段（如未启用LLM时不含 llm）
+            force: 忽略退避时间
+
+        Returns:
+            {'stages': [...], 'reason': ...}；stages 为空时 reason 为
+            completed / exhausted / backoff / unavailable
+        """
+        now = time.time() if now is None else now
+        available = set(available)
+        with self._lock:
+            entry = self.files.setdefault(name, {'tried': [], 'attempts': 0, 'next_attempt': 0,
+                                                 'last_error': None, 'state': 'pending'})
+            # 原提取已执行过的策略记为已尝试；旧记录没有字段值，原结果无法沿用，需重新执行
+            tried = set(entry['tried'])
+            if record is not None and record.get('values') is not None:
+                tried |= tried_in_trace(record.get('trace'))
+            entry['tried'] = [stage for stage in LADDER if stage in tried]
+
+            if record is not None and record.get('status') == 'completed':
+                entry['state'] = 'completed'
+            elif entry['attempts'] >= MAX_ATTEMPTS or not set(LADDER) - tried:
+                entry['state'] = 'exhausted'
+            else:
+                entry['state'] = 'pending'
+            if entry['state'] != 'pending':
+                return {'stages': [], 'reason': entry['state']}
+
+            stages = [stage for stage in LADDER if stage not in tried and stage in available]
+            if not stages:
+                return {'stages': [], 'reason': 'unavailable'}
+            if not force and entry['next_attempt'] > now:
+                return {'stages': [], 'reason': 'backoff'}
+            return {'stages': stages, 'reason': None}
+
+    # ------------------------------------------------------------------
+    # 记录
+    # ------------------------------------------------------------------
+    def record_attempt(self, name: str, stages: Dict[str, str],
+                       before: Optional[Dict[str, Any]], after: Dict[str, Any],
+                       seconds: float, error: Optional[str] = None) -> Dict[str, Any]:
+        """
+        记录一次尝试：更新已尝试的阶段和退避时间，并追加到尝试日志
+
+        Args:
+            stages: 阶段 -> 结果（ok / skipped / error / unavailable），按执行顺序
+            before: 尝试前的字段值
+            after: 尝试后的字段值
+            error: 整个文件失败时的错误信息（如无法打开）
+
+        Returns:
+            本次尝试的记录
+        """
+        now = time.time()
+        missing_before = missing_fields(before)
+        missing_after = missing_fields(after)
+        errors = [stage for stage, status in stages.items() if status == 'error']
+        with self._lock:
+            entry = self.files.setdefault(name, {'tried': [], 'attempts': 0, 'next_attempt': 0,
+                                                 'last_error': None, 'state': 'pending'})
+            tried = set(entry['tried']) | {stage for stage, status in stages.items()
+                                           if status in TRIED_STATUSES}
+            entry['tried'] = [stage for stage in LADDER if stage in tried]
+            entry['attempts'] += 1
+            entry['updated'] = datetime.now().isoformat()
+            if error or errors:
+                entry['last_error'] = error or f"stage error: {', '.join(errors)}"
+            if not missing_after:
+                entry['state'] = 'completed'
+                entry['next_attempt'] = 0
+            else:
+                if entry['attempts'] >= MAX_ATTEMPTS or not set(LADDER) - tried:
+                    entry['state'] = 'exhausted'
+                backoff = min(BACKOFF_SECONDS * 2 ** (entry['attempts'] - 1), MAX_BACKOFF_SECONDS)
+                entry['next_attempt'] = now + backoff
+
+            attempt = {
+                'time': entry['updated'],
+                'file': name,
+                'attempt': entry['attempts'],
+                'stages': stages,
+                'missing_before': missing_before,
+                'missing_after': missing_after,
+                'gained': [field for field in missing_before if field not in missing_after],
+                'seconds': round(seconds, 3),
+                'error': error,
+                'state': entry['state'],
+                'next_attempt': datetime.fromtimestamp(entry['next_attempt']).isoformat()
+                if entry['state'] == 'pending' else None
+            }
+            self.log_path.parent.mkdir(parents=True, exist_ok=True)
+            with open(self.log_path, 'a', encoding='utf-8') as f:
+                f.write(json.dumps(attempt, ensure_ascii=False) + '\n')
+        return attempt
@@ -0,0 +1,170 @@
+"""
+提取调度
+Cost-based Extraction Scheduling
+
+按预计耗时排列待提取文件：
+    预计耗时 = 该文件上次的实测耗时；
+               没有时 = 固定开销 + 页数 × 每页耗时(文档类型) + 大小(MB) × 每MB耗时
+每页耗时由主控表中各文件 trace 记录的实测耗时/页数按文档类型（text / hybrid / scanned）估计，
+样本少时向先验靠拢。
+
+    longest  最长的先开始（默认），大文件不会最后才开始而拖长整批完成时间
+    shortest 最短的先开始，尽快得到部分结果
+    name     按文件名
+
+分批（--batch）时按预计耗时把文件均衡分配到各批次。批次划分保存在 output/cache/batch_plan.json，
+每个文件分到的批次此后保持不变（历史耗时更新或新增文件时已有文件不会换批次），新文件补入负载最小的批次。
+"""
+import os
+import json
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional
+
+ORDERS = ('longest', 'shortest', 'name')
+DEFAULT_ORDER = 'longest'
+BATCH_PLAN_PATH = "output/cache/batch_plan.json"
+
+# 先验
+FILE_OVERHEAD_SECONDS = 0.2
+SECONDS_PER_MB = 0.05
+PAGE_SECONDS = {'text': 0.05, 'hybrid': 0.1, 'scanned': 1.5, 'unknown': 0.08}
+# 先验相当于多少个文件的观测
+PRIOR_WEIGHT = 3.0
+
+
+def _doc_class(entry: Optional[Dict[str, Any]]) -> str:
+    """文档类型（与规划器的 doc_profile 一致）"""
+    if entry is None:
+        return 'unknown'
+    if entry.get('scanned'):
+        return 'scanned'
+    if entry.get('hybrid'):
+        return 'hybrid'
+    return 'text'
+
+
+class CostModel:
+    """由主控表历史估计每个文件的提取耗时"""
+
+    def __init__(self):
+        self.file_seconds: Dict[str, float] = {}
+        self._class_seconds: Dict[str, float] = {}
+        self._class_pages: Dict[str, float] = {}
+        self._class_files: Dict[str, int] = {}
+
+    @classmethod
+    def from_records(cls, files: Dict[str, Dict[str, Any]]) -> 'CostModel':
+        """由主控表的 files（文件名 -> 记录）构建"""
+        model = cls()
+        for name, record in files.items():
+            trace = record.get('trace') or {}
+            seconds = trace.get('seconds')
+            if seconds is None:
+                continue
+            model.file_seconds[name] = seconds
+            if trace.get('pages'):
+                doc_class = trace.get('doc_class') or 'unknown'
+                model._class_seconds[doc_class] = model._class_seconds.get(doc_class, 0.0) + seconds
+                model._class_pages[doc_class] = model._class_pages.get(doc_class, 0.0) + trace['pages']
+                model._class_files[doc_class] = model._class_files.get(doc_class, 0) + 1
+        return model
+
+    def page_seconds(self, doc_class: str) -> float:
+        """每页耗时：实测总耗时/总页数，按文件数向先验收缩"""
+        prior = PAGE_SECONDS.get(doc_class, PAGE_SECONDS['unknown'])
+        n = self._class_files.get(doc_class, 0)
+        if n == 0 or not self._class_pages.get(doc_class):
+            return prior
+        observed = self._class_seconds[doc_class] / self._class_pages[doc_class]
+        return (observed * n + prior * PRIOR_WEIGHT) / (n + PRIOR_WEIGHT)
+
+    def estimate(self, pdf_path: Path, entry: Optional[Dict[str, Any]] = None,
+                 use_history: bool = True) -> float:
+        """
+        预计耗时（秒）
+
+        Args:
+            entry: 文档目录记录（页数、大小、是否扫描版）
+            use_history: 是否使用该文件上次的实测耗时
+        """
+        if use_history and pdf_path.name in self.file_seconds:
+            return self.file_seconds[pdf_path.name]
+        if entry is not None:
+            size = entry.get('size', 0)
+        else:
+            try:
+                size = pdf_path.stat().st_size
+            except OSError:
+                size = 0
+        pages = entry.get('page_count', 0) if entry else 0
+        return (FILE_OVERHEAD_SECONDS + pages * self.page_seconds(_doc_class(entry))
+                + size / 1024 / 1024 * SECONDS_PER_MB)
+
+
+def order_files(pdf_files: Iterable[Path], costs: Dict[Path, float],
+                order: str = DEFAULT_ORDER) -> List[Path]:
+    """按调度顺序排列（同耗时按文件名，保证顺序稳定）"""
+    pdf_files = sorted(pdf_files)
+    if order == 'name':
+        return pdf_files
+    if order not in ORDERS:
+        raise ValueError(f"未知调度顺序: {order}（可选: {', '.join(ORDERS)}）")
+    sign = -1 if order == 'longest' else 1
+    return sorted(pdf_files, key=lambda f: (sign * costs.get(f, 0.0), f.name))
+
+
+def plan_batches(pdf_files: Iterable[Path], costs: Dict[Path, float], batch_size: int,
+                 plan_path: str = BATCH_PLAN_PATH) -> List[List[Path]]:
+    """
+    按预计耗时均衡分批：每批最多 batch_size 个文件
+
+    每个文件的批次保存在划分文件中，之后保持不变：新增的文件按预计耗时（长的先）放入
+    当前总耗时最小且未满的批次，删除的文件从原批次移除，其余文件不会换批次。
+    批次大小改变时重新划分。
+    """
+    pdf_files = sorted(pdf_files)
+    by_name = {f.name: f for f in pdf_files}
+
+    # 已保存的各文件批次（批次大小相同时沿用）
+    assignments: Dict[str, int] = {}
+    path = Path(plan_path)
+    if path.exists():
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                saved = json.load(f)
+            if saved.get('batch_size') == batch_size:
+                assignments = {name: index for index, batch in enumerate(saved['batches'])
+                               for name in batch if name in by_name}
+        except (OSError, ValueError, KeyError) as e:
+            print(f"  ⚠️ 批次划分文件损坏，重新划分: {e}")
+
+    num_batches = max(1, -(-len(pdf_files) // max(batch_size, 1)),
+                      max(assignments.values(), default=-1) + 1)
+    batches: List[List[Path]] = [[] for _ in range(num_batches)]
+    totals = [0.0] * num_batches
+    for name, index in assignments.items():
+        batches[index].append(by_name[name])
+        totals[index] += costs.get(by_name[name], 0.0)
+
+    # 新文件：最长的先分配给当前总耗时最小且未满的批次
+    new_files = [f for f in pdf_files if f.name not in assignments]
+    for pdf in order_files(new_files, costs, 'longest'):
+        open_batches = [i for i in range(num_batches) if len(batches[i]) < batch_size]
+        target = min(open_batches, key=lambda i: (totals[i], i))
+        batches[target].append(pdf)
+        totals[target] += costs.get(pdf, 0.0)
+    batches = [sorted(batch) for batch in batches]
+
+    data = {
+        'updated': datetime.now().isoformat(),
+        'batch_size': batch_size,
+        'estimated_seconds': [round(total, 2) for total in totals],
+        'batches': [[f.name for f in batch] for batch in batches]
+    }
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_file = path.with_suffix('.tmp')
+    with open(tmp_file, 'w', encoding='utf-8') as f:
+        json.dump(data, f, ensure_ascii=False, indent=1)
+    os.replace(tmp_file, path)
+    return batches
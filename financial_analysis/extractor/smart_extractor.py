@@ -6,9 +6,10 @@ Smart Extractor - Strategy Pattern Version
 创建: 2025-08-11
 """
 
+import re
 import warnings
 from pathlib import Path
-from typing import Optional, Dict, Any, List
+from typing import Optional, Dict, Any, List, Tuple
 import pdfplumber
 from datetime import datetime
 import csv
@@ -16,20 +17,75 @@ import time
 import concurrent.futures
 import json
 import hashlib
+import threading
+from dataclasses import dataclass, field
 from tqdm import tqdm
 
 warnings.filterwarnings('ignore')
 
-from .base_extractor import BaseExtractor
+from .base_extractor import BaseExtractor, PageText
+from .master_store import MasterStore, DEFAULT_MASTER_PATH, result_status
+from .result_cache import ResultCache, extractor_fingerprint, mode_key
+from . import progress
+from .metrics import get_metrics
+from . import profiling
+from . import page_parallel
+from .scheduler import DEFAULT_ORDER, CostModel, order_files, plan_batches
+from .coordinator import Coordinator
+from .planner import PLANNED_STRATEGIES, doc_profile, get_planner, load_history
+from .page_hints import get_page_hints, find_heading
+from .pattern_packs import get_pattern_packs
+from .quarantine import get_quarantine
+from ..download.document_catalog import get_catalog
 from .financial_models import FinancialData
 from .strategies import (
-    RegexStrategy,
-    LLMStrategy,
-    OCRStrategy,
-    TableStrategy,
-    ExtractionResult
+    ExtractionResult,
+    get_strategies
 )
 
+# 激进模式：百万级以上的大数字（模块加载时编译一次）
+LARGE_NUMBER_PATTERNS = (
+    re.compile(r'\$\s*([0-9]{1,3}(?:,[0-9]{3})*(?:\.[0-9]+)?)\s*(?:million|Million|M|m)'),
+    re.compile(r'([0-9]{1,3}(?:,[0-9]{3})*(?:\.[0-9]+)?)\s*(?:million|Million|千万|百万|億)'),
+    re.compile(r'\$\s*([0-9]{7,}(?:\.[0-9]+)?)'),  # 7位数以上
+    re.compile(r'([0-9]{7,}(?:\.[0-9]+)?)\s*(?:元|円|₩|€)'),
+)
+_GROUPED_NUMBER = re.compile(r'\b\d{1,3}(?:,\d{3})*(?:\.\d+)?\b')
+
+
+@dataclass
+class ExtractionContext:
+    """单次提取的请求上下文（每个文件一个，不在线程间共享）"""
+    file_name: Optional[str] = None
+    pdf_path: str = ''
+    catalog_entry: Optional[Dict[str, Any]] = None
+    profile: Dict[str, str] = field(default_factory=dict)  # 公司/语言/文档类型
+    strategies_used: List[str] = field(default_factory=list)
+    steps: List[Dict[str, Any]] = field(default_factory=list)  # 各策略的执行记录
+    pages: Dict[int, str] = field(default_factory=dict)  # 已提取的逐页文本（各策略复用）
+    locations: Dict[str, Dict[str, Any]] = field(default_factory=dict)  # 字段 -> {page, pos, label, strategy}
+    hint_pages: List[int] = field(default_factory=list)  # 公司页码提示附近的页
+    unit: Optional[int] = None  # 正则提取使用的单位乘数
+    split_pages: bool = False  # 大文档：文本、表格、OCR按页拆分到多个进程
+    seeded: List[str] = field(default_factory=list)  # 重试：沿用上次结果的字段
+    stages: Dict[str, str] = field(default_factory=dict)  # 重试：阶段 -> ok / skipped / error / unavailable
+    abandoned: threading.Event = field(default_factory=threading.Event)  # 看门狗超时放弃：不再执行策略、学习或统计
+    
+    def trace(self) -> Dict[str, Any]:
+        """按执行顺序计算每步补齐的字段数（与 ExtractionResult.merge 一致）"""
+        filled = set(self.seeded)
+        steps = []
+        for step in self.steps:
+            found = set(step['fields'])
+            steps.append({'strategy': step['strategy'], 'missing': 4 - len(filled),
+                          'gained': len(found - filled), 'seconds': step['seconds'],
+                          'tokens': step['tokens'], **({'error': True} if step['error'] else {})})
+            filled |= found
+        trace = {**self.profile, 'steps': steps}
+        if self.stages:
+            trace['stages'] = dict(self.stages)
+        return trace
+
 
 class SmartExtractor(BaseExtractor):
     """
@@ -62,18 +118,14 @@ class SmartExtractor(BaseExtractor):
         self.extraction_mode = extraction_mode
         self.use_llm = use_llm
         
-        # 初始化策略
-        self.strategies = {
-            'regex': RegexStrategy(),
-            'table': TableStrategy(),
-            'ocr': OCRStrategy()
-        }
-        
-        # 根据模式和设置初始化LLM策略
+        # 策略为进程内共享的只读实例（正则预编译、LLM客户端只初始化一次）
+        strategy_names = ['regex', 'table', 'ocr']
         if extraction_mode in ['llm_only', 'llm_first'] or use_llm:
-            self.strategies['llm'] = LLMStrategy()
+            strategy_names.append('llm')
+        self.strategies = get_strategies(strategy_names)
         
-        # 统计信息
+        # 统计信息（同一提取器可被多个线程共用，更新时加锁）
+        self._stats_lock = threading.Lock()
         self.stats = {
             'total_processed': 0,
             'complete_success': 0,
@@ -82,61 +134,206 @@ class SmartExtractor(BaseExtractor):
             'strategy_usage': {name: 0 for name in self.strategies.keys()}
         }
     
-    def _extract_data(self, pdf: pdfplumber.PDF, result: FinancialData) -> None:
+    def _extract_data(self, pdf: pdfplumber.PDF, result: FinancialData,
+                      stages: Optional[List[str]] = None,
+                      prior: Optional[Dict[str, Any]] = None,
+                      abandoned: Optional[threading.Event] = None) -> None:
         """
         实现策略调度逻辑
         
         Args:
             pdf: PDF对象
             result: 结果对象
+            stages: 重试时按顺序执行的阶段（regex / table / ocr / llm），不按提取模式调度
+            prior: 重试时沿用的上次字段值
+            abandoned: 看门狗超时放弃该文件时置位
         """
-        self.stats['total_processed'] += 1
-        pdf_path = getattr(pdf, 'path', result.file_path)
+        start = time.perf_counter()
+        pdf_path = str(getattr(pdf, 'path', result.file_path) or '')
+        entry = get_catalog().lookup(pdf_path) if pdf_path else None
+        ctx = ExtractionContext(file_name=result.file_name, pdf_path=pdf_path, catalog_entry=entry,
+                                profile=doc_profile(result.company, entry))
+        if abandoned is not None:
+            ctx.abandoned = abandoned
+        page_count = entry['page_count'] if entry else len(pdf.pages)
+        ctx.split_pages = bool(pdf_path) and page_parallel.should_split(page_count)
+        if ctx.split_pages:
+            print(f"    ⚡ 大文档 {page_count} 页，按页拆分到 {page_parallel.PAGE_WORKERS} 个进程")
+        progress.file_stage(ctx.file_name, 'text')
+        get_quarantine().stage(ctx.file_name, 'text')
         
         # 根据模式执行不同的策略组合
-        if self.extraction_mode == 'regex_only':
-            extracted = self._extract_regex_only(pdf)
+        if stages is not None:
+            extracted = self._extract_ladder(ctx, pdf, stages, prior or {})
+        elif self.extraction_mode == 'regex_only':
+            extracted = self._extract_regex_only(ctx, pdf)
         elif self.extraction_mode == 'regex_table':
-            extracted = self._extract_regex_table(pdf)
+            extracted = self._extract_regex_table(ctx, pdf)
         elif self.extraction_mode == 'llm_only':
-            extracted = self._extract_llm_only(pdf)
+            extracted = self._extract_llm_only(ctx, pdf)
         elif self.extraction_mode == 'regex_first':
-            extracted = self._extract_regex_first(pdf)
+            extracted = self._extract_regex_first(ctx, pdf)
         elif self.extraction_mode == 'llm_first':
-            extracted = self._extract_llm_first(pdf)
+            extracted = self._extract_llm_first(ctx, pdf)
         else:  # adaptive
-            extracted = self._extract_adaptive(pdf, pdf_path)
+            extracted = self._extract_adaptive(ctx, pdf)
         
         # 填充结果
         self._fill_result(result, extracted)
+        # 总耗时和页数供调度器估计同类文件的耗时
+        result.extraction_trace = dict(ctx.trace(), seconds=round(time.perf_counter() - start, 3),
+                                       pages=page_count)
+        # 已被看门狗放弃（结果已记为失败）：不学习、不计入统计
+        if ctx.abandoned.is_set():
+            return
+        
+        # 记录字段所在页，供该公司的下一份财报优先读取
+        located = {name: dict(location, heading=find_heading(ctx.pages.get(location['page'], "")))
+                   for name, location in ctx.locations.items() if getattr(extracted, name) is not None}
+        get_page_hints().record(ctx.profile['company'], located, len(pdf.pages),
+                                result.year, result.file_name, ctx.unit)
+        # 记录正则找到的字段的行标签，编入该公司的模式包（表格按宽松关键词匹配的行不学习）
+        get_pattern_packs().learn(ctx.profile['company'],
+                                  {name: location.get('label') for name, location in located.items()
+                                   if location.get('strategy') == 'regex'},
+                                  result.year, result.file_name)
         
         # 更新统计
-        self._update_stats(result)
+        self._update_stats(result, ctx)
     
-    def _extract_regex_only(self, pdf: pdfplumber.PDF) -> ExtractionResult:
-        """仅使用正则提取（快速模式）"""
-        # 提取文本 - 增加扫描页数以提高成功率
-        text = self.extract_text_from_pages(pdf, max_pages=30)
-        unit_multiplier = self.detect_unit(text)
+    def _run_strategy(self, ctx: ExtractionContext, name: str, *args, **kwargs) -> ExtractionResult:
+        """执行策略：记录使用情况和耗时，并发布当前阶段（文件已被看门狗放弃时不再执行）"""
+        if ctx.abandoned.is_set():
+            raise TimeoutError(f"{ctx.file_name} 超出时间预算，已放弃")
+        progress.file_stage(ctx.file_name, name)
+        get_quarantine().stage(ctx.file_name, name)
+        ctx.strategies_used.append(name)
+        start = time.perf_counter()
+        with get_metrics().timer(name):
+            strategy_result = self.strategies[name].execute(*args, **kwargs)
+        ctx.steps.append({
+            'strategy': name,
+            'fields': [f for f in ('total_assets', 'total_liabilities', 'revenue', 'net_profit')
+                       if getattr(strategy_result, f) is not None],
+            'seconds': round(time.perf_counter() - start, 4),
+            'tokens': strategy_result.tokens,
+            'error': strategy_result.method.endswith('_failed')
+        })
+        if kwargs.get('pack') is not None and not ctx.abandoned.is_set():
+            complete = all(location.get('pack') for location in strategy_result.locations.values()) \
+                and len(strategy_result.locations) == 4
+            get_pattern_packs().record_use(complete)
+            get_metrics().inc('pattern_packs', labels={'outcome': 'complete' if complete else 'fallback'})
         
-        # 正则提取
-        regex_result = self.strategies['regex'].execute(text, unit_multiplier=unit_multiplier)
-        self.stats['strategy_usage']['regex'] += 1
+        # 字段位置换算为页码（先找到的策略优先，与 merge 一致）
+        content = args[0] if args else None
+        strategy_name = name
+        for name, location in strategy_result.locations.items():
+            if name in ctx.locations:
+                continue
+            if 'page' in location:
+                ctx.locations[name] = {'page': location['page'], 'pos': location.get('pos'),
+                                       'label': location.get('label'), 'strategy': strategy_name}
+            elif isinstance(content, PageText):
+                located = content.locate(location['offset'])
+                if located:
+                    ctx.locations[name] = {'page': located[0], 'pos': located[1],
+                                           'label': location.get('label'), 'strategy': strategy_name}
+        return strategy_result
+    
+    def _table_kwargs(self, ctx: ExtractionContext, pdf: pdfplumber.PDF) -> Dict[str, Any]:
+        """表格策略参数：提示页优先；大文档按策略的检查顺序分批并行提取表格（先提示页，其余按需）"""
+        kwargs = {'first_pages': ctx.hint_pages}
+        if ctx.split_pages:
+            max_pages = min(30, len(pdf.pages))
+            first_pages = [p for p in ctx.hint_pages if 0 <= p < len(pdf.pages)]
+            page_order = first_pages + [p for p in range(max_pages) if p not in first_pages]
+            kwargs['page_tables'] = page_parallel.LazyPageTables(ctx.pdf_path, page_order,
+                                                                 first_batch=len(first_pages))
+        return kwargs
+    
+    def _pages_text(self, ctx: ExtractionContext, pdf: pdfplumber.PDF, page_numbers: List[int]) -> PageText:
+        """指定页的文本（按给定顺序拼接）；已提取的页在本次请求内复用"""
+        missing = sorted(p for p in set(page_numbers) if p not in ctx.pages and 0 <= p < len(pdf.pages))
+        # 连续的页一次读取
+        i = 0
+        while i < len(missing):
+            j = i
+            while j + 1 < len(missing) and missing[j + 1] == missing[j] + 1:
+                j += 1
+            if ctx.split_pages:
+                with get_metrics().timer('text'):
+                    texts = page_parallel.map_pages(page_parallel.page_texts, ctx.pdf_path,
+                                                    missing[i], missing[j] + 1)
+                get_metrics().inc('pages_parsed', len(texts))
+            else:
+                texts = self.extract_page_texts(pdf, missing[i], missing[j] + 1)
+            ctx.pages.update(zip(range(missing[i], missing[j] + 1), texts))
+            i = j + 1
+        return PageText((p, ctx.pages.get(p, "")) for p in page_numbers)
+    
+    def _text(self, ctx: ExtractionContext, pdf: pdfplumber.PDF, max_pages: int) -> PageText:
+        """前 max_pages 页的文本"""
+        return self._pages_text(ctx, pdf, list(range(min(max_pages, len(pdf.pages)))))
+    
+    def _regex_scan(self, ctx: ExtractionContext, pdf: pdfplumber.PDF,
+                    max_pages: int) -> Tuple[ExtractionResult, str]:
+        """
+        正则提取：该公司有页码提示时先只读提示页附近，正则找到过的字段全部找到即命中；
+        命中但仍有字段缺失、或未命中时再扫描前 max_pages 页。该公司的模式包在通用模式之前尝试
+        
+        Returns:
+            (提取结果, 使用的文本)
+        """
+        hints = get_page_hints()
+        company = ctx.profile['company']
+        pack = get_pattern_packs().pack_for(company)
+        hint = hints.lookup(company, len(pdf.pages))
+        if hint:
+            ctx.hint_pages = hint['pages']
+            text = self._pages_text(ctx, pdf, hint['pages'])
+            ctx.unit = self.detect_unit(text)
+            if ctx.unit == 1:
+                ctx.unit = hint['unit']  # 提示页没有单位说明时沿用该公司上次的单位
+            hinted_result = self._run_strategy(ctx, 'regex', text, unit_multiplier=ctx.unit, pack=pack)
+            # 提示中只有表格找到过的字段时不计命中率，提示页仍用于排序
+            hit = None
+            if hint['fields'] and not ctx.abandoned.is_set():
+                hit = all(getattr(hinted_result, name) is not None for name in hint['fields'])
+                hints.record_lookup(company, hit)
+                get_metrics().inc('page_hints', labels={'outcome': 'hit' if hit else 'miss'})
+            if hinted_result.fields_count == 4:
+                return hinted_result, text
+            if hit:
+                # 命中：提示页的结果和单位优先，全量扫描只补缺失的字段
+                text = self._text(ctx, pdf, max_pages)
+                result = self._run_strategy(ctx, 'regex', text, unit_multiplier=self.detect_unit(text), pack=pack)
+                hinted_result.merge(result)
+                return hinted_result, text
+            # 未命中：全量扫描的结果优先，提示页的结果只补缺
+            hinted_locations = dict(ctx.locations)
+            ctx.locations.clear()
+        
+        text = self._text(ctx, pdf, max_pages)
+        ctx.unit = self.detect_unit(text)
+        result = self._run_strategy(ctx, 'regex', text, unit_multiplier=ctx.unit, pack=pack)
+        if hint:
+            result.merge(hinted_result)
+            for name, location in hinted_locations.items():
+                ctx.locations.setdefault(name, location)
+        return result, text
+    
+    def _extract_regex_only(self, ctx: ExtractionContext, pdf: pdfplumber.PDF) -> ExtractionResult:
+        """仅使用正则提取（快速模式）"""
+        # 正则提取（页码提示优先，未命中时扫描前30页）
+        regex_result, text = self._regex_scan(ctx, pdf, 30)
         
         # 激进模式：如果正则没有提取到足够数据，尝试提取任何大数字
         if regex_result.fields_count < 2:
-            import re
             # 查找所有大数字（百万级以上）
-            number_patterns = [
-                r'\$\s*([0-9]{1,3}(?:,[0-9]{3})*(?:\.[0-9]+)?)\s*(?:million|Million|M|m)',
-                r'([0-9]{1,3}(?:,[0-9]{3})*(?:\.[0-9]+)?)\s*(?:million|Million|千万|百万|億)',
-                r'\$\s*([0-9]{7,}(?:\.[0-9]+)?)',  # 7位数以上
-                r'([0-9]{7,}(?:\.[0-9]+)?)\s*(?:元|円|₩|€)',
-            ]
-            
             all_numbers = []
-            for pattern in number_patterns:
-                matches = re.findall(pattern, text)
+            for pattern in LARGE_NUMBER_PATTERNS:
+                matches = pattern.findall(text)
                 for match in matches:
                     try:
                         # 清理数字并转换
@@ -164,19 +361,13 @@ class SmartExtractor(BaseExtractor):
         
         return regex_result
     
-    def _extract_regex_table(self, pdf: pdfplumber.PDF) -> ExtractionResult:
+    def _extract_regex_table(self, ctx: ExtractionContext, pdf: pdfplumber.PDF) -> ExtractionResult:
         """使用正则和表格提取（标准模式）"""
-        # 提取文本
-        text = self.extract_text_from_pages(pdf, max_pages=50)
-        unit_multiplier = self.detect_unit(text)
-        
-        # 正则提取
-        regex_result = self.strategies['regex'].execute(text, unit_multiplier=unit_multiplier)
-        self.stats['strategy_usage']['regex'] += 1
+        # 正则提取（页码提示优先，未命中时扫描前50页）
+        regex_result, _ = self._regex_scan(ctx, pdf, 50)
         
         # 表格提取补充
-        table_result = self.strategies['table'].execute(pdf)
-        self.stats['strategy_usage']['table'] += 1
+        table_result = self._run_strategy(ctx, 'table', pdf, **self._table_kwargs(ctx, pdf))
         
         # 合并结果
         regex_result.merge(table_result)
@@ -184,7 +375,7 @@ class SmartExtractor(BaseExtractor):
         
         return regex_result
     
-    def _extract_llm_only(self, pdf: pdfplumber.PDF) -> ExtractionResult:
+    def _extract_llm_only(self, ctx: ExtractionContext, pdf: pdfplumber.PDF) -> ExtractionResult:
         """仅使用LLM提取 - 改进版，专注财务报表页面"""
         if 'llm' not in self.strategies:
             print("  ❌ LLM策略不可用")
@@ -213,9 +404,14 @@ class SmartExtractor(BaseExtractor):
         financial_pages = []
         table_pages = []  # 包含表格的页面
         
-        for i, page in enumerate(pdf.pages):
-            text = page.extract_text()
-            tables = page.extract_tables()
+        # 大文档按页拆分到多个进程扫描，结果按页码顺序返回
+        if ctx.split_pages:
+            scanned = page_parallel.map_pages(page_parallel.scan_pages, ctx.pdf_path, 0, len(pdf.pages))
+        else:
+            scanned = (page_parallel.scan_page(page) for page in pdf.pages)
+        
+        for i, (text, has_table) in enumerate(scanned):
+            ctx.pages.setdefault(i, text)
             
             if text:
                 text_lower = text.lower()
@@ -223,20 +419,14 @@ class SmartExtractor(BaseExtractor):
                 keyword_count = sum(1 for keyword in financial_keywords if keyword in text_lower)
                 
                 # 检查是否有数字（财务数据通常包含大量数字）
-                import re
-                numbers = re.findall(r'\b\d{1,3}(?:,\d{3})*(?:\.\d+)?\b', text)
+                numbers = _GROUPED_NUMBER.findall(text)
                 
                 if keyword_count > 0 and len(numbers) > 5:  # 至少有1个关键词和5个数字
                     financial_pages.append((i, text, keyword_count, len(numbers)))
             
-            # 记录有表格的页面
-            if tables:
-                for table in tables:
-                    if table and len(table) > 3:  # 至少4行的表格
-                        table_text = str(table).lower()
-                        if any(kw in table_text for kw in ['asset', 'liabil', 'revenue', 'income', 'ativo', 'passivo']):
-                            table_pages.append((i, text if text else ''))
-                            break
+            # 记录有财务表格的页面
+            if has_table:
+                table_pages.append((i, text))
         
         print(f"    📊 找到 {len(financial_pages)} 个财务页面，{len(table_pages)} 个表格页面")
         
@@ -266,7 +456,7 @@ class SmartExtractor(BaseExtractor):
         # 如果还是没有内容，使用前20页
         if len(combined_text) < 1000:
             print("    ⚠️ 未找到明确的财务报表，使用前20页")
-            combined_text = self.extract_text_from_pages(pdf, max_pages=20)
+            combined_text = self._text(ctx, pdf, 20)
         
         print(f"    📝 准备发送 {len(combined_text)} 字符给LLM...")
         
@@ -283,86 +473,172 @@ class SmartExtractor(BaseExtractor):
             year = ''
         
         # LLM提取
-        llm_result = self.strategies['llm'].execute(
+        llm_result = self._run_strategy(
+            ctx, 'llm',
             combined_text, 
             text_limit=30000,
             company_name=company_name,
             year=year
         )
-        self.stats['strategy_usage']['llm'] += 1
         
         return llm_result
     
-    def _extract_regex_first(self, pdf: pdfplumber.PDF) -> ExtractionResult:
+    def _extract_regex_first(self, ctx: ExtractionContext, pdf: pdfplumber.PDF) -> ExtractionResult:
         """优先正则，LLM补充"""
         # 先执行正则提取
-        result = self._extract_regex_only(pdf)
+        result = self._extract_regex_only(ctx, pdf)
         
         # 如果不完整且有LLM，使用LLM补充
         if not result.is_complete and 'llm' in self.strategies:
             print(f"    🤖 使用LLM增强提取（当前{result.fields_count}/4字段）...")
-            text = self.extract_text_from_pages(pdf, max_pages=50)
-            llm_result = self.strategies['llm'].execute(text)
-            self.stats['strategy_usage']['llm'] += 1
+            text = self._text(ctx, pdf, 50)
+            llm_result = self._run_strategy(ctx, 'llm', text)
             
             result.merge(llm_result)
             result.method = "regex+table+llm"
         
         return result
     
-    def _extract_llm_first(self, pdf: pdfplumber.PDF) -> ExtractionResult:
+    def _extract_llm_first(self, ctx: ExtractionContext, pdf: pdfplumber.PDF) -> ExtractionResult:
         """优先LLM，正则补充"""
         # 先执行LLM提取
-        result = self._extract_llm_only(pdf)
+        result = self._extract_llm_only(ctx, pdf)
         
         # 如果不完整，使用正则补充
         if not result.is_complete:
-            regex_result = self._extract_regex_only(pdf)
+            regex_result = self._extract_regex_only(ctx, pdf)
             result.merge(regex_result)
             result.method = "llm+regex+table"
         
         return result
     
-    def _extract_adaptive(self, pdf: pdfplumber.PDF, pdf_path: str) -> ExtractionResult:
-        """自适应策略选择"""
-        # Step 1: 检查是否为扫描版
+    def _extract_adaptive(self, ctx: ExtractionContext, pdf: pdfplumber.PDF) -> ExtractionResult:
+        """自适应策略选择：文本来源由文档目录决定，其余策略由规划器按收益/成本排序和取舍"""
+        # Step 1: 检查是否为扫描版（优先使用文档目录中的结果）
         method_prefix = ""
-        if self.strategies['ocr'].can_handle(pdf):
+        ocr_text = None
+        if self._needs_ocr(ctx, pdf):
             # 执行OCR
-            ocr_result = self.strategies['ocr'].execute(pdf_path)
-            self.stats['strategy_usage']['ocr'] += 1
+            ocr_result = self._run_strategy(ctx, 'ocr', ctx.pdf_path,
+                                            map_pages=page_parallel.map_pages if ctx.split_pages else None)
             
             if hasattr(ocr_result, 'ocr_text'):
-                text = ocr_result.ocr_text
+                ocr_text = ocr_result.ocr_text
                 method_prefix = "ocr+"
-            else:
-                text = self.extract_text_from_pages(pdf, max_pages=50)
-        else:
-            text = self.extract_text_from_pages(pdf, max_pages=50)
         
-        # Step 2: 检测单位
-        unit_multiplier = self.detect_unit(text)
+        def run_regex() -> ExtractionResult:
+            if ocr_text is None:
+                return self._regex_scan(ctx, pdf, 50)[0]  # 页码提示优先
+            return self._run_strategy(ctx, 'regex', ocr_text, unit_multiplier=self.detect_unit(ocr_text),
+                                      pack=get_pattern_packs().pack_for(ctx.profile['company']))
         
-        # Step 3: 执行正则提取
-        regex_result = self.strategies['regex'].execute(text, unit_multiplier=unit_multiplier)
-        self.stats['strategy_usage']['regex'] += 1
+        # Step 2: 按规划器的决定依次执行，预计收益低于成本时停止
+        runners = {
+            'regex': run_regex,
+            'table': lambda: self._run_strategy(ctx, 'table', pdf, **self._table_kwargs(ctx, pdf)),
+            'llm': lambda: self._run_strategy(ctx, 'llm', ocr_text if ocr_text is not None
+                                              else self._text(ctx, pdf, 50)),
+        }
+        candidates = [name for name in PLANNED_STRATEGIES if name in self.strategies]
+        planner = get_planner()
+        result = ExtractionResult()
+        executed = []
+        decisions = []
+        while candidates:
+            missing = 4 - result.fields_count
+            choice, evaluations = planner.choose(ctx.profile, missing, candidates)
+            decision = {'missing': missing, 'run': choice, 'candidates': evaluations}
+            decisions.append(decision)
+            if choice is None:
+                break
+            if choice == 'llm':
+                print(f"    🤖 使用LLM增强提取（当前{result.fields_count}/4字段）...")
+            result.merge(runners[choice]())
+            decision['gained'] = result.fields_count + missing - 4
+            candidates.remove(choice)
+            executed.append(choice)
+        planner.log_decisions(ctx.file_name, ctx.profile, decisions)
         
-        # Step 4: 表格提取补充
-        table_result = self.strategies['table'].execute(pdf)
-        self.stats['strategy_usage']['table'] += 1
-        regex_result.merge(table_result)
+        result.method = method_prefix + ("+".join(executed) or "none")
+        return result
+    
+    def _extract_ladder(self, ctx: ExtractionContext, pdf: pdfplumber.PDF,
+                        stages: List[str], prior: Dict[str, Any]) -> ExtractionResult:
+        """
+        重试阶梯：从上次的字段值出发按给定顺序执行阶段，缺失字段补齐即停止
         
-        # Step 5: 如果不完整且有LLM，使用LLM补充
-        if not regex_result.is_complete and 'llm' in self.strategies:
-            print(f"    🤖 使用LLM增强提取（当前{regex_result.fields_count}/4字段）...")
-            llm_result = self.strategies['llm'].execute(text)
-            self.stats['strategy_usage']['llm'] += 1
-            regex_result.merge(llm_result)
-            regex_result.method = f"{method_prefix}regex+table+llm"
-        else:
-            regex_result.method = f"{method_prefix}regex+table"
+        各阶段的结果记入 ctx.stages：ok / skipped（不适用）/ error（出错，可再试）/ unavailable（未启用）
+        """
+        fields = ('total_assets', 'total_liabilities', 'revenue', 'net_profit')
+        result = ExtractionResult(**{name: prior.get(name) for name in fields})
+        result.update_confidence()
+        ctx.seeded = [name for name in fields if prior.get(name) is not None]
         
-        return regex_result
+        entry = ctx.catalog_entry
+        ocr = self.strategies['ocr']
+        ocr_text = None
+        executed = []
+        for stage in stages:
+            if result.is_complete:
+                break
+            stage_result = None
+            status = 'ok'
+            if stage == 'regex':
+                stage_result = self._regex_scan(ctx, pdf, 50)[0]
+            elif stage == 'table':
+                if entry is not None and entry['scanned']:
+                    status = 'skipped'  # 扫描版没有可解析的表格
+                else:
+                    stage_result = self._run_strategy(ctx, 'table', pdf, **self._table_kwargs(ctx, pdf))
+            elif stage == 'ocr':
+                if not ocr.has_ocr:
+                    status = 'unavailable'
+                elif entry is not None and not (entry['scanned'] or entry['hybrid']) \
+                        or entry is None and not ocr.can_handle(pdf):
+                    status = 'skipped'  # 文本版PDF
+                else:
+                    ocr_result = self._run_strategy(ctx, 'ocr', ctx.pdf_path,
+                                                    map_pages=page_parallel.map_pages if ctx.split_pages else None)
+                    ocr_text = getattr(ocr_result, 'ocr_text', None)
+                    if not ocr_text:
+                        status = 'error'
+                    else:
+                        stage_result = self._run_strategy(
+                            ctx, 'regex', ocr_text, unit_multiplier=self.detect_unit(ocr_text),
+                            pack=get_pattern_packs().pack_for(ctx.profile['company']))
+            elif stage == 'llm':
+                if 'llm' not in self.strategies or self.strategies['llm'].client is None:
+                    status = 'unavailable'
+                else:
+                    print(f"    🤖 使用LLM增强提取（当前{result.fields_count}/4字段）...")
+                    stage_result = self._run_strategy(ctx, 'llm', ocr_text if ocr_text is not None
+                                                      else self._text(ctx, pdf, 50))
+                    # LLM异常在策略内部处理：没有消耗token也没有结果视为出错
+                    if stage_result.fields_count == 0 and stage_result.tokens == 0:
+                        status = 'error'
+            
+            if stage_result is not None:
+                if stage_result.method.endswith('_failed'):
+                    status = 'error'
+                result.merge(stage_result)
+            ctx.stages[stage] = status
+            if status == 'ok':
+                executed.append(stage)
+        
+        result.method = "retry:" + ("+".join(executed) or "none")
+        return result
+    
+    def _needs_ocr(self, ctx: ExtractionContext, pdf: pdfplumber.PDF) -> bool:
+        """判断是否需要OCR：文档目录已登记时不再逐页检查文本"""
+        ocr = self.strategies['ocr']
+        if not ocr.has_ocr:
+            return False
+        entry = ctx.catalog_entry
+        if entry is not None:
+            if entry['scanned']:
+                print(f"  ⚠️ 检测到扫描版PDF (平均{entry['text_density']:.0f}字符/页)")
+            return entry['scanned']
+        return ocr.can_handle(pdf)
     
     def _fill_result(self, result: FinancialData, extracted: ExtractionResult):
         """填充提取结果到FinancialData对象"""
@@ -381,37 +657,139 @@ class SmartExtractor(BaseExtractor):
         else:
             result.success_level = "Failed"
     
-    def _update_stats(self, result: FinancialData):
-        """更新统计信息"""
-        if result.success_level == "Complete":
-            self.stats['complete_success'] += 1
-        elif result.success_level and "Partial" in result.success_level:
-            self.stats['partial_success'] += 1
-        else:
-            self.stats['failed'] += 1
+    def _update_stats(self, result: FinancialData, ctx: ExtractionContext):
+        """把本次提取的结果和策略使用情况并入统计"""
+        with self._stats_lock:
+            self.stats['total_processed'] += 1
+            if result.success_level == "Complete":
+                self.stats['complete_success'] += 1
+            elif result.success_level and "Partial" in result.success_level:
+                self.stats['partial_success'] += 1
+            else:
+                self.stats['failed'] += 1
+            for name in ctx.strategies_used:
+                self.stats['strategy_usage'][name] += 1
+        if self.extraction_mode == 'adaptive':
+            get_planner().observe(result.extraction_trace)
     
     def print_stats(self):
         """打印统计信息"""
-        print("\n" + "="*60)
-        print("智能提取器统计")
-        print("="*60)
-        print(f"提取模式: {self.extraction_mode}")
-        print(f"总处理文件: {self.stats['total_processed']}")
+        with self._stats_lock:
+            stats = dict(self.stats, strategy_usage=dict(self.stats['strategy_usage']))
+        print_extraction_stats(self.extraction_mode, stats)
+
+
+def print_extraction_stats(extraction_mode: str, stats: Dict[str, Any]) -> None:
+    """打印提取统计（total_processed / complete_success / partial_success / failed / strategy_usage）"""
+    print("\n" + "="*60)
+    print("智能提取器统计")
+    print("="*60)
+    print(f"提取模式: {extraction_mode}")
+    print(f"总处理文件: {stats['total_processed']}")
+    
+    if stats['total_processed'] > 0:
+        complete_rate = stats['complete_success'] / stats['total_processed'] * 100
+        partial_rate = stats['partial_success'] / stats['total_processed'] * 100
+        failed_rate = stats['failed'] / stats['total_processed'] * 100
         
-        if self.stats['total_processed'] > 0:
-            complete_rate = self.stats['complete_success'] / self.stats['total_processed'] * 100
-            partial_rate = self.stats['partial_success'] / self.stats['total_processed'] * 100
-            failed_rate = self.stats['failed'] / self.stats['total_processed'] * 100
-            
-            print(f"\n成功率统计:")
-            print(f"  完全成功: {complete_rate:.1f}% ({self.stats['complete_success']}/{self.stats['total_processed']})")
-            print(f"  部分成功: {partial_rate:.1f}% ({self.stats['partial_success']}/{self.stats['total_processed']})")
-            print(f"  失败: {failed_rate:.1f}% ({self.stats['failed']}/{self.stats['total_processed']})")
-            
+        print(f"\n成功率统计:")
+        print(f"  完全成功: {complete_rate:.1f}% ({stats['complete_success']}/{stats['total_processed']})")
+        print(f"  部分成功: {partial_rate:.1f}% ({stats['partial_success']}/{stats['total_processed']})")
+        print(f"  失败: {failed_rate:.1f}% ({stats['failed']}/{stats['total_processed']})")
+        
+        usage = {name: count for name, count in stats.get('strategy_usage', {}).items() if count > 0}
+        if usage:
             print(f"\n策略使用统计:")
-            for strategy, count in self.stats['strategy_usage'].items():
-                if count > 0:
-                    print(f"  {strategy}: {count}次")
+            for strategy, count in usage.items():
+                print(f"  {strategy}: {count}次")
+
+
+_extractors: Dict[Tuple[str, bool], SmartExtractor] = {}
+_extractors_lock = threading.Lock()
+
+
+def get_extractor(extraction_mode: str = 'regex_first', use_llm: bool = False) -> SmartExtractor:
+    """进程内共享的提取器（每种模式一个，工作线程共用）"""
+    key = (extraction_mode, use_llm)
+    with _extractors_lock:
+        extractor = _extractors.get(key)
+        if extractor is None:
+            extractor = _extractors[key] = SmartExtractor(extraction_mode=extraction_mode, use_llm=use_llm)
+        return extractor
+
+
+RESULT_FIELDNAMES = ['Company', 'Year', 'Total Assets', 'Total Liabilities',
+                     'Revenue', 'Net Profit', 'Method', 'File', 'Status',
+                     'Success Level', 'Currency', 'Unit', 'Language']
+
+
+def write_results_csv(results: List[FinancialData], output_file: Path) -> None:
+    """保存提取结果CSV"""
+    with open(output_file, 'w', newline='', encoding='utf-8') as f:
+        writer = csv.DictWriter(f, fieldnames=RESULT_FIELDNAMES)
+        writer.writeheader()
+        
+        for result in results:
+            row = result.to_dict()
+            row['Method'] = result.extraction_method
+            writer.writerow(row)
+
+
+def extract_single_file(pdf_path: Path, extraction_mode: str, use_llm: bool,
+                        **options) -> FinancialData:
+    """
+    提取单个文件（工作线程执行，不修改任何共享状态）
+    
+    结果由调用方在主线程中写入主控表；options 传给提取器（重试阶梯的 stages / prior）。
+    异常和超出时间预算记入隔离区（按内容哈希）。提取在守护线程中执行，超出时间预算时
+    放弃等待并返回失败结果：页解析进程池直接结束，线程在下一个策略前停止且不再学习或统计
+    （线程无法强行终止，卡在当前解析中的部分在后台继续运行，不阻塞退出）
+    """
+    quarantine = get_quarantine()
+    start = time.perf_counter()
+    try:
+        progress.file_started(pdf_path.name)
+        quarantine.begin(pdf_path.name, get_catalog().hash_files([pdf_path]).get(pdf_path))
+        
+        # 共享提取器：策略只读，单次提取的状态在请求上下文中
+        extractor = get_extractor(extraction_mode, use_llm)
+        outcome: Dict[str, Any] = {}
+        abandoned = threading.Event()
+
+        def run():
+            try:
+                with profiling.maybe_profile(pdf_path.name):
+                    outcome['result'] = extractor.extract_from_pdf(str(pdf_path), abandoned=abandoned, **options)
+            except Exception as e:
+                outcome['error'] = e
+
+        worker = threading.Thread(target=run, name=f"watchdog-{pdf_path.name}", daemon=True)
+        worker.start()
+        worker.join(quarantine.budget)
+        if worker.is_alive():
+            # 放弃：线程不再学习或统计；大文档可能卡在页解析子进程中，结束进程池而不等待
+            abandoned.set()
+            page_parallel.shutdown(wait=False)
+            signature = quarantine.abandon(pdf_path.name, time.perf_counter() - start)
+            print(f"  ⏱️ {pdf_path.name}: 超出时间预算 {quarantine.budget:.0f}秒，放弃（{signature}）")
+            result = FinancialData(company=pdf_path.stem.split('_')[0], file_path=str(pdf_path))
+            result.status = f"Error: {signature}"
+            result.success_level = "Failed"
+            return result
+        if 'error' in outcome:
+            raise outcome['error']
+        result = outcome['result']
+        trace = result.extraction_trace or {}
+        quarantine.finish(pdf_path.name, time.perf_counter() - start, trace.get('error'),
+                          trace.get('steps', []))
+        return result
+    except Exception as e:
+        quarantine.finish(pdf_path.name, time.perf_counter() - start, type(e).__name__)
+        print(f"  ❌ {pdf_path.name}: {e}")
+        result = FinancialData(company=pdf_path.stem.split('_')[0], file_path=str(pdf_path))
+        result.status = f"Error: {str(e)[:50]}"
+        result.success_level = "Failed"
+        return result
 
 
 def smart_extract(
@@ -425,7 +803,13 @@ def smart_extract(
     batch_id: Optional[int] = None,
     batch_size: int = 200,
     skip_processed: bool = True,
-    master_table_path: Optional[str] = None
+    master_table_path: Optional[str] = None,
+    incremental: bool = False,
+    progress_port: Optional[int] = progress.DEFAULT_PROGRESS_PORT,
+    profile_sample: Optional[int] = None,
+    order: str = DEFAULT_ORDER,
+    coordinator: Optional[Coordinator] = None,
+    slow_lane: bool = False
 ) -> Dict[str, Any]:
     """
     智能提取主函数
@@ -436,80 +820,83 @@ def smart_extract(
         limit: 限制处理文件数
         extraction_mode: 提取模式
         use_llm: 是否启用LLM
+        incremental: 只处理新增、内容变化或提取逻辑版本变化的文件（自动启用缓存）
+        progress_port: 实时进度服务端口（None表示不启动）
+        profile_sample: 每个工作线程剖析的文件数（None表示不剖析）
+        order: 调度顺序 longest（预计耗时最长的先开始）/ shortest / name
+        coordinator: 多节点协调器（Coordinator）：待处理文件登记为共享工作项，按租约领取后处理
+        slow_lane: 慢速通道：只处理隔离区的文件（串行，放宽时间预算）；否则跳过隔离的文件
     """
     # 记录开始时间
     total_start_time = time.time()
+    metrics = get_metrics()
+    metrics.reset()
+    page_hints = get_page_hints()
+    page_hints.reset_run()
+    pattern_packs = get_pattern_packs()
+    pattern_packs.reset_run()
+    quarantine = get_quarantine()
+    quarantine.reset_run(slow_lane)
+    if profile_sample:
+        profiling.start_profiling(profile_sample)
     
-    # 缓存和主表设置
-    cache_dir = Path("output/extraction_cache")
-    cache_dir.mkdir(parents=True, exist_ok=True)
-    cache_file = cache_dir / "processed_files.json"
-    
-    # 主控制表
-    if master_table_path:
-        master_table_file = Path(master_table_path)
-    else:
-        master_table_file = Path("output/extraction_master.json")
+    # 主控制表（日志式存储，单写线程）
+    store = MasterStore(master_table_path or DEFAULT_MASTER_PATH).start()
     
-    # 加载或创建主控制表
-    if master_table_file.exists():
-        with open(master_table_file, 'r', encoding='utf-8') as f:
-            master_table = json.load(f)
-    else:
-        master_table = {
-            "metadata": {
-                "total_files": 0,
-                "processed": 0,
-                "successful": 0,
-                "partial": 0,
-                "failed": 0,
-                "last_update": datetime.now().isoformat(),
-                "batches": {}
-            },
-            "files": {}
-        }
+    # 策略规划器：按主控表中的历史收益和成本规划 adaptive 模式
+    if extraction_mode == 'adaptive':
+        load_history(store.snapshot()['files'].values())
     
-    # 加载缓存
-    processed_cache = {}
-    if use_cache and cache_file.exists():
-        with open(cache_file, 'r') as f:
-            processed_cache = json.load(f)
+    # 结果缓存（按内容哈希 + 模式 + 版本指纹）
+    if incremental:
+        use_cache = True
+    cache = ResultCache() if use_cache else None
     
     # 获取PDF文件
     all_pdf_files = sorted(list(Path(input_dir).glob("*.pdf")))  # 排序以保证一致性
-    master_table["metadata"]["total_files"] = len(all_pdf_files)
+    store.set_total_files(len(all_pdf_files))
     
-    # 批次处理
+    # 预计耗时：页数、大小、是否扫描版和历史实测耗时
+    cost_model = CostModel.from_records(store.snapshot()['files'])
+    catalog = get_catalog()
+    costs = {f: cost_model.estimate(f, catalog.lookup(f)) for f in all_pdf_files}
+    
+    # 批次处理（按预计耗时均衡分批）
     if batch_id is not None:
-        # 计算批次范围
-        start_idx = (batch_id - 1) * batch_size
-        end_idx = min(start_idx + batch_size, len(all_pdf_files))
-        pdf_files = all_pdf_files[start_idx:end_idx]
-        print(f"处理批次 {batch_id}: 文件 {start_idx+1}-{end_idx} (共{len(pdf_files)}个)")
+        batches = plan_batches(all_pdf_files, costs, batch_size)
+        pdf_files = batches[batch_id - 1] if 0 < batch_id <= len(batches) else []
+        estimated = sum(costs[f] for f in pdf_files)
+        print(f"处理批次 {batch_id}/{len(batches)}: {len(pdf_files)} 个文件，预计 {estimated:.1f}秒")
         
         # 记录批次信息
-        master_table["metadata"]["batches"][str(batch_id)] = {
-            "start": start_idx,
-            "end": end_idx,
-            "size": len(pdf_files),
-            "status": "processing",
-            "start_time": datetime.now().isoformat()
-        }
+        store.update_batch(
+            batch_id,
+            size=len(pdf_files),
+            estimated_seconds=round(estimated, 1),
+            status="processing",
+            start_time=datetime.now().isoformat()
+        )
     else:
         pdf_files = all_pdf_files
     
+    # 增量模式：只处理缓存失效的文件
+    if incremental:
+        plan = cache.plan(pdf_files, mode_key(extraction_mode, use_llm))
+        pending = set(plan['new'] + plan['changed'] + plan['invalidated'])
+        pdf_files = [f for f in pdf_files if f in pending]
+        print(f"增量计划: 新增 {len(plan['new'])} | 内容变化 {len(plan['changed'])} | "
+              f"版本失效 {len(plan['invalidated'])} | 未变化跳过 {len(plan['unchanged'])}")
+    
     # 过滤已处理文件
-    if skip_processed:
+    elif skip_processed:
         original_count = len(pdf_files)
         # 简化逻辑：只处理未成功的文件
         filtered_files = []
         for f in pdf_files:
             # 检查主表中的状态
-            if f.name in master_table["files"]:
-                status = master_table["files"][f.name].get("status")
-                # 只重新处理失败的文件，跳过成功和部分成功的
-                if status in ["completed", "partial"]:
-                    continue
+            # 只重新处理失败的文件，跳过成功和部分成功的
+            if store.status(f.name) in ["completed", "partial"]:
+                continue
             # 如果不在主表中，或者状态是失败，则需要处理
             filtered_files.append(f)
         
@@ -518,235 +905,265 @@ def smart_extract(
         if skipped_count > 0:
             print(f"跳过 {skipped_count} 个已处理文件")
     
+    # 隔离区：按内容哈希查表（文件未变化时只需 stat），隔离的文件不进入普通通道
+    digests = catalog.hash_files(pdf_files)
+    pdf_files, quarantined = quarantine.partition(pdf_files, digests)
+    if slow_lane:
+        pdf_files = quarantined
+        max_workers = 1
+        print(f"慢速通道: 隔离区中 {len(pdf_files)} 个文件，串行处理，"
+              f"单文件时间预算 {quarantine.budget:.0f}秒")
+    elif quarantined:
+        quarantine.skipped(len(quarantined))
+        metrics.inc('quarantine_skipped', len(quarantined))
+        print(f"跳过 {len(quarantined)} 个隔离文件（python main.py extract --slow-lane 单独处理）")
+    
     if limit:
         pdf_files = pdf_files[:limit]
     
+    # 文档目录：待处理文件未登记时先分析（已登记且未变化的只需 stat），页数、是否扫描版供
+    # 耗时估计、调度、进度和策略规划使用；慢速通道的文件可能让解析器卡死，不预先分析
+    if pdf_files and not slow_lane:
+        entries = catalog.scan(pdf_files)
+        costs.update({f: cost_model.estimate(f, entry) for f, entry in entries.items()})
+    
+    # 调度顺序（线程池按提交顺序取任务）
+    pdf_files = order_files(pdf_files, costs, order)
+    
+    # 多节点协调：本节点的待处理文件登记为共享工作项
+    # （工作键 = 内容哈希:模式:版本指纹，变化或之前的运行中失败的重新开放）
+    if coordinator is not None:
+        work_key = f"{mode_key(extraction_mode, use_llm)}:{extractor_fingerprint()}"
+        added = coordinator.register(pdf_files, costs,
+                                     {f: f"{digests[f]}:{work_key}" for f in pdf_files if f in digests})
+        coordinator.start()
+        print(f"协调节点 {coordinator.node_id}: 新登记/重新开放 {added} 个工作项，"
+              f"共享待处理 {coordinator.summary()['pending']}")
+    
+    # 批量预取内容哈希（未变化的文件走 stat 快速路径）
+    if cache is not None and coordinator is None:
+        cache.hash_files(pdf_files)
+    
     print(f"\n{'='*60}")
     print(f"智能财务数据提取 - 批量管理模式")
     print(f"{'='*60}")
     if batch_id:
         print(f"批次ID: {batch_id}")
-    print(f"总文件数: {master_table['metadata']['total_files']}")
-    print(f"已处理: {master_table['metadata']['processed']}")
+    print(f"总文件数: {store.metadata['total_files']}")
+    print(f"已处理: {store.processed}")
     print(f"本次待处理: {len(pdf_files)}")
     print(f"提取模式: {extraction_mode}")
     print(f"LLM支持: {'启用' if use_llm else '猁用'}")
     print(f"并行线程: {max_workers}")
     print(f"缓存: {'启用' if use_cache else '禁用'}")
+    print(f"调度顺序: {order}（预计总耗时 {sum(costs[f] for f in pdf_files):.1f}秒）")
     print(f"{'='*60}")
     
-    # 定义单文件处理函数
-    def process_single_file(pdf_path: Path) -> FinancialData:
-        try:
-            # 检查重试次数
-            retry_count = master_table["files"].get(pdf_path.name, {}).get("retry_count", 0)
-            
-            # 如果已经重试多次，直接跳过
-            if retry_count > 3:
-                print(f"  ⏭️ 跳过多次失败文件: {pdf_path.name} (已重试{retry_count}次)")
-                result = FinancialData(company=pdf_path.stem.split('_')[0], file_path=str(pdf_path))
-                result.success_level = "Skipped"
-                return result
-            
-            # 检查缓存
-            if use_cache and pdf_path.name in processed_cache:
-                cached = processed_cache[pdf_path.name]
-                # 只有成功或部分成功的才使用缓存
-                if cached.get('success_level') not in ['Failed', 'Skipped']:
-                    result = FinancialData(company=pdf_path.stem.split('_')[0], file_path=str(pdf_path))
-                    result.company = cached.get('company')
-                    result.year = cached.get('year')
-                    result.total_assets = cached.get('total_assets')
-                    result.total_liabilities = cached.get('total_liabilities')
-                    result.revenue = cached.get('revenue')
-                    result.net_profit = cached.get('net_profit')
-                    result.success_level = cached.get('success_level')
-                    result.extraction_method = "cached"
-                    return result
-            
-            # 创建新的提取器实例（线程安全）
-            # 对于重试的文件，使用更保守的策略
-            if retry_count > 0:
-                # 重试时尝试使用不同的模式
-                retry_mode = 'regex_only' if extraction_mode == 'llm_only' else 'regex_first'
-                extractor = SmartExtractor(extraction_mode=retry_mode, use_llm=False)
-            else:
-                extractor = SmartExtractor(extraction_mode=extraction_mode, use_llm=use_llm)
-            
-            result = extractor.extract_from_pdf(str(pdf_path))
-            
-            # 保存到缓存和主表
-            file_info = {
-                'company': result.company,
-                'year': result.year,
-                'total_assets': result.total_assets,
-                'total_liabilities': result.total_liabilities,
-                'revenue': result.revenue,
-                'net_profit': result.net_profit,
-                'success_level': result.success_level,
-                'timestamp': datetime.now().isoformat()
-            }
-            
-            if use_cache and result.success_level != "Failed":
-                processed_cache[pdf_path.name] = file_info
-            
-            # 更新主表
-            extracted_fields = sum([
-                1 for field in [result.total_assets, result.total_liabilities, 
-                               result.revenue, result.net_profit]
-                if field is not None
-            ])
-            
-            master_table["files"][pdf_path.name] = {
-                "status": "completed" if result.success_level == "Complete" else 
-                         "partial" if "Partial" in str(result.success_level) else "failed",
-                "batch_id": batch_id,
-                "extracted_fields": extracted_fields,
-                "quality_score": extracted_fields / 4.0,
-                "retry_count": master_table["files"].get(pdf_path.name, {}).get("retry_count", 0),
-                "last_update": datetime.now().isoformat()
-            }
-            
-            return result
-        except Exception as e:
-            print(f"  ❌ {pdf_path.name}: {e}")
-            result = FinancialData(company=pdf_path.stem.split('_')[0], file_path=str(pdf_path))
-            result.success_level = "Failed"
-            return result
-    
-    # 提取数据
     results = []
     
-    if max_workers > 1:
-        # 并行处理
-        # LLM模式限制并发数（API限制）
-        if extraction_mode == 'llm_only' and use_llm:
-            actual_workers = min(max_workers, 2)
-        else:
-            actual_workers = max_workers
+    # 实时进度（本地HTTP服务，监控端订阅事件流）
+    page_counts = {}
+    for f in pdf_files:
+        entry = get_catalog().lookup(f)
+        page_counts[f.name] = entry['page_count'] if entry else None
+    known_pages = None not in page_counts.values()
+    progress_server = progress.start_progress(
+        len(pdf_files),
+        sum(page_counts.values()) if known_pages else 0,
+        port=progress_port
+    )
+    
+    def finish(pdf_path: Path, status: str) -> None:
+        """发布文件完成事件，协调模式下提交工作项"""
+        progress.file_finished(pdf_path.name, status, page_counts.get(pdf_path.name))
+        if coordinator is not None:
+            coordinator.complete(pdf_path.name, status)
+    
+    cache_mode = mode_key(extraction_mode, use_llm)
+    
+    def lookup_cache(pdf_path: Path) -> Optional[FinancialData]:
+        """缓存命中时返回缓存结果，否则返回None"""
+        if cache is None:
+            return None
+        cached = cache.get(pdf_path, cache_mode)
+        metrics.inc('cache_hits' if cached is not None else 'cache_misses')
+        return cached
+    
+    def count_retry(pdf_path: Path) -> None:
+        """提交提取前：之前失败过的文件计为一次重新提取"""
+        if store.status(pdf_path.name) == "failed":
+            metrics.inc('retries')
+    
+    def record(pdf_path: Path, result: FinancialData) -> None:
+        """在主线程中记录结果：更新缓存和主控表"""
+        results.append(result)
+        if result.extraction_method == "cached":
+            finish(pdf_path, "cached")
+            return
+        finish(pdf_path, result_status(result))
         
-        with concurrent.futures.ThreadPoolExecutor(max_workers=actual_workers) as executor:
-            # 使用tqdm显示进度
-            with tqdm(total=len(pdf_files), desc="处理进度") as pbar:
-                future_to_pdf = {executor.submit(process_single_file, pdf): pdf for pdf in pdf_files}
-                
-                for future in concurrent.futures.as_completed(future_to_pdf):
-                    pdf = future_to_pdf[future]
-                    try:
-                        # 减少超时时间到30秒，快速跳过问题文件
-                        result = future.result(timeout=30)
-                        results.append(result)
-                        
-                        # 更新进度条
-                        if result.success_level == "Complete":
-                            status = "✅"
-                        elif "Partial" in str(result.success_level):
-                            status = "⚠️"
-                        else:
-                            status = "❌"
-                        pbar.set_description(f"{pdf.name[:30]} {status}")
-                        pbar.update(1)
-                        
-                        # 每处理10个文件保存一次进度
-                        if len(results) % 10 == 0:
-                            # 保存中间进度
-                            if use_cache:
-                                with open(cache_file, 'w') as f:
-                                    json.dump(processed_cache, f, indent=2)
-                            with open(master_table_file, 'w', encoding='utf-8') as f:
-                                json.dump(master_table, f, indent=2, ensure_ascii=False)
+        if cache is not None:
+            cache.put(pdf_path, cache_mode, result)
+        
+        store.record_result(pdf_path, result, batch_id)
+    
+    def run_files(files: List[Path]) -> None:
+        """提取一组文件（并行或串行）"""
+        if max_workers > 1:
+            # 并行处理
+            # LLM模式限制并发数（API限制）
+            if extraction_mode == 'llm_only' and use_llm:
+                actual_workers = min(max_workers, 2)
+            else:
+                actual_workers = max_workers
+            
+            with concurrent.futures.ThreadPoolExecutor(max_workers=actual_workers) as executor:
+                # 使用tqdm显示进度
+                with tqdm(total=len(files), desc="处理进度") as pbar:
+                    future_to_pdf = {}
+                    for pdf in files:
+                        cached_result = lookup_cache(pdf)
+                        if cached_result is not None:
+                            record(pdf, cached_result)
+                            pbar.update(1)
+                            continue
+                        count_retry(pdf)
+                        future = executor.submit(extract_single_file, pdf, extraction_mode, use_llm)
+                        future_to_pdf[future] = pdf
+                    
+                    pending = len(future_to_pdf)
+                    metrics.set_gauge('queue_depth', pending)
+                    for future in concurrent.futures.as_completed(future_to_pdf):
+                        pdf = future_to_pdf[future]
+                        pending -= 1
+                        metrics.set_gauge('queue_depth', pending)
+                        try:
+                            # 减少超时时间到30秒，快速跳过问题文件
+                            result = future.result(timeout=30)
+                            record(pdf, result)
                             
-                    except concurrent.futures.TimeoutError:
-                        print(f"\n  ⏱️ {pdf.name}: 处理超时(60秒)，标记为失败")
-                        # 创建失败结果
-                        failed_result = FinancialData(company=pdf.stem.split('_')[0], file_path=str(pdf))
-                        failed_result.success_level = "Failed"
-                        results.append(failed_result)
-                        # 标记需要重试
-                        master_table["files"][pdf.name] = {
-                            "status": "failed",
-                            "retry_needed": True,
-                            "error": "Timeout",
-                            "timestamp": datetime.now().isoformat()
-                        }
-                        pbar.update(1)
-                    except Exception as e:
-                        print(f"\n  ❌ {pdf.name}: {str(e)[:100]}")
-                        # 创建失败结果但继续处理
-                        failed_result = FinancialData(company=pdf.stem.split('_')[0], file_path=str(pdf))
-                        failed_result.success_level = "Failed"
-                        results.append(failed_result)
-                        pbar.update(1)
+                            # 更新进度条
+                            if result.success_level == "Complete":
+                                status = "✅"
+                            elif "Partial" in str(result.success_level):
+                                status = "⚠️"
+                            else:
+                                status = "❌"
+                            pbar.set_description(f"{pdf.name[:30]} {status}")
+                            pbar.update(1)
+                                
+                        except concurrent.futures.TimeoutError:
+                            print(f"\n  ⏱️ {pdf.name}: 处理超时(60秒)，标记为失败")
+                            # 创建失败结果
+                            failed_result = FinancialData(company=pdf.stem.split('_')[0], file_path=str(pdf))
+                            failed_result.success_level = "Failed"
+                            results.append(failed_result)
+                            # 标记需要重试
+                            store.record_failure(pdf, "Timeout", batch_id)
+                            finish(pdf, "failed")
+                            pbar.update(1)
+                        except Exception as e:
+                            print(f"\n  ❌ {pdf.name}: {str(e)[:100]}")
+                            # 创建失败结果但继续处理
+                            failed_result = FinancialData(company=pdf.stem.split('_')[0], file_path=str(pdf))
+                            failed_result.success_level = "Failed"
+                            results.append(failed_result)
+                            finish(pdf, "failed")
+                            pbar.update(1)
+        else:
+            # 串行处理（原逻辑）
+            for i, pdf_path in enumerate(files, 1):
+                print(f"\n[{i}/{len(files)}] {pdf_path.name}")
+                result = lookup_cache(pdf_path)
+                if result is None:
+                    count_retry(pdf_path)
+                    result = extract_single_file(pdf_path, extraction_mode, use_llm)
+                record(pdf_path, result)
+                
+                # 打印结果摘要
+                if result.success_level == "Complete":
+                    print(f"  ✅ 完全成功 - {result.extraction_method}")
+                elif "Partial" in str(result.success_level):
+                    print(f"  ⚠️ 部分成功 - {result.success_level} - {result.extraction_method}")
+                else:
+                    print(f"  ❌ 失败")
+    
+    # 提取数据
+    if coordinator is None:
+        run_files(pdf_files)
     else:
-        # 串行处理（原逻辑）
-        for i, pdf_path in enumerate(pdf_files, 1):
-            print(f"\n[{i}/{len(pdf_files)}] {pdf_path.name}")
-            result = process_single_file(pdf_path)
-            results.append(result)
-            
-            # 打印结果摘要
-            if result.success_level == "Complete":
-                print(f"  ✅ 完全成功 - {result.extraction_method}")
-            elif "Partial" in str(result.success_level):
-                print(f"  ⚠️ 部分成功 - {result.success_level} - {result.extraction_method}")
-            else:
-                print(f"  ❌ 失败")
-    
-    # 保存缓存和主表
-    if use_cache:
-        with open(cache_file, 'w') as f:
-            json.dump(processed_cache, f, indent=2)
-    
-    # 更新主表元数据
-    master_table["metadata"]["processed"] = len([f for f in master_table["files"].values() 
-                                                 if f.get("status") in ["completed", "partial"]])
-    master_table["metadata"]["successful"] = len([f for f in master_table["files"].values() 
-                                                   if f.get("status") == "completed"])
-    master_table["metadata"]["partial"] = len([f for f in master_table["files"].values() 
-                                               if f.get("status") == "partial"])
-    master_table["metadata"]["failed"] = len([f for f in master_table["files"].values() 
-                                              if f.get("status") == "failed"])
-    master_table["metadata"]["last_update"] = datetime.now().isoformat()
-    
-    # 更新批次状态
-    if batch_id and str(batch_id) in master_table["metadata"]["batches"]:
-        master_table["metadata"]["batches"][str(batch_id)]["status"] = "completed"
-        master_table["metadata"]["batches"][str(batch_id)]["end_time"] = datetime.now().isoformat()
-    
-    # 保存主表
-    with open(master_table_file, 'w', encoding='utf-8') as f:
-        json.dump(master_table, f, indent=2, ensure_ascii=False)
-    
-    # 保存结果
-    output_path = Path(output_dir)
-    results_dir = output_path / "results"
-    results_dir.mkdir(parents=True, exist_ok=True)
-    
-    timestamp = datetime.now().strftime('%Y%m%d%H%M')
-    prefix = "parallel_" if max_workers > 1 else ""
-    output_file = results_dir / f"{prefix}extraction_{timestamp}.csv"
+        # 多节点协调：按租约逐轮领取共享工作项，直到没有可领取的文件
+        pdf_files = []
+        claim_size = max(max_workers * 2, 4)
+        missing = set()
+        
+        def available(name: str) -> bool:
+            """本机有该文件（其他节点登记的文件可能只在该节点上）"""
+            if name in missing:
+                return False
+            if (Path(input_dir) / name).is_file():
+                return True
+            missing.add(name)
+            return False
+        
+        try:
+            while True:
+                claimed = [Path(input_dir) / name
+                           for name in coordinator.claim(claim_size, order, accept=available)]
+                if not claimed:
+                    break
+                # 其他节点登记的文件可能在本节点的隔离区中
+                claimed, held = quarantine.partition(claimed, catalog.hash_files(claimed))
+                for pdf in held:
+                    quarantine.skipped(1)
+                    coordinator.complete(pdf.name, "quarantined")
+                pdf_files.extend(claimed)
+                if cache is not None:
+                    cache.hash_files(claimed)
+                run_files(claimed)
+        finally:
+            coordinator.stop()
+        if missing:
+            print(f"  本机没有 {len(missing)} 个其他节点登记的文件，留给其他节点处理")
+        coordinator.print_summary()
     
-    with open(output_file, 'w', newline='', encoding='utf-8') as f:
-        fieldnames = ['Company', 'Year', 'Total Assets', 'Total Liabilities',
-                     'Revenue', 'Net Profit', 'Method', 'File', 'Status',
-                     'Success Level', 'Currency', 'Unit', 'Language']
-        writer = csv.DictWriter(f, fieldnames=fieldnames)
-        writer.writeheader()
+    progress.stop_progress(progress_server)
+    
+    with metrics.timer('write'):
+        # 保存缓存
+        if cache is not None:
+            cache.save()
         
-        for result in results:
-            row = result.to_dict()
-            row['Method'] = result.extraction_method
-            writer.writerow(row)
+        # 更新批次状态
+        if batch_id:
+            store.update_batch(batch_id, status="completed", end_time=datetime.now().isoformat())
+        
+        # 等待写线程落盘并压缩为快照
+        store.close()
+        
+        # 保存结果
+        output_path = Path(output_dir)
+        results_dir = output_path / "results"
+        results_dir.mkdir(parents=True, exist_ok=True)
+        
+        timestamp = datetime.now().strftime('%Y%m%d%H%M')
+        prefix = "parallel_" if max_workers > 1 else ""
+        output_file = results_dir / f"{prefix}extraction_{timestamp}.csv"
+        
+        write_results_csv(results, output_file)
+        
+        # 写入列式结果存储（一次运行一个分区）
+        from .results_store import ResultsStore  # pandas 只在写结果时加载，工作进程不需要
+        ResultsStore().write_results(results, source=str(output_file))
     
-    # 打印统计（只在单线程模式下有extractor实例）
+    # 打印统计（只在单线程模式下打印详细统计）
     if max_workers == 1:
-        # 创建一个临时extractor实例来打印统计
-        temp_extractor = SmartExtractor(extraction_mode=extraction_mode, use_llm=use_llm)
-        temp_extractor.stats['total_processed'] = len(results)
-        temp_extractor.stats['complete_success'] = sum(1 for r in results if r.success_level == "Complete")
-        temp_extractor.stats['partial_success'] = sum(1 for r in results if "Partial" in str(r.success_level))
-        temp_extractor.stats['failed'] = sum(1 for r in results if r.success_level == "Failed")
-        temp_extractor.print_stats()
+        print_extraction_stats(extraction_mode, {
+            'total_processed': len(results),
+            'complete_success': sum(1 for r in results if r.success_level == "Complete"),
+            'partial_success': sum(1 for r in results if "Partial" in str(r.success_level)),
+            'failed': sum(1 for r in results if r.success_level == "Failed")
+        })
     else:
         # 多线程模式下直接打印统计
         print("\n" + "="*60)
@@ -772,8 +1189,21 @@ def smart_extract(
     if len(pdf_files) > 0:
         print(f"平均每文件: {total_elapsed/len(pdf_files):.2f}秒")
     
+    metrics.print_summary()
+    metrics_file = metrics.dump_json()
+    page_hints.save()
+    page_hints.print_summary()
+    pattern_packs.save()
+    pattern_packs.print_summary()
+    quarantine.save()
+    quarantine.print_summary()
+    page_parallel.shutdown()
+    if profile_sample:
+        profiling.stop_profiling()
+    
     print(f"\n结果已保存至: {output_file}")
-    print(f"主控制表已更新: {master_table_file}")
+    print(f"主控制表已更新: {store.snapshot_file}")
+    print(f"运行指标: {metrics_file}")
     
     # 返回统计信息
     return {
@@ -5,6 +5,7 @@ from .regex_strategy import RegexStrategy
 from .llm_strategy import LLMStrategy
 from .ocr_strategy import OCRStrategy
 from .table_strategy import TableStrategy
+from .shared import get_strategy, get_strategies
 
 __all__ = [
     'BaseStrategy',
@@ -12,5 +13,7 @@ __all__ = [
     'RegexStrategy',
     'LLMStrategy',
     'OCRStrategy',
-    'TableStrategy'
+    'TableStrategy',
+    'get_strategy',
+    'get_strategies'
 ]
\ No newline at end of file
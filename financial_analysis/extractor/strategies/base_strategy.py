@@ -3,9 +3,12 @@
 Base Strategy Interface
 """
 
+import threading
 from abc import ABC, abstractmethod
 from typing import Dict, Optional, Any
-from dataclasses import dataclass
+from dataclasses import dataclass, field
+
+from ..metrics import get_metrics
 
 
 @dataclass
@@ -17,6 +20,9 @@ class ExtractionResult:
     net_profit: Optional[float] = None
     confidence: float = 0.0
     method: str = ""
+    tokens: int = 0  # LLM消耗的token（缓存命中为0）
+    # 字段位置：{'offset': 文本中的字符偏移} 或 {'page': 页码, 'pos': 页内相对位置}
+    locations: Dict[str, Dict[str, Any]] = field(default_factory=dict)
     
     def to_dict(self) -> Dict[str, Any]:
         """转换为字典"""
@@ -82,6 +88,7 @@ class BaseStrategy(ABC):
             'successes': 0,
             'failures': 0
         }
+        self._stats_lock = threading.Lock()
     
     @abstractmethod
     def extract(self, content: Any, **kwargs) -> ExtractionResult:
@@ -93,21 +100,29 @@ class BaseStrategy(ABC):
         """判断策略是否能处理该内容"""
         pass
     
+    def _count(self, key: str) -> None:
+        """统计计数（策略实例可能被多个线程共用）"""
+        with self._stats_lock:
+            self.stats[key] += 1
+        if key != 'attempts':
+            outcome = 'success' if key == 'successes' else 'failure'
+            get_metrics().inc('strategy_results', labels={'strategy': self.name, 'outcome': outcome})
+    
     def execute(self, content: Any, **kwargs) -> ExtractionResult:
         """执行完整的提取流程"""
-        self.stats['attempts'] += 1
+        self._count('attempts')
         
         try:
             result = self.extract(content, **kwargs)
             
             if result.fields_count > 0:
-                self.stats['successes'] += 1
+                self._count('successes')
             else:
-                self.stats['failures'] += 1
+                self._count('failures')
             
             return result
             
         except Exception as e:
             print(f"  ❌ {self.name}策略失败: {str(e)[:100]}")
-            self.stats['failures'] += 1
+            self._count('failures')
             return ExtractionResult(method=f"{self.name}_failed")
\ No newline at end of file
@@ -8,8 +8,9 @@ import json
 import requests
 import hashlib
 from pathlib import Path
-from typing import Any, Optional, Dict
+from typing import Any, Optional, Dict, Tuple
 from .base_strategy import BaseStrategy, ExtractionResult
+from ..metrics import get_metrics
 
 # 尝试加载环境变量
 try:
@@ -67,6 +68,10 @@ class DeepSeekClient:
     
     def extract_financial_data(self, text: str, company_name: str = "", year: str = "") -> Dict:
         """使用LLM提取财务数据"""
+        return self.extract_with_usage(text, company_name, year)[0]
+    
+    def extract_with_usage(self, text: str, company_name: str = "", year: str = "") -> Tuple[Dict, int]:
+        """使用LLM提取财务数据，同时返回本次消耗的token数（缓存命中为0）"""
         # 构建系统提示词
         system_prompt = """你是一个专业的财务数据提取助手。请从财务报表文本中准确提取以下数据：
 
@@ -111,7 +116,7 @@ class DeepSeekClient:
         cache_key = self._get_cache_key(text, user_prompt)
         cached_result = self._check_cache(cache_key)
         if cached_result:
-            return cached_result
+            return cached_result, 0
         
         # 调用API
         try:
@@ -137,6 +142,14 @@ class DeepSeekClient:
             response.raise_for_status()
             result = response.json()
             
+            # 记录token用量
+            usage = result.get('usage') or {}
+            tokens = usage.get('prompt_tokens', 0) + usage.get('completion_tokens', 0)
+            metrics = get_metrics()
+            for kind in ('prompt', 'completion'):
+                if usage.get(f'{kind}_tokens'):
+                    metrics.inc('llm_tokens', usage[f'{kind}_tokens'], labels={'kind': kind})
+            
             # 解析响应
             content = result['choices'][0]['message']['content']
             
@@ -154,7 +167,7 @@ class DeepSeekClient:
             # 保存缓存
             self._save_cache(cache_key, extracted_data)
             
-            return extracted_data
+            return extracted_data, tokens
             
         except Exception as e:
             print(f"    ❌ API请求失败: {str(e)[:100]}")
@@ -163,7 +176,7 @@ class DeepSeekClient:
                 "total_liabilities": None,
                 "revenue": None,
                 "net_profit": None
-            }
+            }, 0
     
     def _parse_text_response(self, text: str) -> Dict:
         """解析文本格式的响应"""
@@ -253,7 +266,7 @@ class LLMStrategy(BaseStrategy):
             print(f"    📝 准备发送 {len(limited_text)} 字符给LLM...")
             
             # 调用LLM提取
-            llm_result = self.client.extract_financial_data(
+            llm_result, result.tokens = self.client.extract_with_usage(
                 limited_text,
                 company_name=kwargs.get('company_name', ''),
                 year=kwargs.get('year', '')
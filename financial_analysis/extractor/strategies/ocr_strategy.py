@@ -3,7 +3,8 @@ OCR提取策略
 OCR Extraction Strategy
 """
 
-from typing import Any
+import io
+from typing import Any, List
 from .base_strategy import BaseStrategy, ExtractionResult
 
 # 尝试导入OCR依赖
@@ -16,6 +17,38 @@ except ImportError:
     HAS_OCR = False
 
 
+def ocr_pages(pdf_path: str, start: int, end: int) -> List[str]:
+    """OCR识别 [start, end) 各页（模块级函数，可交给进程池按页并行）"""
+    texts = []
+    pdf_doc = fitz.open(pdf_path)
+    try:
+        for page_num in range(start, min(end, len(pdf_doc))):
+            page = pdf_doc[page_num]
+            
+            # 将页面转换为图像
+            mat = fitz.Matrix(2, 2)  # 放大2倍
+            pix = page.get_pixmap(matrix=mat)
+            img_data = pix.pil_tobytes(format="PNG")
+            
+            # 使用PIL打开图像
+            img = Image.open(io.BytesIO(img_data))
+            
+            # OCR识别
+            try:
+                text = pytesseract.image_to_string(img, lang='chi_sim+eng')
+            except:
+                text = pytesseract.image_to_string(img, lang='eng')
+            
+            texts.append(text)
+            
+            # 显示进度
+            if (page_num + 1) % 5 == 0:
+                print(f"    已处理 {page_num + 1}/{end} 页")
+    finally:
+        pdf_doc.close()
+    return texts
+
+
 class OCRStrategy(BaseStrategy):
     """OCR提取策略（用于扫描版PDF）"""
     
@@ -62,7 +95,13 @@ class OCRStrategy(BaseStrategy):
         return is_scanned
     
     def extract(self, content: Any, **kwargs) -> ExtractionResult:
-        """使用OCR提取文本"""
+        """
+        使用OCR提取文本
+        
+        kwargs:
+            pdf_path: PDF路径（content 不是路径时）
+            map_pages: 页范围映射函数 map_pages(func, pdf_path, start, end)，大文档按页拆分到多个进程
+        """
         result = ExtractionResult(method="ocr")
         
         if not self.has_ocr:
@@ -80,40 +119,15 @@ class OCRStrategy(BaseStrategy):
         print(f"  🔍 开始OCR处理...")
         
         try:
-            import fitz
-            import io
-            
-            # 打开PDF
-            pdf_doc = fitz.open(pdf_path)
-            ocr_texts = []
-            
             # 处理前20页
-            pages_to_process = min(20, len(pdf_doc))
-            
-            for page_num in range(pages_to_process):
-                page = pdf_doc[page_num]
-                
-                # 将页面转换为图像
-                mat = fitz.Matrix(2, 2)  # 放大2倍
-                pix = page.get_pixmap(matrix=mat)
-                img_data = pix.pil_tobytes(format="PNG")
-                
-                # 使用PIL打开图像
-                img = Image.open(io.BytesIO(img_data))
-                
-                # OCR识别
-                try:
-                    text = pytesseract.image_to_string(img, lang='chi_sim+eng')
-                except:
-                    text = pytesseract.image_to_string(img, lang='eng')
-                
-                ocr_texts.append(text)
-                
-                # 显示进度
-                if (page_num + 1) % 5 == 0:
-                    print(f"    已处理 {page_num + 1}/{pages_to_process} 页")
+            with fitz.open(pdf_path) as pdf_doc:
+                pages_to_process = min(20, len(pdf_doc))
             
-            pdf_doc.close()
+            map_pages = kwargs.get('map_pages')
+            if map_pages is not None:
+                ocr_texts = map_pages(ocr_pages, pdf_path, 0, pages_to_process)
+            else:
+                ocr_texts = ocr_pages(pdf_path, 0, pages_to_process)
             
             # 合并所有文本
             full_text = "\n".join(ocr_texts)
@@ -4,9 +4,14 @@ Regex Extraction Strategy
 """
 
 import re
-from typing import Dict, Optional, Any, List
+from typing import Dict, Optional, Any, List, Match, Pattern, Tuple
 from .base_strategy import BaseStrategy, ExtractionResult
 
+_NUMBER = re.compile(r'-?\d+\.?\d*')
+
+# 模式包中报表标题之后搜索的字符数
+SECTION_WINDOW = 8000
+
 
 class RegexStrategy(BaseStrategy):
     """正则表达式提取策略"""
@@ -14,6 +19,8 @@ class RegexStrategy(BaseStrategy):
     def __init__(self):
         super().__init__(name="regex")
         self.patterns = self._get_all_patterns()
+        # 预编译（实例在进程内共享，只编译一次）
+        self.compiled = self._compile_patterns(self.patterns)
     
     def _get_all_patterns(self) -> Dict[str, List[str]]:
         """获取所有提取模式"""
@@ -126,40 +133,98 @@ class RegexStrategy(BaseStrategy):
             ]
         }
     
+    @staticmethod
+    def _compile_patterns(patterns: Dict[str, List[str]]) -> Dict[str, Tuple[Tuple[Pattern, bool], ...]]:
+        """编译所有模式，并标记表示亏损（需取负）的模式"""
+        return {
+            field: tuple(
+                (re.compile(pattern, re.IGNORECASE | re.MULTILINE),
+                 field == 'net_profit' and ('loss' in pattern.lower() or '亏损' in pattern))
+                for pattern in pattern_list
+            )
+            for field, pattern_list in patterns.items()
+        }
+    
     def can_handle(self, content: Any) -> bool:
         """判断是否能处理"""
         return isinstance(content, str) and len(content) > 0
     
     def extract(self, content: str, **kwargs) -> ExtractionResult:
-        """使用正则表达式提取财务数据"""
+        """
+        使用正则表达式提取财务数据
+        
+        Args:
+            content: 文本
+            unit_multiplier: 单位乘数
+            pack: 公司模式包（PatternPack），在通用模式之前尝试；补齐全部字段时跳过通用模式
+        """
         result = ExtractionResult(method="regex")
         unit_multiplier = kwargs.get('unit_multiplier', 1.0)
+        pack = kwargs.get('pack')
         
         if not content:
             return result
         
-        # 应用所有正则模式
-        for field, pattern_list in self.patterns.items():
-            for pattern in pattern_list:
-                matches = re.findall(pattern, content, re.IGNORECASE | re.MULTILINE)
-                if matches:
-                    value = self._extract_number(matches[0])
-                    
-                    if value is not None:
-                        # 处理负数
-                        if field == 'net_profit' and ('loss' in pattern.lower() or '亏损' in pattern):
-                            value = -abs(value)
-                        
-                        # 应用单位乘数
-                        value = value * unit_multiplier
-                        
-                        # 设置结果
-                        setattr(result, field, value)
-                        break
+        # 公司模式包优先
+        if pack is not None:
+            for field in pack.fields:
+                self._search_pack(result, pack, field, content, unit_multiplier)
+            if result.fields_count == len(self.compiled):
+                result.update_confidence()
+                return result
+        
+        # 应用所有正则模式（模式包已找到的字段跳过）
+        for field, compiled_list in self.compiled.items():
+            if getattr(result, field) is not None:
+                continue
+            for pattern, is_loss in compiled_list:
+                match = pattern.search(content)
+                if match and self._apply_match(result, field, pattern, match, is_loss, unit_multiplier):
+                    break
         
         result.update_confidence()
         return result
     
+    def _search_pack(self, result: ExtractionResult, pack: Any, field: str,
+                     content: str, unit_multiplier: float) -> bool:
+        """按模式包查找字段：先试行标签，再在报表标题之后的区域内试通用模式"""
+        for pattern, is_loss in pack.labels.get(field, ()):
+            match = pattern.search(content)
+            if match and self._apply_match(result, field, pattern, match, is_loss, unit_multiplier):
+                result.locations[field]['pack'] = True
+                return True
+        
+        for heading in pack.sections.get(field, ()):
+            for heading_match in heading.finditer(content):
+                start = heading_match.end()
+                end = start + SECTION_WINDOW
+                for pattern, is_loss in self.compiled[field]:
+                    match = pattern.search(content, start, end)
+                    if match and self._apply_match(result, field, pattern, match, is_loss, unit_multiplier):
+                        result.locations[field]['pack'] = True
+                        return True
+        return False
+    
+    def _apply_match(self, result: ExtractionResult, field: str, pattern: Pattern, match: Match,
+                     is_loss: bool, unit_multiplier: float) -> bool:
+        """把匹配到的数值写入结果，并记录位置和行标签（数值前的文字）"""
+        # 与 findall 的首个结果一致：多个分组取元组，否则取唯一分组（或整个匹配）
+        captured = match.groups() if pattern.groups > 1 else match.group(pattern.groups)
+        value = self._extract_number(captured)
+        if value is None:
+            return False
+        
+        # 处理负数
+        if is_loss:
+            value = -abs(value)
+        
+        # 应用单位乘数并设置结果
+        setattr(result, field, value * unit_multiplier)
+        label_end = match.start(1) if pattern.groups else match.end()
+        result.locations[field] = {'offset': match.start(),
+                                   'label': match.string[match.start():label_end]}
+        return True
+    
     def _extract_number(self, text: Any) -> Optional[float]:
         """从文本中提取数字"""
         if text is None:
@@ -181,8 +246,7 @@ class RegexStrategy(BaseStrategy):
         text = text.replace('（', '-').replace('）', '')
         
         # 提取数字
-        pattern = r'-?\d+\.?\d*'
-        match = re.search(pattern, text)
+        match = _NUMBER.search(text)
         
         if match:
             try:
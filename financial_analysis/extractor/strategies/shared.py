@@ -0,0 +1,40 @@
+"""
+进程内共享的策略实例
+Process-shared Strategy Instances
+
+策略对象构建后只读（正则预编译、客户端与缓存目录只初始化一次），
+同一进程内的所有提取器和工作线程共用；单次提取的状态放在 ExtractionContext 中。
+"""
+
+import threading
+from typing import Dict, Iterable
+
+from .base_strategy import BaseStrategy
+from .regex_strategy import RegexStrategy
+from .llm_strategy import LLMStrategy
+from .ocr_strategy import OCRStrategy
+from .table_strategy import TableStrategy
+
+STRATEGY_CLASSES = {
+    'regex': RegexStrategy,
+    'table': TableStrategy,
+    'ocr': OCRStrategy,
+    'llm': LLMStrategy,
+}
+
+_strategies: Dict[str, BaseStrategy] = {}
+_strategies_lock = threading.Lock()
+
+
+def get_strategy(name: str) -> BaseStrategy:
+    """进程内共享的策略实例（首次使用时构建）"""
+    with _strategies_lock:
+        strategy = _strategies.get(name)
+        if strategy is None:
+            strategy = _strategies[name] = STRATEGY_CLASSES[name]()
+        return strategy
+
+
+def get_strategies(names: Iterable[str]) -> Dict[str, BaseStrategy]:
+    """按名称取一组共享策略"""
+    return {name: get_strategy(name) for name in names}
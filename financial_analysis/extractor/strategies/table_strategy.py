@@ -37,19 +37,32 @@ class TableStrategy(BaseStrategy):
         return hasattr(content, 'pages')
     
     def extract(self, content: Any, **kwargs) -> ExtractionResult:
-        """从表格中提取财务数据"""
+        """
+        从表格中提取财务数据
+        
+        kwargs:
+            first_pages: 优先检查的页码（例如公司页码提示附近的页）
+            page_tables: 已提取的表格 {页码: 表格列表}（大文档按需并行提取，见 LazyPageTables），缺少的页在此提取
+        """
         result = ExtractionResult(method="table")
         
         if not hasattr(content, 'pages'):
             return result
         
-        # 遍历前30页查找表格
+        # 遍历前30页查找表格（提示页优先）
         max_pages = min(30, len(content.pages))
+        first_pages = [p for p in kwargs.get('first_pages') or [] if 0 <= p < len(content.pages)]
+        page_order = first_pages + [p for p in range(max_pages) if p not in first_pages]
+        page_tables = kwargs.get('page_tables') or {}
         tables_found = 0
         
-        for page_num in range(max_pages):
-            page = content.pages[page_num]
-            tables = page.extract_tables()
+        for page_num in page_order:
+            if result.is_complete:
+                break
+            if page_num in page_tables:
+                tables = page_tables[page_num]
+            else:
+                tables = content.pages[page_num].extract_tables()
             
             if not tables:
                 continue
@@ -61,7 +74,7 @@ class TableStrategy(BaseStrategy):
                     continue
                 
                 # 遍历表格行
-                for row in table:
+                for row_index, row in enumerate(table):
                     if not row:
                         continue
                     
@@ -80,6 +93,9 @@ class TableStrategy(BaseStrategy):
                                 value = self._extract_value_from_row(row, field)
                                 if value is not None:
                                     setattr(result, field, value)
+                                    result.locations[field] = {'page': page_num,
+                                                               'pos': round(row_index / len(table), 3),
+                                                               'label': self._row_label(row)}
                                     break
         
         if tables_found > 0:
@@ -88,6 +104,14 @@ class TableStrategy(BaseStrategy):
         result.update_confidence()
         return result
     
+    @staticmethod
+    def _row_label(row: List) -> Optional[str]:
+        """行标签：第一个不含数字的单元格"""
+        for cell in row:
+            if cell and str(cell).strip() and not re.search(r'\d', str(cell)):
+                return str(cell).strip()
+        return None
+    
     def _extract_value_from_row(self, row: List, field: str) -> Optional[float]:
         """从表格行中提取数值"""
         numbers = []
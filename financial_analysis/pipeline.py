@@ -0,0 +1,202 @@
+"""
+下载-提取流水线
+Download-to-Extract Streaming Pipeline
+
+每个下载并验证完成的文件立即推入提取队列，
+网络等待与PDF解析相互重叠，下载仍在进行时即可看到逐文件的提取结果。
+"""
+import queue
+import threading
+import time
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+from .download.downloader import download_reports
+from .extractor.financial_models import FinancialData
+from .extractor import progress
+from .extractor.metrics import get_metrics
+from .extractor.master_store import MasterStore, DEFAULT_MASTER_PATH, result_status
+from .extractor.results_store import ResultsStore
+from .extractor.smart_extractor import extract_single_file, write_results_csv
+from .extractor.page_hints import get_page_hints
+from .extractor.pattern_packs import get_pattern_packs
+from .extractor.quarantine import get_quarantine
+from .download.document_catalog import get_catalog
+from .extractor import page_parallel
+
+
+def run_pipeline(
+    csv_path: str = "data/Company_Financial_report.csv",
+    input_dir: str = "data/raw_reports",
+    output_dir: str = "output",
+    limit: Optional[int] = None,
+    download_workers: int = 5,
+    extract_workers: int = 4,
+    extraction_mode: str = 'regex_first',
+    use_llm: bool = False,
+    master_table_path: Optional[str] = None,
+    progress_port: Optional[int] = progress.DEFAULT_PROGRESS_PORT
+) -> Dict[str, Any]:
+    """
+    流水线模式：边下载边提取
+
+    Args:
+        csv_path: CSV数据库路径
+        input_dir: PDF下载目录
+        output_dir: 输出目录
+        limit: 限制下载数量
+        download_workers: 并发下载数
+        extract_workers: 提取线程数
+        extraction_mode: 提取模式
+        use_llm: 是否启用LLM
+        master_table_path: 主控制表路径
+        progress_port: 实时进度服务端口（None表示不启动）
+
+    Returns:
+        下载与提取统计
+    """
+    start_time = time.time()
+    metrics = get_metrics()
+    metrics.reset()
+    page_hints = get_page_hints()
+    page_hints.reset_run()
+    pattern_packs = get_pattern_packs()
+    pattern_packs.reset_run()
+    quarantine = get_quarantine()
+    quarantine.reset_run()
+
+    store = MasterStore(master_table_path or DEFAULT_MASTER_PATH).start()
+
+    # LLM模式限制并发数（API限制）
+    if extraction_mode == 'llm_only' and use_llm:
+        extract_workers = min(extract_workers, 2)
+
+    print(f"\n{'='*60}")
+    print("下载-提取流水线")
+    print(f"{'='*60}")
+    print(f"下载并发: {download_workers}")
+    print(f"提取线程: {extract_workers}")
+    print(f"提取模式: {extraction_mode}")
+    print(f"{'='*60}")
+
+    work_queue: "queue.Queue[Optional[Path]]" = queue.Queue()
+    metrics.register_gauge('queue_depth', work_queue.qsize)
+    results: List[FinancialData] = []
+    lock = threading.Lock()
+
+    # 实时进度：待处理总数随下载完成增长
+    progress_server = progress.start_progress(0, port=progress_port)
+    catalog = get_catalog()
+
+    def page_count(pdf_path: Path) -> Optional[int]:
+        entry = catalog.lookup(pdf_path)
+        return entry['page_count'] if entry else None
+
+    def on_downloaded(pdf_path: Path) -> None:
+        # 登记文档目录：页数、是否扫描版供进度、策略规划和OCR判断使用
+        try:
+            pages = catalog.get(pdf_path, save=False)['page_count']
+        except FileNotFoundError:
+            pages = 0
+        progress.files_queued(pages=pages)
+        work_queue.put(pdf_path)
+
+    def extraction_worker() -> None:
+        """从队列取文件并提取，直到收到结束标记"""
+        while True:
+            pdf_path = work_queue.get()
+            if pdf_path is None:
+                work_queue.task_done()
+                break
+
+            # 重新下载的同一文件（内容哈希相同）仍在隔离区时跳过
+            if quarantine.partition([pdf_path], catalog.hash_files([pdf_path]))[1]:
+                quarantine.skipped(1)
+                print(f"  🚫 [提取] {pdf_path.name} 在隔离区，跳过")
+                progress.file_finished(pdf_path.name, "quarantined", page_count(pdf_path))
+                work_queue.task_done()
+                continue
+
+            # 共享提取器；异常和超出时间预算记入隔离区
+            result = extract_single_file(pdf_path, extraction_mode, use_llm)
+
+            store.record_result(pdf_path, result)
+            progress.file_finished(pdf_path.name, result_status(result), page_count(pdf_path))
+
+            with lock:
+                results.append(result)
+
+                if result.success_level == "Complete":
+                    print(f"  ✅ [提取] {pdf_path.name} - {result.extraction_method}")
+                elif "Partial" in str(result.success_level):
+                    print(f"  ⚠️ [提取] {pdf_path.name} - {result.success_level}")
+                else:
+                    print(f"  ❌ [提取] {pdf_path.name}")
+
+            work_queue.task_done()
+
+    workers = [
+        threading.Thread(target=extraction_worker, name=f"extract-{i}", daemon=True)
+        for i in range(extract_workers)
+    ]
+    for worker in workers:
+        worker.start()
+
+    try:
+        download_stats = download_reports(
+            csv_path=csv_path,
+            output_dir=input_dir,
+            max_workers=download_workers,
+            limit=limit,
+            on_downloaded=on_downloaded
+        )
+    finally:
+        # 下载结束后通知提取线程退出
+        for _ in workers:
+            work_queue.put(None)
+        for worker in workers:
+            worker.join()
+        progress.stop_progress(progress_server)
+        metrics.unregister_gauge('queue_depth')
+
+    with metrics.timer('write'):
+        store.close()
+
+        results_dir = Path(output_dir) / "results"
+        results_dir.mkdir(parents=True, exist_ok=True)
+        output_file = results_dir / f"pipeline_extraction_{datetime.now().strftime('%Y%m%d%H%M')}.csv"
+        write_results_csv(results, output_file)
+        ResultsStore().write_results(results, source=str(output_file))
+
+    elapsed = time.time() - start_time
+    stats = {
+        "downloaded": download_stats['downloaded'],
+        "download_failed": download_stats['failed'],
+        "total_processed": len(results),
+        "successful": sum(1 for r in results if r.success_level == "Complete"),
+        "partial": sum(1 for r in results if "Partial" in str(r.success_level)),
+        "failed": sum(1 for r in results if r.success_level == "Failed"),
+        "elapsed_time": elapsed
+    }
+
+    print(f"\n{'='*60}")
+    print("流水线完成")
+    print(f"{'='*60}")
+    print(f"下载: {stats['downloaded']} | 下载失败: {stats['download_failed']}")
+    print(f"提取: 成功={stats['successful']}, 部分={stats['partial']}, 失败={stats['failed']}")
+    print(f"总执行时间: {elapsed:.2f}秒")
+    metrics.print_summary()
+    metrics_file = metrics.dump_json()
+    page_hints.save()
+    page_hints.print_summary()
+    pattern_packs.save()
+    pattern_packs.print_summary()
+    quarantine.save()
+    quarantine.print_summary()
+    catalog.save()
+    page_parallel.shutdown()
+    print(f"\n结果已保存至: {output_file}")
+    print(f"运行指标: {metrics_file}")
+
+    return stats
@@ -1,6 +1,30 @@
 """
 可视化模块 - 图表生成和展示
 """
-from .visualizer import Visualizer, create_charts
+import importlib
+from typing import TYPE_CHECKING
 
-__all__ = ['Visualizer', 'create_charts']
\ No newline at end of file
+# 按需导入（PEP 562）：首次访问时才加载子模块
+_LAZY_ATTRS = {
+    'Visualizer': '.visualizer',
+    'create_charts': '.visualizer',
+}
+
+__all__ = list(_LAZY_ATTRS)
+
+
+def __getattr__(name):
+    module = _LAZY_ATTRS.get(name)
+    if module is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(importlib.import_module(module, __name__), name)
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted(set(globals()) | set(__all__))
+
+
+if TYPE_CHECKING:
+    from .visualizer import Visualizer, create_charts
@@ -28,6 +28,23 @@ class Visualizer:
         # TODO: 实现仪表板功能
         pass
 
+def benchmark_speed_data() -> Optional[Dict[str, List]]:
+    """最近一次基准测试中各提取模式的单线程平均耗时（没有结果时返回None）"""
+    from ..benchmark import load_latest_benchmark
+    
+    result = load_latest_benchmark()
+    if not result or not result.get('runs'):
+        return None
+    min_workers = min(run['workers'] for run in result['runs'])
+    runs = [run for run in result['runs'] if run['workers'] == min_workers]
+    fastest = min(run['seconds_per_file'] for run in runs) or 1e-9
+    return {
+        '提取器': [run['mode'] for run in runs],
+        '平均耗时(秒)': [run['seconds_per_file'] for run in runs],
+        '相对速度': [run['seconds_per_file'] / fastest for run in runs]
+    }
+
+
 def create_charts(data: Dict = None, output_path: Optional[str] = None) -> str:
     """
     创建性能对比图表
@@ -116,16 +133,20 @@ def create_charts(data: Dict = None, output_path: Optional[str] = None) -> str:
     ax3.axhline(y=0, color='black', linestyle='-', linewidth=0.5)
     ax3.grid(True, alpha=0.3)
     
-    # 4. 处理速度对比
+    # 4. 处理速度对比（优先使用最近一次基准测试的实测数据）
     ax4 = axes[1, 1]
-    speed_data = {
-        '提取器': ['基础提取', '增强提取', 'LLM增强'],
-        '平均耗时(秒)': [2.0, 2.3, 3.2],
-        '相对速度': [1.0, 1.15, 1.6]
-    }
+    speed_data = benchmark_speed_data()
+    speed_title = '处理速度对比（基准测试实测）'
+    if speed_data is None:
+        speed_data = {
+            '提取器': ['基础提取', '增强提取', 'LLM增强'],
+            '平均耗时(秒)': [2.0, 2.3, 3.2],
+            '相对速度': [1.0, 1.15, 1.6]
+        }
+        speed_title = '处理速度对比'
     
     bars = ax4.bar(speed_data['提取器'], speed_data['平均耗时(秒)'], 
-                    color=['blue', 'orange', 'green'])
+                    color=['blue', 'orange', 'green', 'purple', 'gray', 'brown'][:len(speed_data['提取器'])])
     
     for bar, time, speed in zip(bars, speed_data['平均耗时(秒)'], speed_data['相对速度']):
         height = bar.get_height()
@@ -134,7 +155,7 @@ def create_charts(data: Dict = None, output_path: Optional[str] = None) -> str:
     
     ax4.set_xlabel('提取器')
     ax4.set_ylabel('平均处理时间 (秒)')
-    ax4.set_title('处理速度对比')
+    ax4.set_title(speed_title)
     ax4.grid(True, alpha=0.3)
 
     # 调整布局
@@ -3,34 +3,21 @@
 财务分析系统主入口
 Financial Analysis System Main Entry Point
 
+各子命令的处理函数在执行时才导入所需模块，
+status / monitor 等轻量命令不会加载 pdfplumber、pandas、matplotlib 等重依赖。
+
 作者: Lin Cifeng
 版本: 3.0
 """
 import argparse
 import sys
-from pathlib import Path
-
-# 导入核心模块
-from financial_analysis.download import batch_download
-from financial_analysis.extractor import SmartExtractor, smart_extract
-from financial_analysis.analysis import analyze_extraction_results
-from financial_analysis.visualization import create_charts
-from financial_analysis.download.pdf_utils import clean_pdfs, generate_summary
 
-# 导入旧接口（兼容性）
-try:
-    from financial_analysis.download.downloader import download_reports
-except:
-    from financial_analysis.download import batch_download as download_reports
+# 与 financial_analysis.extractor.progress.DEFAULT_PROGRESS_PORT 保持一致（避免启动时导入提取模块）
+DEFAULT_PROGRESS_PORT = 8765
 
-try:
-    from financial_analysis.analysis.analyzer import analyze_data
-except:
-    from financial_analysis.analysis import analyze_extraction_results as analyze_data
 
-
-def main():
-    """主函数"""
+def build_parser() -> argparse.ArgumentParser:
+    """构建命令行解析器"""
     parser = argparse.ArgumentParser(
         description='财务分析系统 - Financial Analysis System v3.0',
         formatter_class=argparse.RawDescriptionHelpFormatter,
@@ -43,6 +30,16 @@ def main():
   # 提取数据
   python main.py extract
   python main.py extract --limit 50
+  python main.py extract --incremental
+  python main.py extract --limit 50 --profile --profile-sample 5
+  
+  # 基准测试（合成语料）
+  python main.py benchmark --workers 1 4 --pages 10
+  python main.py benchmark --imports
+  
+  # 边下载边提取
+  python main.py run
+  python main.py run --limit 100 --mode regex_first
   
   # 分析数据
   python main.py analyze
@@ -71,9 +68,34 @@ def main():
     extract_parser.add_argument('--mode', choices=['regex_only', 'llm_only', 'regex_first', 'llm_first', 'adaptive'], 
                               default='regex_only', help='提取模式')
     extract_parser.add_argument('--workers', type=int, default=4, help='并行线程数')
+    extract_parser.add_argument('--order', choices=['longest', 'shortest', 'name'], default='longest',
+                              help='调度顺序：预计耗时最长的先开始（默认）/最短的先开始/按文件名')
     extract_parser.add_argument('--cache', action='store_true', help='启用缓存')
     extract_parser.add_argument('--skip-processed', action='store_true', default=True, help='跳过已处理文件')
     extract_parser.add_argument('--all', action='store_true', help='处理所有文件（自动断点续传）')
+    extract_parser.add_argument('--incremental', action='store_true',
+                              help='只处理新增、内容变化或提取逻辑更新后的文件')
+    extract_parser.add_argument('--no-progress', action='store_true',
+                              help='不启动实时进度服务（供 monitor 订阅）')
+    extract_parser.add_argument('--profile', action='store_true',
+                              help='性能剖析，报告写入 output/reports/profile_<时间>/')
+    extract_parser.add_argument('--profile-sample', type=int, default=3, metavar='N',
+                              help='性能剖析时每个工作线程抽样的文件数（默认3）')
+    extract_parser.add_argument('--coordinate', metavar='DIR',
+                              help='多节点协调：共享目录（多台机器的 extract --all 按租约领取文件，互不重复）')
+    extract_parser.add_argument('--node-id', help='协调节点ID（默认 主机名-进程号）')
+    extract_parser.add_argument('--slow-lane', action='store_true',
+                              help='慢速通道：只处理隔离区中反复卡死/崩溃的文件（串行，放宽时间预算）')
+    
+    # 流水线命令
+    run_parser = subparsers.add_parser('run', help='边下载边提取（流水线模式）')
+    run_parser.add_argument('--limit', type=int, help='限制下载数量')
+    run_parser.add_argument('--download-workers', type=int, default=5, help='并发下载数')
+    run_parser.add_argument('--workers', type=int, default=4, help='提取线程数')
+    run_parser.add_argument('--mode', choices=['regex_only', 'llm_only', 'regex_first', 'llm_first', 'adaptive'],
+                            default='regex_first', help='提取模式')
+    run_parser.add_argument('--use-llm', action='store_true', help='使用LLM增强提取')
+    run_parser.add_argument('--no-progress', action='store_true', help='不启动实时进度服务')
     
     # 分析命令
     analyze_parser = subparsers.add_parser('analyze', help='分析数据')
@@ -87,7 +109,12 @@ def main():
     retry_parser = subparsers.add_parser('retry', help='重试失败项')
     retry_parser.add_argument('--failed', action='store_true', help='重试所有失败项')
     retry_parser.add_argument('--partial', action='store_true', help='重试部分成功项')
-    retry_parser.add_argument('--mode', default='llm_only', help='重试模式')
+    retry_parser.add_argument('--files', nargs='+', help='指定重试的文件（文件名或路径）')
+    retry_parser.add_argument('--files-from', help='从列表文件读取重试的文件（每行一个，如 output/files_need_review.txt）')
+    retry_parser.add_argument('--llm', action='store_true', help='启用LLM阶段')
+    retry_parser.add_argument('--mode', help='兼容旧参数：包含 llm 时等同于 --llm')
+    retry_parser.add_argument('--workers', type=int, default=4, help='并行线程数')
+    retry_parser.add_argument('--force', action='store_true', help='忽略退避时间立即重试')
     
     # 报告命令
     report_parser = subparsers.add_parser('report', help='生成质量报告')
@@ -100,132 +127,253 @@ def main():
     # 监控命令
     monitor_parser = subparsers.add_parser('monitor', help='实时监控提取进度')
     
+    # 基准测试命令
+    bench_parser = subparsers.add_parser('benchmark', help='提取吞吐量基准测试（合成语料）')
+    bench_parser.add_argument('--modes', nargs='+',
+                              choices=['regex_only', 'regex_table', 'llm_only', 'regex_first', 'llm_first', 'adaptive'],
+                              default=['regex_only', 'regex_table', 'regex_first', 'adaptive'], help='提取模式')
+    bench_parser.add_argument('--workers', type=int, nargs='+', default=[1, 4], help='线程数（可多个）')
+    bench_parser.add_argument('--files-per-kind', type=int, default=3, help='每类语料的文件数')
+    bench_parser.add_argument('--pages', type=int, default=5, help='每个文件的页数')
+    bench_parser.add_argument('--seed', type=int, default=42, help='语料随机种子')
+    bench_parser.add_argument('--repeat', type=int, default=3, help='每种配置重复次数（取最快一次）')
+    bench_parser.add_argument('--imports', action='store_true',
+                              help='测量各子命令的启动/导入耗时（全新解释器）')
+    bench_parser.add_argument('--commands', nargs='+', default=None,
+                              help='--imports 时测量的子命令（默认全部）')
+    
     # 合并命令
     merge_parser = subparsers.add_parser('merge', help='合并所有提取结果')
     merge_parser.add_argument('--output', default='output/final_combined_results', help='输出文件前缀')
-    
+
+    return parser
+
+
+# ----------------------------------------------------------------------
+# 子命令处理函数
+# ----------------------------------------------------------------------
+def _progress_port(args):
+    return None if args.no_progress else DEFAULT_PROGRESS_PORT
+
+
+def cmd_download(args):
+    try:
+        from financial_analysis.download.downloader import download_reports
+    except ImportError:
+        from financial_analysis.download import batch_download as download_reports
+    print("开始下载财报...")
+    download_reports(limit=args.limit, max_workers=args.workers)
+
+
+def cmd_extract(args):
+    from financial_analysis.extractor.smart_extractor import smart_extract
+    print("开始提取财务数据...")
+    profile_sample = args.profile_sample if args.profile else None
+    coordinator = None
+    if args.coordinate:
+        from financial_analysis.extractor.coordinator import Coordinator
+        coordinator = Coordinator(args.coordinate, args.node_id)
+
+    # 如果使用 --all 参数，处理所有文件
+    if args.all:
+        print("\n🚀 全量提取模式：处理所有1158个文件")
+        print("=" * 60)
+        print("特性：")
+        print("  ✅ 自动断点续传")
+        print("  ✅ 错误自动跳过")
+        print("  ✅ 每10个文件保存进度")
+        print("  ✅ 智能重试机制")
+        print("=" * 60)
+
+        # 设置最优参数
+        stats = smart_extract(
+            limit=None,  # 不限制数量，处理所有文件
+            extraction_mode=args.mode if args.mode else 'regex_first',
+            use_llm=args.use_llm,
+            max_workers=args.workers if args.workers else 4,
+            use_cache=True,  # 强制启用缓存
+            batch_id=None if coordinator else 1,  # 协调模式下由协调库分配文件
+            batch_size=args.batch_size,
+            skip_processed=True,  # 强制跳过已处理
+            incremental=args.incremental,
+            progress_port=_progress_port(args),
+            profile_sample=profile_sample,
+            order=args.order,
+            coordinator=coordinator,
+            slow_lane=args.slow_lane
+        )
+        print(f"\n✅ 全量提取完成!")
+        print(f"成功: {stats['successful']} | 部分: {stats['partial']} | 失败: {stats['failed']}")
+
+        # 如果有失败，提示重试
+        if stats['failed'] > 0:
+            print(f"\n💡 提示: 有 {stats['failed']} 个失败文件")
+            print("   运行以下命令重试失败项：")
+            print("   python main.py retry --failed --llm")
+
+    elif args.method == 'smart':
+        # 使用智能提取器（默认）
+        print("使用智能提取器 (Smart Extractor)...")
+        stats = smart_extract(
+            limit=args.limit,
+            extraction_mode=args.mode,
+            use_llm=args.use_llm,
+            max_workers=args.workers,
+            use_cache=args.cache,
+            batch_id=args.batch,
+            batch_size=args.batch_size,
+            skip_processed=args.skip_processed,
+            incremental=args.incremental,
+            progress_port=_progress_port(args),
+            profile_sample=profile_sample,
+            order=args.order,
+            coordinator=coordinator,
+            slow_lane=args.slow_lane
+        )
+        print(f"\n提取完成: 成功={stats['successful']}, 部分={stats['partial']}, 失败={stats['failed']}")
+    else:
+        # 使用基础正则提取器
+        print("使用正则提取器 (Regex Extractor)...")
+        stats = smart_extract(
+            limit=args.limit,
+            extraction_mode='regex_only',
+            max_workers=4,
+            use_cache=True,
+            progress_port=_progress_port(args),
+            profile_sample=profile_sample,
+            order=args.order,
+            slow_lane=args.slow_lane
+        )
+        print(f"\n提取完成: 成功={stats['successful']}, 部分={stats['partial']}, 失败={stats['failed']}")
+
+
+def cmd_run(args):
+    from financial_analysis.pipeline import run_pipeline
+    print("启动下载-提取流水线...")
+    run_pipeline(
+        limit=args.limit,
+        download_workers=args.download_workers,
+        extract_workers=args.workers,
+        extraction_mode=args.mode,
+        use_llm=args.use_llm,
+        progress_port=_progress_port(args)
+    )
+
+
+def cmd_status(args):
+    from financial_analysis.extractor.batch_manager import show_status
+    print("查看提取进度...")
+    show_status()
+
+
+def cmd_retry(args):
+    from financial_analysis.extractor.batch_manager import retry_failed
+    print("重试失败项...")
+    files = list(args.files or [])
+    if args.files_from:
+        with open(args.files_from, 'r', encoding='utf-8') as f:
+            files.extend(line.strip() for line in f if line.strip())
+    retry_failed(failed_only=args.failed, partial_only=args.partial, files=files or None,
+                 use_llm=args.llm or 'llm' in (args.mode or ''), max_workers=args.workers,
+                 force=args.force)
+
+
+def cmd_report(args):
+    from financial_analysis.extractor.batch_manager import generate_quality_report, generate_final_report
+    print("生成综合报告...")
+    # 先生成质量报告
+    generate_quality_report()
+    # 再生成最终报告
+    generate_final_report()
+
+
+def cmd_analyze(args):
+    try:
+        from financial_analysis.analysis.analyzer import analyze_data
+    except ImportError:
+        from financial_analysis.analysis import analyze_extraction_results as analyze_data
+    print(f"开始{args.type}分析...")
+    analyze_data(task=args.type)
+
+
+def cmd_utils(args):
+    if args.clean_pdfs:
+        from financial_analysis.download.pdf_utils import clean_pdfs
+        print("检查PDF文件...")
+        clean_pdfs()
+    elif args.summary:
+        from financial_analysis.download.pdf_utils import generate_summary
+        generate_summary()
+    else:
+        print("请指定工具功能: --clean-pdfs 或 --summary")
+
+
+def cmd_monitor(args):
+    from financial_analysis.extractor.batch_manager import monitor_extraction
+    print("启动实时监控...")
+    monitor_extraction()
+
+
+def cmd_benchmark(args):
+    if args.imports:
+        from financial_analysis.benchmark import run_import_benchmark
+        run_import_benchmark(commands=args.commands, repeat=args.repeat)
+        return
+    from financial_analysis.benchmark import run_benchmark
+    run_benchmark(
+        modes=args.modes,
+        workers=args.workers,
+        files_per_kind=args.files_per_kind,
+        pages=args.pages,
+        seed=args.seed,
+        repeat=args.repeat
+    )
+
+
+def cmd_merge(args):
+    from financial_analysis.extractor.batch_manager import merge_all_results
+    print("合并所有提取结果...")
+    stats = merge_all_results(output_prefix=args.output)
+    if stats:
+        print(f"\n✅ 合并完成: {stats['total']} 条记录")
+        if stats['total'] >= 1000:
+            print(f"🎉 目标达成！成功提取 {stats['total']} 条记录！")
+        else:
+            print(f"📈 距离1000条目标还差: {1000 - stats['total']} 条")
+
+
+COMMANDS = {
+    'download': cmd_download,
+    'extract': cmd_extract,
+    'run': cmd_run,
+    'status': cmd_status,
+    'retry': cmd_retry,
+    'report': cmd_report,
+    'analyze': cmd_analyze,
+    'utils': cmd_utils,
+    'monitor': cmd_monitor,
+    'benchmark': cmd_benchmark,
+    'merge': cmd_merge,
+}
+
+# 只读命令不创建输出目录
+READ_ONLY_COMMANDS = ('status', 'monitor')
+
+
+def main():
+    """主函数"""
+    parser = build_parser()
     args = parser.parse_args()
-    
+
     if not args.command:
         parser.print_help()
         return
-    
+
     try:
-        if args.command == 'download':
-            print("开始下载财报...")
-            stats = download_reports(limit=args.limit, max_workers=args.workers)
-            
-        elif args.command == 'extract':
-            print("开始提取财务数据...")
-            
-            # 如果使用 --all 参数，处理所有文件
-            if args.all:
-                print("\n🚀 全量提取模式：处理所有1158个文件")
-                print("=" * 60)
-                print("特性：")
-                print("  ✅ 自动断点续传")
-                print("  ✅ 错误自动跳过")
-                print("  ✅ 每10个文件保存进度")
-                print("  ✅ 智能重试机制")
-                print("=" * 60)
-                
-                # 设置最优参数
-                stats = smart_extract(
-                    limit=None,  # 不限制数量，处理所有文件
-                    extraction_mode=args.mode if args.mode else 'regex_first',
-                    use_llm=args.use_llm,
-                    max_workers=args.workers if args.workers else 4,
-                    use_cache=True,  # 强制启用缓存
-                    batch_id=1,
-                    batch_size=args.batch_size,
-                    skip_processed=True  # 强制跳过已处理
-                )
-                print(f"\n✅ 全量提取完成!")
-                print(f"成功: {stats['successful']} | 部分: {stats['partial']} | 失败: {stats['failed']}")
-                
-                # 如果有失败，提示重试
-                if stats['failed'] > 0:
-                    print(f"\n💡 提示: 有 {stats['failed']} 个失败文件")
-                    print("   运行以下命令重试失败项：")
-                    print("   python main.py retry --failed --mode llm_only")
-                    
-            elif args.method == 'smart':
-                # 使用智能提取器（默认）
-                print("使用智能提取器 (Smart Extractor)...")
-                stats = smart_extract(
-                    limit=args.limit,
-                    extraction_mode=args.mode,
-                    use_llm=args.use_llm,
-                    max_workers=args.workers,
-                    use_cache=args.cache,
-                    batch_id=args.batch,
-                    batch_size=args.batch_size,
-                    skip_processed=args.skip_processed
-                )
-                print(f"\n提取完成: 成功={stats['successful']}, 部分={stats['partial']}, 失败={stats['failed']}")
-            else:
-                # 使用基础正则提取器
-                print("使用正则提取器 (Regex Extractor)...")
-                stats = smart_extract(
-                    limit=args.limit,
-                    extraction_mode='regex_only',
-                    max_workers=4,
-                    use_cache=True
-                )
-                print(f"\n提取完成: 成功={stats['successful']}, 部分={stats['partial']}, 失败={stats['failed']}")
-            
-        elif args.command == 'status':
-            # 查看进度
-            print("查看提取进度...")
-            from financial_analysis.extractor.batch_manager import show_status
-            show_status()
-            
-        elif args.command == 'retry':
-            # 重试失败项
-            print("重试失败项...")
-            from financial_analysis.extractor.batch_manager import retry_failed
-            retry_failed(failed_only=args.failed, partial_only=args.partial, mode=args.mode)
-            
-        elif args.command == 'report':
-            # 生成综合报告
-            print("生成综合报告...")
-            from financial_analysis.extractor.batch_manager import generate_quality_report, generate_final_report
-            # 先生成质量报告
-            generate_quality_report()
-            # 再生成最终报告
-            generate_final_report()
-            
-        elif args.command == 'analyze':
-            print(f"开始{args.type}分析...")
-            stats = analyze_data(task=args.type)
-            
-        elif args.command == 'utils':
-            if args.clean_pdfs:
-                print("检查PDF文件...")
-                stats = clean_pdfs()
-            elif args.summary:
-                generate_summary()
-            else:
-                print("请指定工具功能: --clean-pdfs 或 --summary")
-        
-        elif args.command == 'monitor':
-            # 监控提取进度
-            print("启动实时监控...")
-            from financial_analysis.extractor.batch_manager import monitor_extraction
-            monitor_extraction()
-        
-        elif args.command == 'merge':
-            # 合并所有结果
-            print("合并所有提取结果...")
-            from financial_analysis.extractor.batch_manager import merge_all_results
-            stats = merge_all_results(output_prefix=args.output)
-            if stats:
-                print(f"\n✅ 合并完成: {stats['total']} 条记录")
-                if stats['total'] >= 1000:
-                    print(f"🎉 目标达成！成功提取 {stats['total']} 条记录！")
-                else:
-                    print(f"📈 距离1000条目标还差: {1000 - stats['total']} 条")
-                
+        if args.command not in READ_ONLY_COMMANDS:
+            from config import ensure_dirs
+            ensure_dirs()
+        COMMANDS[args.command](args)
     except KeyboardInterrupt:
         print("\n操作已取消")
         sys.exit(1)
@@ -235,4 +383,4 @@ def main():
 
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()